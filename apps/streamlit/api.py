@@ -0,0 +1,49 @@
+"""
+HTTP API entry point.
+
+Usage:
+    python apps/streamlit/api.py --port 8080 [--stub]
+"""
+
+import argparse
+import os
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+streamlit_app_dir = os.path.dirname(os.path.abspath(__file__))
+if streamlit_app_dir not in sys.path:
+    sys.path.append(streamlit_app_dir)
+
+from src.api import JobManager, serve, stub_pipeline
+from src.config import settings
+from src.pipeline import run_job
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the reconstruction pipeline over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--jobs-root", default=settings.API_JOBS_ROOT,
+                        help="Directory receiving uploaded datasets and job outputs")
+    parser.add_argument("--datasets-root", default=settings.API_DATASETS_ROOT,
+                        help="Only dataset folders inside this directory can be submitted by path")
+    parser.add_argument("--workers", type=int, default=1, help="Maximum number of jobs running at once")
+    parser.add_argument("--stub", action="store_true",
+                        help="Run a stand-in pipeline that produces placeholder outputs")
+    parser.add_argument("--quiet", action="store_true", help="Do not log every request")
+    args = parser.parse_args()
+
+    manager = JobManager(
+        args.jobs_root,
+        max_workers=args.workers,
+        pipeline_fn=stub_pipeline if args.stub else run_job,
+        datasets_root=args.datasets_root,
+    )
+    serve(args.host, args.port, manager, quiet=args.quiet)
+
+
+if __name__ == "__main__":
+    main()
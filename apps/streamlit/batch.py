@@ -0,0 +1,53 @@
+"""
+Headless batch entry point.
+
+Usage:
+    python apps/streamlit/batch.py manifest.toml --workers 2
+"""
+
+import argparse
+import os
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+streamlit_app_dir = os.path.dirname(os.path.abspath(__file__))
+if streamlit_app_dir not in sys.path:
+    sys.path.append(streamlit_app_dir)
+
+from src.batch import load_manifest, run_batch
+from src.config import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run reconstructions for every dataset in a manifest.")
+    parser.add_argument("manifest", help="TOML, YAML or JSON manifest listing the datasets")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Maximum number of jobs running in parallel (default: manifest value or 1)")
+    parser.add_argument("--summary", default=None,
+                        help="Summary JSON path (default: batch_summary.json next to the manifest)")
+    parser.add_argument("--force", action="store_true", help="Re-run jobs that already completed")
+    parser.add_argument("--no-history", action="store_true", help="Do not record runs in the run history")
+    args = parser.parse_args()
+
+    jobs, manifest_workers = load_manifest(args.manifest)
+    max_workers = args.workers or manifest_workers or 1
+    summary_path = args.summary or os.path.join(
+        os.path.dirname(os.path.abspath(args.manifest)), "batch_summary.json"
+    )
+
+    summary = run_batch(
+        jobs,
+        summary_path,
+        max_workers=max_workers,
+        force=args.force,
+        history_path=None if args.no_history else settings.RUN_HISTORY_PATH,
+    )
+    print(f"Summary written to {summary_path}: {summary['counts']}")
+    return 1 if summary["counts"].get("failed") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Quality-versus-cost evaluation of reconstruction profiles.
+
+Usage:
+    python apps/streamlit/evaluate.py score test/runs/speed test/runs/balanced --reference scans/statue.ply --transform scans/statue_from_colmap.txt
+    python apps/streamlit/evaluate.py score test/runs/speed --reference test/runs/reference --target mesh
+    python apps/streamlit/evaluate.py report test/runs --json test/runs/pareto.json
+
+A reference folder must be a run over the same images, results are aligned
+to it through the camera centres both sparse models registered. Do not score
+the reference run itself. A ground-truth scan needs --transform, a 4x4
+matrix from the reconstruction's frame into the scan's, or --icp when the
+frames are already roughly aligned.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+streamlit_app_dir = os.path.dirname(os.path.abspath(__file__))
+if streamlit_app_dir not in sys.path:
+    sys.path.append(streamlit_app_dir)
+
+from src.config import settings
+from src.evaluation import TARGETS, collect_scores, evaluate_result, pareto_report
+from src.evaluation.report import DEFAULT_FSCORE_MARGIN
+from src.history import RunHistory
+from src.retention import find_job_dirs
+
+
+def _format(value, pattern: str) -> str:
+    return "-" if value is None else format(value, pattern)
+
+
+def score(args) -> int:
+    transform = np.loadtxt(args.transform).reshape(4, 4) if args.transform else None
+    failed = 0
+    for result_path in args.results:
+        try:
+            evaluate_result(
+                result_path,
+                args.reference,
+                target=args.target,
+                tolerance=args.tolerance,
+                transform=transform,
+                refine_icp=args.icp,
+                dataset_class_name=args.dataset_class,
+            )
+        except (ValueError, FileNotFoundError) as e:
+            print(f"{result_path}: {e}")
+            failed += 1
+    return 1 if failed else 0
+
+
+def report(args) -> int:
+    job_dirs = find_job_dirs(args.root)
+    history = RunHistory(args.history) if os.path.exists(args.history) else None
+    try:
+        rows = collect_scores(job_dirs, history)
+    finally:
+        if history: history.close()
+    if not rows:
+        print(f"No evaluated result folders found under {args.root}, run 'score' first")
+        return 1
+
+    classes = pareto_report(rows, margin=args.margin)
+    for entry in classes:
+        print(f"\n{entry['dataset_class']}")
+        print(f"  {'profile':<10} {'runs':>4} {'F-score':>8} {'chamfer':>9} {'texture':>8} {'s/100 img':>10} {'peak MB':>9}")
+        for summary in entry["profiles"]:
+            marker = "*" if summary["pareto"] else " "
+            print(
+                f"{marker} {summary['profile']:<10} {summary['runs']:>4} "
+                f"{_format(summary['fscore'], '.3f'):>8} {_format(summary['chamfer'], '.4g'):>9} "
+                f"{_format(summary['texture_coverage'], '.1%'):>8} "
+                f"{_format(summary['seconds_per_100_images'], '.0f'):>10} "
+                f"{_format(summary['peak_memory_mb'], '.0f'):>9}"
+            )
+        if entry["recommended"]:
+            print(f"  Cheapest within {args.margin} F-score of the best: {entry['recommended']}")
+        if entry["retire"]:
+            print(f"  No measurable gain for the extra cost: {', '.join(entry['retire'])}")
+    print("\n* on the Pareto front of cost against F-score")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"results": rows, "classes": classes}, f, indent=2)
+        print(f"Wrote {args.json}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score reconstructions and compare profiles on quality and cost.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    score_parser = subparsers.add_parser("score", help="Score result folders against a reference")
+    score_parser.add_argument("results", nargs="+", help="Result folders to score")
+    score_parser.add_argument("--reference", required=True,
+                              help="Reference result folder, or a ground-truth point cloud or mesh")
+    score_parser.add_argument("--target", choices=sorted(TARGETS), default="dense",
+                              help="Compare the dense cloud or the textured mesh")
+    score_parser.add_argument("--tolerance", type=float,
+                              help="Match distance in reference units, default 0.5%% of its bounding box diagonal")
+    score_parser.add_argument("--transform", help="Text file with a 4x4 matrix into a scan's frame")
+    score_parser.add_argument("--icp", action="store_true", help="Refine the alignment with scaled ICP")
+    score_parser.add_argument("--class", dest="dataset_class",
+                              help="Dataset class to report under, default from image count and resolution")
+
+    report_parser = subparsers.add_parser("report", help="Pareto report of scored folders per dataset class")
+    report_parser.add_argument("root", help="Result folder, or a folder containing result folders")
+    report_parser.add_argument("--history", default=settings.RUN_HISTORY_PATH, help="Run history database")
+    report_parser.add_argument("--margin", type=float, default=DEFAULT_FSCORE_MARGIN,
+                               help="F-score difference treated as no difference")
+    report_parser.add_argument("--json", help="Also write the report to this file")
+
+    args = parser.parse_args()
+    return score(args) if args.command == "score" else report(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,12 +11,18 @@ streamlit_app_dir = os.path.dirname(os.path.abspath(__file__))
 if streamlit_app_dir not in sys.path:
     sys.path.append(streamlit_app_dir)
 
+_imports_started = time.perf_counter()
+
 from src.app.components.sidebar import render_sidebar
 from src.app.components.upload import render_upload
 from src.app.components.viewer import render_viewer
 from src.app.components.logs import render_logs, add_log
+from src.app.components.diagnostics import render_startup_report, render_profiles
+from src.app.components.roi import render_roi_controls
 from src.app.logic import run_reconstruction_pipeline
 
+APP_IMPORT_SECONDS = time.perf_counter() - _imports_started
+
 st.set_page_config(
     page_title="Object Reconstruction",
     page_icon="🧊",
@@ -28,11 +34,18 @@ st.title("Object Reconstruction Pipeline")
 
 def main():
     config = render_sidebar()
+    render_startup_report(APP_IMPORT_SECONDS)
     
     result_path = os.path.join(streamlit_app_dir, "test", "result")
+    config.update(render_roi_controls(result_path))
     
     col1, col2 = st.columns([1, 2])
     
+    with col2:
+        st.header("3D Visualization")
+        viewer_slot = st.empty()
+    preview_shown = False
+    
     with col1:
         st.header("Dataset")
         dataset_path = render_upload()
@@ -57,8 +70,19 @@ def main():
                      logs_all = "".join(st.session_state.logs)
                      log_container.text_area("Console Output", value=logs_all, height=300, key=f"log_view_{len(st.session_state.logs)}", disabled=True)
 
+                 def show_preview(stage_name):
+                     # Let operators judge coverage while the dense stages run
+                     nonlocal preview_shown
+                     if stage_name == "preview":
+                         preview_shown = True
+                         with viewer_slot.container():
+                             render_viewer(result_path, config["profiling"])
+
                  with st.spinner("Processing... This may take a while."):
-                     success = run_reconstruction_pipeline(dataset_path, result_path, config, log_callback=live_log_callback)
+                     success = run_reconstruction_pipeline(
+                         dataset_path, result_path, config,
+                         log_callback=live_log_callback, stage_callback=show_preview,
+                     )
                  
                  if success:
                      st.success("Pipeline completed!")
@@ -67,9 +91,12 @@ def main():
              else:
                  st.error("Please upload or select a dataset first.")
 
-    with col2:
-        st.header("3D Visualization")
-        render_viewer(result_path)
+        render_profiles(result_path)
+
+    # Rendering the same charts twice in one run raises duplicate element errors
+    if not preview_shown:
+        with viewer_slot.container():
+            render_viewer(result_path, config["profiling"])
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
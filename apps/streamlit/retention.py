@@ -0,0 +1,91 @@
+"""
+Disk usage report and garbage collection for job result folders.
+
+Usage:
+    python apps/streamlit/retention.py report test/api_jobs
+    python apps/streamlit/retention.py gc test/api_jobs --policy images_temp=keep-final-only --dry-run
+"""
+
+import argparse
+import os
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+streamlit_app_dir = os.path.dirname(os.path.abspath(__file__))
+if streamlit_app_dir not in sys.path:
+    sys.path.append(streamlit_app_dir)
+
+from src.retention import ARTIFACTS, collect_garbage, disk_usage, find_job_dirs, resolve_policies
+
+
+def _format_size(num_bytes: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if num_bytes < 1024:
+            return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} TB"
+
+
+def _parse_policies(items: list) -> dict:
+    policies = {}
+    for item in items or []:
+        name, sep, policy = item.partition("=")
+        if not sep:
+            raise SystemExit(f"Expected ARTIFACT=POLICY, got '{item}'")
+        policies[name.strip()] = policy.strip()
+    return policies
+
+
+def report(job_dirs: list) -> None:
+    grand_total = 0
+    for job_dir in job_dirs:
+        usage = disk_usage(job_dir)
+        grand_total += usage["total"]
+        print(f"\n{job_dir}: {_format_size(usage['total'])}")
+        for artifact in ARTIFACTS:
+            size = usage["artifacts"].get(artifact.name)
+            if size is not None:
+                kind = "final" if artifact.final else "intermediate"
+                print(f"  {artifact.name:<20} {_format_size(size):>10}  {kind}")
+        if usage["other"]:
+            print(f"  {'other':<20} {_format_size(usage['other']):>10}")
+    print(f"\n{len(job_dirs)} jobs, {_format_size(grand_total)} in total")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report and reclaim disk used by reconstruction jobs.")
+    parser.add_argument("command", choices=("report", "gc"))
+    parser.add_argument("root", help="Result folder, or a folder containing result folders")
+    parser.add_argument("--policy", action="append", metavar="ARTIFACT=POLICY",
+                        help="Override a retention policy, e.g. mvs_scenes=keep-for-resume:3")
+    parser.add_argument("--dry-run", action="store_true", help="Only list what would be removed")
+    args = parser.parse_args()
+
+    job_dirs = find_job_dirs(args.root)
+    if not job_dirs:
+        print(f"No job folders found under {args.root}")
+        return 0
+
+    if args.command == "report":
+        report(job_dirs)
+        return 0
+
+    policies = _parse_policies(args.policy)
+    try:
+        resolved = resolve_policies(policies)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    print("Policies: " + ", ".join(f"{name}={policy}" for name, policy in resolved.items()))
+
+    freed = 0
+    for job_dir in job_dirs:
+        freed += sum(collect_garbage(job_dir, policies, dry_run=args.dry_run).values())
+    print(f"{'Would free' if args.dry_run else 'Freed'} {_format_size(freed)} across {len(job_dirs)} jobs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,14 @@
+"""HTTP API module for submitting and monitoring reconstruction jobs."""
+
+from .jobs import Job, JobManager, ARTIFACT_PATTERNS
+from .server import ApiServer, serve
+from .stub import stub_pipeline
+
+__all__ = [
+    "Job",
+    "JobManager",
+    "ARTIFACT_PATTERNS",
+    "ApiServer",
+    "serve",
+    "stub_pipeline",
+]
@@ -0,0 +1,258 @@
+"""
+In-process job management for the HTTP API.
+
+Jobs run on a thread pool so that submitting and polling never wait for the
+pipeline. Every job keeps its inputs and outputs in its own directory and
+an append-only log that readers can follow while the job runs.
+"""
+
+import os
+import shutil
+import tarfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+
+from ..config import RunConfig
+from ..pipeline import IMAGE_EXTENSIONS, JobJournal, run_job
+
+# Files in a job's result directory that may be downloaded
+ARTIFACT_PATTERNS = (
+    "result.obj",
+    "result.mtl",
+    "result*.png",
+    "result*.jpg",
+    "result*.jpeg",
+    "scene_dense.ply",
+    "scene_dense_mesh.ply",
+    "scene_dense_mesh_refine.ply",
+)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class Job:
+    """State of one submitted job, safe to read from request threads."""
+
+    def __init__(self, job_id: str, job_dir: str, dataset_path: str, config: RunConfig):
+        self.id = job_id
+        self.job_dir = job_dir
+        self.dataset_path = dataset_path
+        self.result_path = os.path.join(job_dir, "result")
+        self.config = config
+        self.status = QUEUED
+        self.progress = 0.0
+        self.stage = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._logs = []
+        self._changed = threading.Condition()
+
+    def append_log(self, msg: str) -> None:
+        with self._changed:
+            self._logs.append(msg)
+            self._changed.notify_all()
+
+    def set_progress(self, fraction: float, text: str) -> None:
+        with self._changed:
+            self.progress = fraction
+            self.stage = text
+            self._changed.notify_all()
+
+    def set_status(self, status: str, error: str = None) -> None:
+        with self._changed:
+            self.status = status
+            self.error = error
+            if status in (COMPLETED, FAILED):
+                self.finished_at = time.time()
+            self._changed.notify_all()
+
+    @property
+    def done(self) -> bool:
+        return self.status in (COMPLETED, FAILED)
+
+    def wait_for_logs(self, offset: int, timeout: float) -> tuple:
+        """
+        Block until log lines past offset exist or the job finishes.
+
+        Returns:
+            (new lines, finished) where finished is True once the job is done
+            and every line has been returned
+        """
+        with self._changed:
+            if len(self._logs) <= offset and not self.done:
+                self._changed.wait(timeout)
+            lines = self._logs[offset:]
+            return lines, self.done and offset + len(lines) == len(self._logs)
+
+    def to_dict(self) -> dict:
+        journal = JobJournal(self.result_path) if os.path.isdir(self.result_path) else None
+        return {
+            "id": self.id,
+            "status": self.status,
+            "progress": self.progress,
+            "stage": self.stage,
+            "stages": journal.data.get("stages", {}) if journal else {},
+            "error": self.error,
+            "quality_profile": self.config.quality_profile,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def _safe_extract(archive_path: str, target_dir: str) -> None:
+    """Extract a zip or tar archive, refusing entries outside target_dir."""
+    target = os.path.realpath(target_dir)
+
+    def check(name):
+        path = os.path.realpath(os.path.join(target, name))
+        if os.path.commonpath([target, path]) != target:
+            raise ValueError(f"Archive entry escapes the target directory: {name}")
+
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            for name in archive.namelist():
+                check(name)
+            archive.extractall(target)
+    elif tarfile.is_tarfile(archive_path):
+        with tarfile.open(archive_path) as archive:
+            for member in archive.getmembers():
+                check(member.name)
+                if not (member.isfile() or member.isdir()):
+                    raise ValueError(f"Unsupported archive entry: {member.name}")
+            archive.extractall(target)
+    else:
+        raise ValueError("Uploaded file is not a zip or tar archive")
+
+
+def _find_image_dir(root: str) -> str:
+    """The first directory under root that directly contains images."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        if any(f.lower().endswith(IMAGE_EXTENSIONS) for f in filenames):
+            return dirpath
+    raise ValueError("Archive does not contain any images")
+
+
+class JobManager:
+    """
+    Runs pipeline jobs in the background and tracks their state.
+
+    Args:
+        jobs_root: Directory receiving one sub-directory per job
+        max_workers: Maximum number of jobs running at once
+        pipeline_fn: Callable with run_job's signature, replaceable by a
+            stub for local testing
+        datasets_root: Directory whose sub-folders submit_path accepts, or
+            None to only accept uploaded archives
+    """
+
+    def __init__(self, jobs_root: str, max_workers: int = 1, pipeline_fn=run_job, datasets_root: str = None):
+        self.jobs_root = jobs_root
+        self.pipeline_fn = pipeline_fn
+        self.datasets_root = datasets_root
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        os.makedirs(jobs_root, exist_ok=True)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _new_job_dir(self) -> tuple:
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = os.path.join(self.jobs_root, job_id)
+        os.makedirs(job_dir)
+        return job_id, job_dir
+
+    def submit_archive(self, archive_path: str, config: RunConfig) -> Job:
+        """Extract an uploaded image archive into a new job and queue it."""
+        job_id, job_dir = self._new_job_dir()
+        images_root = os.path.join(job_dir, "images")
+        try:
+            _safe_extract(archive_path, images_root)
+            dataset_path = _find_image_dir(images_root)
+        except Exception:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+        return self._enqueue(Job(job_id, job_dir, dataset_path, config))
+
+    def submit_path(self, dataset_path: str, config: RunConfig) -> Job:
+        """
+        Queue a job for a dataset folder already present on this host.
+
+        Args:
+            dataset_path: Folder inside datasets_root, absolute or relative to it
+            config: Run configuration
+
+        Raises:
+            PermissionError: If no datasets root is configured or the folder
+                lies outside it
+            ValueError: If the folder does not exist
+        """
+        if self.datasets_root is None:
+            raise PermissionError("Submitting datasets by path is disabled on this server")
+        root = os.path.realpath(self.datasets_root)
+        dataset_path = os.path.realpath(os.path.join(root, dataset_path))
+        if os.path.commonpath([root, dataset_path]) != root:
+            raise PermissionError(f"Dataset paths must be inside {self.datasets_root}")
+        if not os.path.isdir(dataset_path):
+            raise ValueError(f"Dataset path does not exist: {dataset_path}")
+        job_id, job_dir = self._new_job_dir()
+        return self._enqueue(Job(job_id, job_dir, dataset_path, config))
+
+    def _enqueue(self, job: Job) -> Job:
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def _run(self, job: Job) -> None:
+        job.set_status(RUNNING)
+        try:
+            self.pipeline_fn(
+                job.dataset_path,
+                job.result_path,
+                job.config,
+                log_callback=job.append_log,
+                progress_callback=job.set_progress,
+            )
+            job.set_status(COMPLETED)
+        except Exception as e:
+            job.append_log(f"An error occurred: {e}\n")
+            job.set_status(FAILED, str(e))
+
+    def get(self, job_id: str) -> Job:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> list:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def artifacts(self, job: Job) -> list:
+        """Downloadable files of a job with their sizes."""
+        if not os.path.isdir(job.result_path):
+            return []
+        return [
+            {"name": name, "size": os.path.getsize(os.path.join(job.result_path, name))}
+            for name in sorted(os.listdir(job.result_path))
+            if any(fnmatch(name, pattern) for pattern in ARTIFACT_PATTERNS)
+            and os.path.isfile(os.path.join(job.result_path, name))
+        ]
+
+    def artifact_path(self, job: Job, name: str) -> str:
+        """Absolute path of a downloadable artifact, or None if not allowed."""
+        if os.path.basename(name) != name:
+            return None
+        if not any(fnmatch(name, pattern) for pattern in ARTIFACT_PATTERNS):
+            return None
+        path = os.path.join(job.result_path, name)
+        return path if os.path.isfile(path) else None
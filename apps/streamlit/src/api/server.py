@@ -0,0 +1,342 @@
+"""
+Lightweight HTTP API over the reconstruction pipeline.
+
+Endpoints:
+    POST /jobs                          Submit a job. The body is either an
+                                        image archive (zip or tar) with the
+                                        run configuration in the query string,
+                                        or JSON {"dataset_path": ..., <RunConfig
+                                        fields>} for data already on the host,
+                                        below the manager's datasets root.
+    GET  /jobs                          List jobs.
+    GET  /jobs/<id>                     Job status and per-stage progress.
+    GET  /jobs/<id>/logs[?follow=1]     Job log, streamed while running if
+                                        follow is set.
+    GET  /jobs/<id>/artifacts           Downloadable outputs.
+    GET  /jobs/<id>/artifacts/<name>    Download an output; supports Range.
+"""
+
+import json
+import os
+import re
+import tempfile
+from dataclasses import fields
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Union, get_args, get_origin
+from urllib.parse import parse_qs, unquote, urlparse
+
+from ..config import RunConfig
+from .jobs import JobManager
+
+# Block size used when reading uploads and streaming downloads
+CHUNK_SIZE = 1024 * 1024
+# How long a follow=1 log request waits for new output before a keep-alive check
+LOG_POLL_TIMEOUT = 5.0
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_TRUE_VALUES = ("1", "true", "yes", "on")
+_FALSE_VALUES = ("0", "false", "no", "off")
+_NONE_VALUES = ("", "none", "null")
+# Query parameters accepted under the names RunConfig.from_dict accepts
+_QUERY_ALIASES = {"quality": "quality_profile", "openmvs": "openmvs_overrides", "colmap": "colmap_overrides"}
+# Host paths clients must not choose: the binaries to execute and the shared cache
+SERVER_ONLY_FIELDS = ("openmvs_bin_path", "feature_cache_path")
+
+
+def _parse_query_value(name: str, text: str, annotation):
+    """
+    Convert a query string value to the type of the RunConfig field it sets.
+
+    Lists are comma-separated, mappings are JSON and optional fields accept
+    "none".
+
+    Raises:
+        ValueError: If the text does not parse as the field's type
+    """
+    origin = get_origin(annotation)
+    if origin is Union:
+        if text.strip().lower() in _NONE_VALUES:
+            return None
+        annotation = next(arg for arg in get_args(annotation) if arg is not type(None))
+        origin = get_origin(annotation)
+    if origin is tuple:
+        item = get_args(annotation)[0]
+        return [_parse_query_value(name, part.strip(), item) for part in text.split(",") if part.strip()]
+    if origin is not None:
+        try:
+            return json.loads(text)
+        except ValueError as e:
+            raise ValueError(f"{name} must be a JSON object: {e}") from e
+    if annotation is bool:
+        if text.strip().lower() in _TRUE_VALUES:
+            return True
+        if text.strip().lower() in _FALSE_VALUES:
+            return False
+        raise ValueError(f"{name} must be true or false, got {text!r}")
+    if annotation in (int, float):
+        try:
+            return annotation(text)
+        except ValueError:
+            kind = "an integer" if annotation is int else "a number"
+            raise ValueError(f"{name} must be {kind}, got {text!r}") from None
+    return text
+
+
+def _check_client_fields(data: dict) -> None:
+    forbidden = sorted(set(data) & set(SERVER_ONLY_FIELDS))
+    if forbidden:
+        raise ValueError(f"{', '.join(forbidden)} can only be set on the server")
+
+
+def _config_from_query(query: dict) -> RunConfig:
+    """Build the run configuration of an archive upload from its query string."""
+    field_types = {f.name: f.type for f in fields(RunConfig)}
+    data = {}
+    for key, values in query.items():
+        name = _QUERY_ALIASES.get(key, key)
+        # Unknown keys are passed through for from_dict to reject
+        data[key] = _parse_query_value(key, values[-1], field_types[name]) if name in field_types else values[-1]
+    _check_client_fields(data)
+    return RunConfig.from_dict(data)
+
+
+def _parse_range(header: str, size: int):
+    """
+    Parse a single-range Range header.
+
+    Returns:
+        (start, end) inclusive byte offsets, or None if the header is absent
+        or uses an unsupported form
+
+    Raises:
+        ValueError: If the range cannot be satisfied
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if first == "" and last == "":
+        return None
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "sFMReconstructionAPI/1.0"
+
+    @property
+    def manager(self) -> JobManager:
+        return self.server.manager
+
+    def log_message(self, format, *args):
+        if not getattr(self.server, "quiet", False):
+            super().log_message(format, *args)
+
+    def _send_json(self, payload, status=HTTPStatus.OK, send_body: bool = True) -> None:
+        body = json.dumps(payload, indent=2).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _send_error(self, status, message: str, send_body: bool = True) -> None:
+        self._send_json({"error": message}, status, send_body)
+
+    def _route(self):
+        parsed = urlparse(self.path)
+        # Decoded per segment, so an encoded "/" stays inside its segment
+        parts = [unquote(p) for p in parsed.path.split("/") if p]
+        return parts, parse_qs(parsed.query)
+
+    def do_POST(self):
+        parts, query = self._route()
+        if parts != ["jobs"]:
+            self._send_error(HTTPStatus.NOT_FOUND, "Not found")
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = 0
+        if length <= 0:
+            self._send_error(HTTPStatus.LENGTH_REQUIRED, "A request body with Content-Length is required")
+            return
+
+        content_type = self.headers.get("Content-Type", "").split(";")[0].strip()
+        try:
+            if content_type == "application/json":
+                data = json.loads(self.rfile.read(length))
+                if not isinstance(data, dict):
+                    raise ValueError("The JSON body must be an object")
+                dataset_path = data.pop("dataset_path", None)
+                if not isinstance(dataset_path, str):
+                    raise ValueError("The JSON body needs a dataset_path string")
+                _check_client_fields(data)
+                job = self.manager.submit_path(dataset_path, RunConfig.from_dict(data))
+            else:
+                job = self._submit_archive(length, _config_from_query(query))
+        except PermissionError as e:
+            self._send_error(HTTPStatus.FORBIDDEN, str(e))
+            return
+        except (ValueError, KeyError) as e:
+            self._send_error(HTTPStatus.BAD_REQUEST, str(e))
+            return
+
+        payload = job.to_dict()
+        payload["status_url"] = f"/jobs/{job.id}"
+        self._send_json(payload, HTTPStatus.ACCEPTED)
+
+    def _submit_archive(self, length: int, config: RunConfig):
+        # Spool the upload to disk so multi-GB archives never sit in memory
+        with tempfile.NamedTemporaryFile(dir=self.manager.jobs_root, suffix=".upload", delete=False) as f:
+            tmp_path = f.name
+            remaining = length
+            while remaining > 0:
+                chunk = self.rfile.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                f.write(chunk)
+                remaining -= len(chunk)
+        try:
+            if remaining:
+                raise ValueError("Upload ended before Content-Length bytes were received")
+            return self.manager.submit_archive(tmp_path, config)
+        finally:
+            os.remove(tmp_path)
+
+    def do_GET(self):
+        self._handle_get(send_body=True)
+
+    def do_HEAD(self):
+        self._handle_get(send_body=False)
+
+    def _handle_get(self, send_body: bool):
+        parts, query = self._route()
+        if parts == ["jobs"]:
+            self._send_json([job.to_dict() for job in self.manager.list()], send_body=send_body)
+            return
+        if len(parts) < 2 or parts[0] != "jobs":
+            self._send_error(HTTPStatus.NOT_FOUND, "Not found", send_body)
+            return
+
+        job = self.manager.get(parts[1])
+        if job is None:
+            self._send_error(HTTPStatus.NOT_FOUND, f"Unknown job {parts[1]}", send_body)
+            return
+
+        if len(parts) == 2:
+            self._send_json(job.to_dict(), send_body=send_body)
+        elif parts[2:] == ["logs"]:
+            follow = query.get("follow", ["0"])[-1] in ("1", "true")
+            self._stream_logs(job, follow, send_body)
+        elif parts[2:] == ["artifacts"]:
+            self._send_json(self.manager.artifacts(job), send_body=send_body)
+        elif len(parts) == 4 and parts[2] == "artifacts":
+            self._send_artifact(job, parts[3], send_body)
+        else:
+            self._send_error(HTTPStatus.NOT_FOUND, "Not found", send_body)
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+
+    def _stream_logs(self, job, follow: bool, send_body: bool = True) -> None:
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if not send_body:
+            return
+
+        offset = 0
+        try:
+            while True:
+                lines, finished = job.wait_for_logs(offset, LOG_POLL_TIMEOUT if follow else 0)
+                if lines:
+                    self._write_chunk("".join(lines).encode("utf-8"))
+                    self.wfile.flush()
+                    offset += len(lines)
+                if finished or not follow:
+                    break
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _send_artifact(self, job, name: str, send_body: bool) -> None:
+        path = self.manager.artifact_path(job, name)
+        if path is None:
+            self._send_error(HTTPStatus.NOT_FOUND, f"No artifact named {name}", send_body)
+            return
+
+        size = os.path.getsize(path)
+        try:
+            byte_range = _parse_range(self.headers.get("Range"), size)
+        except ValueError:
+            self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        start, end = byte_range if byte_range else (0, size - 1)
+        length = end - start + 1 if size else 0
+
+        self.send_response(HTTPStatus.PARTIAL_CONTENT if byte_range else HTTPStatus.OK)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Disposition", f'attachment; filename="{name}"')
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(length))
+        if byte_range:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if not send_body:
+            return
+
+        try:
+            with open(path, "rb") as f:
+                f.seek(start)
+                remaining = length
+                while remaining > 0:
+                    chunk = f.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, manager: JobManager, quiet: bool = False):
+        super().__init__(address, ApiRequestHandler)
+        self.manager = manager
+        self.quiet = quiet
+
+
+def serve(host: str, port: int, manager: JobManager, quiet: bool = False) -> None:
+    """Serve the API until interrupted."""
+    server = ApiServer((host, port), manager, quiet=quiet)
+    print(f"Serving reconstruction API on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        manager.shutdown()
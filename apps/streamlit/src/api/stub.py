@@ -0,0 +1,49 @@
+"""
+Stand-in pipeline for exercising the API without COLMAP or OpenMVS.
+"""
+
+import os
+import time
+
+from ..pipeline import PipelineError, find_images
+
+_STUB_STAGES = ("sparse", "convert", "undistort", "dense")
+
+
+def stub_pipeline(
+    dataset_path: str,
+    result_path: str,
+    config,
+    log_callback=None,
+    progress_callback=None,
+    stage_seconds: float = 0.5,
+    **kwargs,
+) -> bool:
+    """
+    Mimic run_job: report progress per stage and write placeholder outputs.
+
+    The artifacts have the same names as real outputs so downloads can be
+    tested end to end.
+    """
+    color_files = find_images(dataset_path)
+    if not color_files:
+        raise PipelineError(f"No images found in {dataset_path}")
+
+    os.makedirs(result_path, exist_ok=True)
+    for index, stage in enumerate(_STUB_STAGES):
+        if progress_callback:
+            progress_callback(index / len(_STUB_STAGES), f"Step {index + 1}/{len(_STUB_STAGES)}: {stage}...")
+        if log_callback:
+            log_callback(f"[stub] {stage} on {len(color_files)} images ({config.quality_profile})\n")
+        time.sleep(stage_seconds)
+
+    with open(os.path.join(result_path, "result.obj"), "w") as f:
+        f.write("mtllib result.mtl\nv 0 0 0\nv 1 0 0\nv 0 1 0\nvt 0 0\nvt 1 0\nvt 0 1\nf 1/1 2/2 3/3\n")
+    with open(os.path.join(result_path, "scene_dense.ply"), "wb") as f:
+        f.write(b"ply\nformat binary_little_endian 1.0\nelement vertex 0\nproperty float x\n"
+                b"property float y\nproperty float z\nend_header\n")
+        f.write(os.urandom(1024 * 1024))
+
+    if progress_callback:
+        progress_callback(1.0, "Pipeline Finished Successfully!")
+    return True
@@ -0,0 +1,69 @@
+import os
+
+import streamlit as st
+
+from apps.streamlit.src.pipeline.profiling import DEFAULT_TOP_N, PROFILES_DIR_NAME, read_profiles
+from apps.streamlit.src.app.startup import APP_MODULES, LAZY_MODULES, measure_import_times, summarize_import_times
+
+@st.cache_data(show_spinner="Measuring import times...")
+def _import_report(modules):
+    return summarize_import_times(measure_import_times(modules))
+
+def render_startup_report(app_import_seconds):
+    with st.sidebar:
+        with st.expander("Startup Diagnostics"):
+            st.caption(f"App modules imported in {app_import_seconds:.2f} s in this process.")
+            if st.button("Measure import cost per module"):
+                for title, modules in (("Cold start", APP_MODULES), ("Loaded on first use", LAZY_MODULES)):
+                    st.markdown(f"**{title}**")
+                    st.table([
+                        {"Package": package, "Seconds": round(seconds, 3), "Modules": count}
+                        for package, seconds, count in _import_report(modules)
+                    ])
+
+def render_profiles(result_path):
+    summaries = read_profiles(result_path)
+    if not summaries:
+        return
+    with st.expander("Python Profiles"):
+        st.caption(
+            "Native time is spent in built-in functions: waiting on COLMAP and OpenMVS, "
+            "pycolmap, Open3D and NumPy. Python time is interpreted code, callbacks included."
+        )
+        st.table([
+            {
+                "Section": summary["name"],
+                "Wall s": round(summary["wall_s"], 2),
+                "Python s": round(summary["python_s"], 2),
+                "Native s": round(summary["native_s"], 2),
+                "Python share": f"{summary['python_share']:.1%}",
+                "Log calls": summary["callbacks"].get("log", {}).get("calls", 0),
+                "Log s": round(summary["callbacks"].get("log", {}).get("seconds", 0.0), 2),
+                "Peak MB": round(summary["memory"]["peak_mb"], 1) if "memory" in summary else None,
+            }
+            for summary in summaries
+        ])
+
+        by_name = {summary["name"]: summary for summary in summaries}
+        name = st.selectbox("Section", list(by_name))
+        top_n = st.slider("Top functions", 5, DEFAULT_TOP_N, 15, step=5)
+        summary = by_name[name]
+        st.table([
+            {
+                "Function": entry["function"],
+                "Calls": entry["calls"],
+                "Own s": round(entry["tottime"], 3),
+                "Cumulative s": round(entry["cumtime"], 3),
+            }
+            for entry in summary["top_functions"][:top_n]
+        ])
+        if "memory" in summary:
+            st.markdown(
+                f"**Allocations** peak {summary['memory']['peak_mb']:.1f} MB, "
+                f"{summary['memory']['retained_mb']:.1f} MB still held at the end"
+            )
+            st.table([
+                {"Location": entry["location"], "MB": round(entry["size_mb"], 2), "Blocks": entry["count"]}
+                for entry in summary["memory"]["top_allocations"][:top_n]
+            ])
+        st.caption(f"Full statistics: {os.path.join(result_path, PROFILES_DIR_NAME, name)}.prof (pstats or snakeviz)")
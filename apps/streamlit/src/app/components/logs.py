@@ -1,7 +1,7 @@
 import streamlit as st
 import time
 
-def render_logs()
+def render_logs():
     st.subheader("Pipeline Logs")
     
     if "logs" not in st.session_state:
@@ -0,0 +1,54 @@
+import streamlit as st
+
+from apps.streamlit.src.pipeline.roi import read_masks_manifest, read_roi
+
+_MODE_LABELS = {"auto": "Auto", "manual": "Manual", "off": "Whole scene"}
+
+def render_roi_controls(result_path):
+    """ROI settings for the run config, prefilled from the result's current ROI."""
+    with st.sidebar:
+        st.subheader("Region of Interest")
+        mode = st.radio(
+            "Dense reconstruction covers",
+            options=list(_MODE_LABELS),
+            format_func=_MODE_LABELS.get,
+            horizontal=True,
+            help="Auto boxes the object the cameras look at in the sparse cloud. "
+                 "Depth is only estimated inside the box, which skips the background.",
+        )
+
+        roi = read_roi(result_path)
+        has_box = roi is not None and roi.get("center") is not None
+        if has_box:
+            extent = " x ".join(f"{v:.3g}" for v in roi["extent"])
+            caption = f"Current ROI ({roi['source']}): {extent}"
+            manifest = read_masks_manifest(result_path)
+            if manifest:
+                caption += f", {manifest['coverage']:.0%} of the image area on average"
+            st.caption(caption)
+        elif roi is not None:
+            st.caption("No object found in the last run, the whole scene was kept.")
+
+        if mode != "manual":
+            return {"roi": mode}
+
+        if not has_box:
+            st.info("Run once with Auto to start from the estimated box.")
+        center = roi["center"] if has_box else [0.0, 0.0, 0.0]
+        extent = roi["extent"] if has_box else [1.0, 1.0, 1.0]
+        st.caption("Box in sparse model units, along the box axes")
+        columns = st.columns(3)
+        new_center, new_extent = [], []
+        for i, (column, axis) in enumerate(zip(columns, "xyz")):
+            with column:
+                new_center.append(st.number_input(f"Center {axis}", value=float(center[i]), format="%.4f"))
+                new_extent.append(st.number_input(f"Size {axis}", value=float(extent[i]), min_value=0.0, format="%.4f"))
+
+        return {
+            "roi": "manual",
+            "roi_box": {
+                "center": new_center,
+                "extent": new_extent,
+                "rotation": roi["rotation"] if has_box else None,
+            },
+        }
@@ -1,5 +1,5 @@
 import streamlit as st
-from apps.streamlit.src.config.settings import QUALITY_PROFILE, COLMAP_DEVICE
+from apps.streamlit.src.config.settings import QUALITY_PROFILE, PROFILING
 
 def render_sidebar():
     with st.sidebar:
@@ -22,7 +22,16 @@ def render_sidebar():
             help="Select the computing device for Colmap/OpenMVS."
         )
         
+        st.subheader("Diagnostics")
+        profiling = st.selectbox(
+            "Python Profiling",
+            options=["off", "cpu", "memory"],
+            index=["off", "cpu", "memory"].index(PROFILING),
+            help="Profile each stage and the viewer with cProfile; memory also tracks allocations with tracemalloc and is slower.",
+        )
+        
         return {
             "quality": quality,
-            "device": device
+            "device": device,
+            "profiling": profiling,
         }
@@ -1,14 +1,33 @@
 import streamlit as st
-import plotly.graph_objects as go
-import trimesh
-import numpy as np
 import os
+from contextlib import nullcontext
 
-def render_viewer(result_path):
+from apps.streamlit.src.pipeline.preview import preview_paths
+from apps.streamlit.src.pipeline.profiling import PROFILES_DIR_NAME, Profiler
+from apps.streamlit.src.app.components.webgl_viewer import (
+    point_cloud_levels,
+    mesh_levels,
+    render_webgl_points,
+    render_webgl_mesh,
+)
+
+# Geometry is drawn by the WebGL component from binary level files. They are
+# published once per path and modification time, so reruns and other
+# sessions reuse them without reading the source files again.
+
+def render_viewer(result_path, profiling="off"):
     if not result_path:
         st.info("No results to show yet.")
         return 
-    
+
+    # Loading and encoding for the viewer runs in this process, profile it like a stage
+    profiler = None
+    if profiling != "off":
+        profiler = Profiler(os.path.join(result_path, PROFILES_DIR_NAME), memory=profiling == "memory")
+    with profiler.section("viewer") if profiler else nullcontext():
+        _render_tabs(result_path)
+
+def _render_tabs(result_path):
     tab1, tab2 = st.tabs(["Point Cloud", "Mesh"])
     
     with tab1:
@@ -18,42 +37,24 @@ def render_viewer(result_path):
         _render_mesh(result_path)
 
 def _render_point_cloud(result_path):
+    preview_cloud, _ = preview_paths(result_path)
     ply_file = os.path.join(result_path, "scene_dense.ply")
+    if not os.path.exists(ply_file):
+        ply_file = preview_cloud
     if not os.path.exists(ply_file):
         ply_file = os.path.join(result_path, "sparse/0/points3D.ply")
         
     if os.path.exists(ply_file):
         st.caption(f"Visualizing: {ply_file}")
+        if ply_file == preview_cloud:
+            st.caption("Sparse preview, replaced by the dense cloud once it is ready.")
         try:
-            pcd = trimesh.load(ply_file)
+            mtime = os.path.getmtime(ply_file)
+            index = point_cloud_levels(ply_file, mtime)
             
-            if isinstance(pcd, trimesh.points.PointCloud):
-                points = pcd.vertices
-                colors = pcd.colors if hasattr(pcd, 'colors') else None
-                
-                if len(points) > 50000:
-                    indices = np.random.choice(len(points), 50000, replace=False)
-                    points = points[indices]
-                    if colors is not None:
-                        colors = colors[indices]
-
-                marker_dict = dict(size=2)
-                if colors is not None:
-                     marker_dict['color'] = colors[:, :3] 
-
-                fig = go.Figure(
-                    data=[
-                        go.Scatter3d(
-                            x=points[:, 0],
-                            y=points[:, 1],
-                            z=points[:, 2],
-                            mode='markers',
-                            marker=marker_dict
-                        )
-                    ]
-                )
-                fig.update_layout(scene=dict(aspectmode='data'), height=500, margin=dict(r=0, l=0, b=0, t=0))
-                st.plotly_chart(fig, use_container_width=True)
+            if index is not None:
+                st.caption(f"{index['total']:,} points in {len(index['levels'])} levels of detail")
+                render_webgl_points(index)
             else:
                 st.warning("Loaded file is not a point cloud.")
         except Exception as e:
@@ -62,38 +63,23 @@ def _render_point_cloud(result_path):
         st.info("No point cloud found yet. Run the pipeline to generate one.")
 
 def _render_mesh(result_path):
-    obj_file = os.path.join(result_path, "scene_dense_mesh_textured.obj")
-    
+    obj_file = os.path.join(result_path, "result.obj")
+
+    if not os.path.exists(obj_file):
+         obj_file = os.path.join(result_path, "scene_dense_mesh_textured.obj")
     if not os.path.exists(obj_file):
          obj_file = os.path.join(result_path, "scene_dense_mesh.ply")
+    _, preview_mesh = preview_paths(result_path)
+    if not os.path.exists(obj_file):
+        obj_file = preview_mesh
 
     if os.path.exists(obj_file):
         st.caption(f"Visualizing: {obj_file}")
+        if obj_file == preview_mesh:
+            st.caption("Coarse preview from the sparse model, replaced by the dense mesh once it is ready.")
         try:
-            mesh = trimesh.load(obj_file)
-            
-            if isinstance(mesh, trimesh.base.Trimesh):
-                # Simplify mesh for web viewing if too heavy
-                if len(mesh.faces) > 20000:
-                    mesh = mesh.simplify_quadratic_decimation(20000)
-                
-                x, y, z = mesh.vertices.T
-                i, j, k = mesh.faces.T
-                
-                fig = go.Figure(
-                    data=[
-                        go.Mesh3d(
-                            x=x, y=y, z=z,
-                            i=i, j=j, k=k,
-                            color='lightpink',
-                            opacity=0.50
-                        )
-                    ]
-                )
-                fig.update_layout(scene=dict(aspectmode='data'), height=500, margin=dict(r=0, l=0, b=0, t=0))
-                st.plotly_chart(fig, use_container_width=True)
-            else:
-                st.warning("File is not a mesh.")
+            mtime = os.path.getmtime(obj_file)
+            render_webgl_mesh(mesh_levels(obj_file, mtime, result_path))
         except Exception as e:
              st.error(f"Error loading mesh: {e}")
     else:
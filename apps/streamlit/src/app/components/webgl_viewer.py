@@ -0,0 +1,246 @@
+"""
+WebGL viewer component fed with binary level files.
+
+Geometry is split into levels of detail, coarsest first, and written as
+binary files to settings.VIEWER_LEVELS_DIR. The folder is declared as a
+second component that is never rendered, so Streamlit serves it over HTTP
+like the viewer's own assets. The component only receives the file names; the frontend fetches the levels one at a time and shows each as
+soon as it is uploaded to the GPU, so a view appears after the first small
+download. Nothing large goes through the websocket, whose messages are
+capped by server.maxMessageSize (200 MB by default).
+
+Point clouds are shuffled once, so every level is a uniform sample and the
+levels together are the whole cloud. Positions are float32 xyz and colours
+uint8 rgb. Meshes are sent as quantized GLB files: the web export's LOD and
+texture tiers when they exist, otherwise encoded from the mesh file.
+
+The frontend in frontend/webgl_viewer loads three.js from its vendor
+folder, written by apps/streamlit/vendor_threejs.py, so it needs no
+internet access.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import streamlit as st
+import streamlit.components.v1 as components
+
+from apps.streamlit.src.config import settings
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "webgl_viewer")
+THREE_MODULE = os.path.join(FRONTEND_DIR, "vendor", "three", "build", "three.module.js")
+_component = components.declare_component("webgl_viewer", path=FRONTEND_DIR)
+
+# One sub-folder per dataset named after its source path, modification time
+# and encoding parameters
+LEVELS_DIR = settings.VIEWER_LEVELS_DIR
+os.makedirs(LEVELS_DIR, exist_ok=True)
+# Only declared so Streamlit serves the level files, at a URL next to the viewer's own
+_levels_component = components.declare_component("webgl_viewer_levels", path=LEVELS_DIR)
+LEVELS_INDEX_NAME = "levels.json"
+# Datasets kept in LEVELS_DIR, the least recently shown are removed first
+MAX_PUBLISHED_DATASETS = 8
+
+# Point count of the first level, each further level holds this factor more
+POINT_LOD_BASE = 65536
+POINT_LOD_FACTOR = 4
+MAX_POINTS = 20_000_000
+# Meshes above this many faces get a simplified level sent first
+MESH_LOD_MIN_FACES = 200_000
+MESH_LOD_RATIOS = (0.05,)
+MAX_TEXTURE_SIZE = 4096
+
+
+def _dataset_key(*parts) -> str:
+    return hashlib.sha1(json.dumps([str(p) for p in parts]).encode("utf-8")).hexdigest()[:16]
+
+
+def _read_published(key: str) -> dict:
+    """Index of a published dataset, marking it as recently used, or None."""
+    dataset_dir = os.path.join(LEVELS_DIR, key)
+    try:
+        with open(os.path.join(dataset_dir, LEVELS_INDEX_NAME)) as f:
+            index = json.load(f)
+        os.utime(dataset_dir)
+    except (OSError, ValueError):
+        return None
+    return index
+
+
+def _prune_published(keep: str) -> None:
+    datasets = []
+    for name in os.listdir(LEVELS_DIR):
+        path = os.path.join(LEVELS_DIR, name)
+        if name != keep and not name.startswith(".") and os.path.isdir(path):
+            datasets.append((os.path.getmtime(path), path))
+    for _, path in sorted(datasets, reverse=True)[MAX_PUBLISHED_DATASETS - 1:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _publish(key: str, files: list, index: dict) -> dict:
+    """
+    Write a dataset's level files and index where the frontend can fetch them.
+
+    Files are written to a temporary folder renamed into place, so a
+    concurrent session never sees a partial dataset.
+
+    Args:
+        files: List of (file name, bytes) pairs
+        index: Description of the levels, stored as levels.json
+
+    Returns:
+        The index with the dataset's key added
+    """
+    os.makedirs(LEVELS_DIR, exist_ok=True)
+    index = dict(index, key=key)
+    tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=LEVELS_DIR)
+    try:
+        for name, data in files:
+            with open(os.path.join(tmp_dir, name), "wb") as f:
+                f.write(data)
+        with open(os.path.join(tmp_dir, LEVELS_INDEX_NAME), "w") as f:
+            json.dump(index, f)
+        os.rename(tmp_dir, os.path.join(LEVELS_DIR, key))
+    except OSError:
+        # Published by another session in the meantime
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if _read_published(key) is None:
+            raise
+    _prune_published(keep=key)
+    return index
+
+
+def point_cloud_levels(ply_file, mtime, max_points=MAX_POINTS):
+    """
+    Publish a point cloud as nested uniform samples.
+
+    Returns:
+        Index with the dataset key, the total point count and per level the
+        positions and colors file names and point count, or None if the
+        file holds no point cloud
+    """
+    key = _dataset_key("points", os.path.abspath(ply_file), mtime, max_points, POINT_LOD_BASE, POINT_LOD_FACTOR)
+    index = _read_published(key)
+    if index is None:
+        import trimesh
+
+        files, levels = [], []
+        cloud = trimesh.load(ply_file)
+        if isinstance(cloud, trimesh.points.PointCloud) and len(cloud.vertices):
+            vertices = np.asarray(cloud.vertices, dtype=np.float64)
+            # Centre before dropping to float32, reconstructions are often far from the origin
+            points = (vertices - vertices.mean(axis=0)).astype(np.float32)
+            colors = np.asarray(cloud.colors, dtype=np.uint8)[:, :3] if len(cloud.colors) else None
+            order = np.random.default_rng(0).permutation(len(points))[:max_points]
+
+            start, stop = 0, POINT_LOD_BASE
+            while start < len(order):
+                indices = order[start:stop]
+                level_colors = colors[indices] if colors is not None else np.full((len(indices), 3), 200, np.uint8)
+                i = len(levels)
+                files.append((f"positions_{i}.bin", np.ascontiguousarray(points[indices]).tobytes()))
+                files.append((f"colors_{i}.bin", np.ascontiguousarray(level_colors).tobytes()))
+                levels.append({"positions": f"positions_{i}.bin", "colors": f"colors_{i}.bin", "points": len(indices)})
+                start, stop = stop, stop * POINT_LOD_FACTOR
+        index = _publish(key, files, {"levels": levels, "total": sum(level["points"] for level in levels)})
+    return index if index["levels"] else None
+
+
+def _web_export_levels(result_path: str, max_texture_size: int) -> list:
+    manifest_path = os.path.join(result_path, "web", "manifest.json")
+    result_obj = os.path.join(result_path, "result.obj")
+    if not os.path.exists(manifest_path) or not os.path.exists(result_obj):
+        return []
+    if os.path.getmtime(manifest_path) < os.path.getmtime(result_obj):
+        return []
+    with open(manifest_path) as f:
+        variants = json.load(f)["variants"]
+
+    lods = sorted((v for v in variants if v["lod_ratio"] < 1.0), key=lambda v: v["lod_ratio"])
+    full = sorted(
+        (v for v in variants if v["lod_ratio"] == 1.0 and v["texture_size"] <= max_texture_size),
+        key=lambda v: v["texture_size"],
+    )
+    levels = []
+    for variant in lods[:1] + full:
+        with open(os.path.join(result_path, "web", variant["file"]), "rb") as f:
+            levels.append(f.read())
+    return levels
+
+
+def mesh_levels(mesh_file, mtime, result_path=None, max_texture_size=MAX_TEXTURE_SIZE):
+    """
+    Publish the GLB levels of a mesh, coarsest first.
+
+    The textured OpenMVS result uses the web export when it is current,
+    other meshes are encoded on the fly.
+
+    Returns:
+        Index with the dataset key and per level the GLB file name and size
+    """
+    use_export = bool(result_path) and os.path.basename(mesh_file) == "result.obj"
+    export_mtime = None
+    if use_export:
+        manifest_path = os.path.join(result_path, "web", "manifest.json")
+        export_mtime = os.path.getmtime(manifest_path) if os.path.exists(manifest_path) else None
+    key = _dataset_key("gltf", os.path.abspath(mesh_file), mtime, export_mtime, max_texture_size)
+    index = _read_published(key)
+    if index is not None:
+        return index
+
+    glbs = _web_export_levels(result_path, max_texture_size) if use_export else []
+    if not glbs:
+        from apps.streamlit.src.processing.gltf import mesh_file_glb_levels
+
+        glbs = mesh_file_glb_levels(
+            mesh_file,
+            texture_size=min(2048, max_texture_size),
+            lod_ratios=MESH_LOD_RATIOS,
+            lod_min_faces=MESH_LOD_MIN_FACES,
+        )
+    files = [(f"level_{i}.glb", data) for i, data in enumerate(glbs)]
+    levels = [{"file": name, "bytes": len(data)} for name, data in files]
+    return _publish(key, files, {"levels": levels})
+
+
+def _check_vendored() -> bool:
+    if os.path.exists(THREE_MODULE):
+        return True
+    st.error("three.js is missing from the viewer, run `python apps/streamlit/vendor_threejs.py` once.")
+    return False
+
+
+def _levels_base(index: dict) -> str:
+    # Relative to the viewer's page, served from /component/<viewer name>/
+    return f"../{_levels_component.name}/{index['key']}"
+
+
+def render_webgl_points(index: dict, point_size: float = 2.0, height: int = 500, key=None):
+    """
+    Show point cloud levels published by point_cloud_levels.
+
+    Args:
+        index: The published levels, the frontend only rebuilds the scene
+            when their key changes
+        point_size: Point size in screen pixels
+    """
+    if not _check_vendored():
+        return None
+    return _component(
+        kind="points", base=_levels_base(index), levels=index["levels"],
+        signature=index["key"], point_size=point_size, height=height, key=key, default=None,
+    )
+
+
+def render_webgl_mesh(index: dict, height: int = 500, key=None):
+    """Show GLB levels published by mesh_levels, each replacing the previous one once loaded."""
+    if not _check_vendored():
+        return None
+    return _component(
+        kind="gltf", base=_levels_base(index), levels=index["levels"],
+        signature=index["key"], height=height, key=key, default=None,
+    )
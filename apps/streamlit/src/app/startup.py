@@ -0,0 +1,98 @@
+"""
+Import-time profiling of the Streamlit app.
+
+Import costs are measured in a fresh interpreter with ``python -X importtime``,
+so the numbers reflect a cold start rather than modules already cached by
+the running server.
+
+Usage:
+    python apps/streamlit/src/app/startup.py
+"""
+
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../../"))
+
+# Imported by main.py on every cold start
+APP_MODULES = (
+    "streamlit",
+    "apps.streamlit.src.app.components.sidebar",
+    "apps.streamlit.src.app.components.upload",
+    "apps.streamlit.src.app.components.viewer",
+    "apps.streamlit.src.app.components.logs",
+    "apps.streamlit.src.app.logic",
+)
+
+# Deferred until a stage or viewer tab needs them
+LAZY_MODULES = (
+    "pycolmap",
+    "open3d",
+    "trimesh",
+)
+
+
+def measure_import_times(modules, python: str = sys.executable) -> list:
+    """
+    Import modules in a fresh interpreter and record each module's cost.
+
+    Modules that fail to import are skipped so one missing optional
+    dependency does not hide the rest of the report.
+
+    Returns:
+        List of (module, self_us, cumulative_us) in import order
+    """
+    script = "\n".join(
+        f"try:\n    import {name}\nexcept Exception:\n    pass" for name in modules
+    )
+    completed = subprocess.run(
+        [python, "-X", "importtime", "-c", script],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            rows.append((name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return rows
+
+
+def summarize_import_times(rows: list, top: int = 15) -> list:
+    """
+    Total self time per top-level package, most expensive first.
+
+    Returns:
+        List of (package, seconds, module count)
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for name, self_us, _ in rows:
+        package = name.split(".")[0]
+        if package == "apps":
+            package = ".".join(name.split(".")[:4])
+        totals[package][0] += self_us
+        totals[package][1] += 1
+    ranked = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)
+    return [(package, us / 1e6, count) for package, (us, count) in ranked[:top]]
+
+
+def format_report(rows: list, top: int = 15) -> str:
+    total = sum(self_us for _, self_us, _ in rows) / 1e6
+    lines = [f"{len(rows)} modules imported in {total:.2f} s"]
+    for package, seconds, count in summarize_import_times(rows, top):
+        lines.append(f"  {package:<40} {seconds:7.3f} s  ({count} modules)")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print("Cold start of the app:")
+    print(format_report(measure_import_times(APP_MODULES)))
+    print("\nDeferred heavy libraries, paid on first use:")
+    print(format_report(measure_import_times(LAZY_MODULES)))
@@ -0,0 +1,10 @@
+"""Batch module for running many reconstruction jobs from a manifest."""
+
+from .manifest import BatchJob, load_manifest
+from .runner import run_batch
+
+__all__ = [
+    "BatchJob",
+    "load_manifest",
+    "run_batch",
+]
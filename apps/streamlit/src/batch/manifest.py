@@ -0,0 +1,91 @@
+"""
+Batch manifest parsing.
+
+A manifest lists the datasets to process and the profile for each one. It
+can be written in TOML, YAML or JSON:
+
+    output_root = "results"          # optional, default: next to the manifest
+    max_workers = 2                  # optional
+
+    [defaults]                       # RunConfig fields shared by all jobs
+    quality_profile = "BALANCED"
+
+    [[jobs]]
+    name = "capture_01"
+    dataset = "captures/capture_01"
+    quality_profile = "QUALITY"      # any RunConfig field, including
+                                     # [jobs.openmvs.<Step>] overrides
+
+    [[jobs]]
+    name = "capture_02"
+    dataset = "captures/capture_02"
+    result = "elsewhere/capture_02"  # optional, default: <output_root>/<name>
+
+Relative paths are resolved against the manifest's directory.
+"""
+
+import os
+from dataclasses import dataclass
+
+from ..config import RunConfig, read_config_file
+from ..config.run_config import deep_merge
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    """One dataset to reconstruct with its resolved configuration."""
+
+    name: str
+    dataset_path: str
+    result_path: str
+    config: RunConfig
+
+
+def _resolve(base_dir: str, path: str) -> str:
+    return os.path.normpath(os.path.join(base_dir, os.path.expanduser(path)))
+
+
+def load_manifest(manifest_path: str) -> tuple:
+    """
+    Load a batch manifest.
+
+    Args:
+        manifest_path: Path to a TOML, YAML or JSON manifest
+
+    Returns:
+        (jobs, max_workers) where jobs is a list of BatchJob and max_workers
+        is the manifest's parallelism setting or None
+
+    Raises:
+        ValueError: If the manifest is malformed or job names collide
+    """
+    data = read_config_file(manifest_path)
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    output_root = _resolve(base_dir, data.get("output_root", "."))
+    defaults = data.get("defaults", {})
+
+    entries = data.get("jobs")
+    if not entries:
+        raise ValueError(f"Manifest {manifest_path} does not define any jobs")
+
+    jobs = []
+    seen = set()
+    for index, entry in enumerate(entries):
+        entry = dict(entry)
+        try:
+            dataset = entry.pop("dataset")
+        except KeyError:
+            raise ValueError(f"Job #{index + 1} in {manifest_path} has no 'dataset'") from None
+        dataset_path = _resolve(base_dir, dataset)
+        name = entry.pop("name", os.path.basename(dataset_path.rstrip(os.sep)))
+        if name in seen:
+            raise ValueError(f"Duplicate job name '{name}' in {manifest_path}")
+        seen.add(name)
+
+        result = entry.pop("result", None)
+        result_path = _resolve(base_dir, result) if result else os.path.join(output_root, name)
+
+        config = RunConfig.from_dict(deep_merge(defaults, entry))
+        jobs.append(BatchJob(name, dataset_path, result_path, config))
+
+    return jobs, data.get("max_workers")
@@ -0,0 +1,129 @@
+"""
+Bounded-parallel execution of batch jobs.
+"""
+
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stderr, redirect_stdout
+
+from ..config import settings
+from ..pipeline import JobJournal, run_job
+from ..pipeline.job import HISTORY_FROM_SETTINGS
+from .manifest import BatchJob
+
+LOG_FILENAME = "pipeline.log"
+
+
+def _job_entry(job: BatchJob) -> dict:
+    return {
+        "name": job.name,
+        "dataset_path": job.dataset_path,
+        "result_path": job.result_path,
+        "quality_profile": job.config.quality_profile,
+        "log_path": os.path.join(job.result_path, LOG_FILENAME),
+    }
+
+
+def _run_batch_job(job: BatchJob, history_path: str) -> dict:
+    """Run one job in a worker process, capturing its output in a log file."""
+    entry = _job_entry(job)
+    os.makedirs(job.result_path, exist_ok=True)
+    start = time.time()
+    with open(entry["log_path"], "a", buffering=1) as log_file:
+        with redirect_stdout(log_file), redirect_stderr(log_file):
+            try:
+                run_job(job.dataset_path, job.result_path, job.config, history_path=history_path)
+                entry["status"] = "completed"
+            except Exception as e:
+                traceback.print_exc()
+                entry["status"] = "failed"
+                entry["error"] = str(e)
+    entry["duration_s"] = time.time() - start
+    return entry
+
+
+def _write_summary(summary_path: str, summary: dict) -> None:
+    directory = os.path.dirname(os.path.abspath(summary_path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = summary_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(summary, f, indent=2)
+    os.replace(tmp_path, summary_path)
+
+
+def run_batch(
+    jobs: list,
+    summary_path: str,
+    max_workers: int = 1,
+    force: bool = False,
+    history_path: str = HISTORY_FROM_SETTINGS,
+    output_callback=None,
+) -> dict:
+    """
+    Run a list of batch jobs with at most max_workers running at once.
+
+    Jobs whose journal shows a completed run with the same configuration
+    are skipped unless force is set. The summary file is rewritten after
+    every job so it stays useful if the batch is interrupted.
+
+    Args:
+        jobs: BatchJob list, typically from load_manifest
+        summary_path: JSON file receiving the machine-readable summary
+        max_workers: Maximum number of jobs running in parallel
+        force: Re-run jobs even if they already completed
+        history_path: Run history database, or None to disable recording,
+            defaults to settings.RUN_HISTORY_PATH
+        output_callback: Receives one progress line per finished job
+
+    Returns:
+        The summary dictionary
+    """
+    summary = {
+        "started_at": time.time(),
+        "finished_at": None,
+        "jobs": [],
+    }
+
+    def report(entry):
+        summary["jobs"].append(entry)
+        _write_summary(summary_path, summary)
+        msg = f"[{len(summary['jobs'])}/{len(jobs)}] {entry['name']}: {entry['status']}"
+        if entry.get("error"):
+            msg += f" ({entry['error']})"
+        print(msg)
+        if output_callback: output_callback(msg + "\n")
+
+    if history_path is HISTORY_FROM_SETTINGS:
+        history_path = settings.RUN_HISTORY_PATH
+
+    pending = []
+    for job in jobs:
+        if not force and JobJournal(job.result_path).is_complete(job.config.fingerprint()):
+            entry = _job_entry(job)
+            entry.update({"status": "skipped", "duration_s": 0.0})
+            report(entry)
+        else:
+            pending.append(job)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {executor.submit(_run_batch_job, job, history_path): job for job in pending}
+            for future in as_completed(futures):
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    # The worker process itself died, e.g. killed by the OOM killer
+                    entry = _job_entry(futures[future])
+                    entry.update({"status": "failed", "error": str(e), "duration_s": None})
+                report(entry)
+
+    summary["finished_at"] = time.time()
+    counts = {}
+    for entry in summary["jobs"]:
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    summary["counts"] = counts
+    _write_summary(summary_path, summary)
+    return summary
@@ -1,6 +1,6 @@
 """Configuration module for reconstruction profiles and settings."""
 
-from .settings import QUALITY_PROFILE, OPENMVS_BIN_PATH, COLMAP_DEVICE
+from .settings import QUALITY_PROFILE, OPENMVS_BIN_PATH
 from .profiles import (
     QualityProfile,
     OPENMVS_PROFILES,
@@ -10,6 +10,7 @@ from .profiles import (
     should_skip_refine_mesh,
     build_command_with_params,
 )
+from .run_config import RunConfig, load_run_config, read_config_file
 
 __all__ = [
     "QUALITY_PROFILE",
@@ -21,4 +22,7 @@ __all__ = [
     "get_colmap_params",
     "should_skip_refine_mesh",
     "build_command_with_params",
+    "RunConfig",
+    "load_run_config",
+    "read_config_file",
 ]
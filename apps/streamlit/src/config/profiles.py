@@ -137,7 +137,16 @@ COLMAP_PROFILES = {
         "incremental_mapping": {
             "num_threads": 16,
             "ba_global_frames_ratio": 1.4,  # Less frequent bundle adjustment
-            "multiple_models": False,
+            "multiple_models": True,        # Separate models for unconnected images
+        },
+        "undistortion": {
+            "max_image_size": 1600,         # Smaller undistorted images
+        },
+        "quality_gate": {
+            "min_registration_ratio": 0.5,   # Fraction of images registered
+            "max_reprojection_error": 2.0,   # Mean error in pixels
+            "min_mean_track_length": 2.0,
+            "fallback_matcher": "exhaustive", # Re-match once before failing
         },
     },
     "BALANCED": {
@@ -153,7 +162,16 @@ COLMAP_PROFILES = {
         "incremental_mapping": {
             "num_threads": 16,
             "ba_global_frames_ratio": 1.2,  # Moderate BA frequency
-            "multiple_models": False,
+            "multiple_models": True,        # Separate models for unconnected images
+        },
+        "undistortion": {
+            "max_image_size": 2000,
+        },
+        "quality_gate": {
+            "min_registration_ratio": 0.6,   # Fraction of images registered
+            "max_reprojection_error": 1.5,   # Mean error in pixels
+            "min_mean_track_length": 2.5,
+            "fallback_matcher": "exhaustive", # Re-match once before failing
         },
     },
     "QUALITY": {
@@ -169,39 +187,54 @@ COLMAP_PROFILES = {
         "incremental_mapping": {
             "num_threads": 16,
             "ba_global_frames_ratio": 1.1,  # Frequent bundle adjustment
-            "multiple_models": False,
+            "multiple_models": True,        # Separate models for unconnected images
+        },
+        "undistortion": {
+            "max_image_size": 3200,         # Matches DensifyPointCloud --max-resolution
+        },
+        "quality_gate": {
+            "min_registration_ratio": 0.7,   # Fraction of images registered
+            "max_reprojection_error": 1.5,   # Mean error in pixels
+            "min_mean_track_length": 3.0,
+            "fallback_matcher": "exhaustive", # Re-match once before failing
         },
     },
 }
 
 
-def get_colmap_params(step_name: str) -> dict:
-    """Get COLMAP parameters for a specific step based on current profile."""
-    # Use settings.QUALITY_PROFILE to allow runtime updates
+def get_colmap_params(step_name: str, config=None) -> dict:
+    """Get COLMAP parameters for a specific step based on the run's profile."""
+    if config is not None:
+        return config.colmap_params(step_name)
+    # Fall back to settings.QUALITY_PROFILE when no run config is given
     current_profile = getattr(settings, "QUALITY_PROFILE", "BALANCED")
     profile = COLMAP_PROFILES.get(current_profile, COLMAP_PROFILES["BALANCED"])
     return profile.get(step_name, {})
 
 
-def get_profile_params(step_name: str) -> dict:
-    """Get parameters for a specific OpenMVS step based on current profile."""
-    # Use settings.QUALITY_PROFILE to allow runtime updates
+def get_profile_params(step_name: str, config=None) -> dict:
+    """Get parameters for a specific OpenMVS step based on the run's profile."""
+    if config is not None:
+        return config.openmvs_params(step_name)
+    # Fall back to settings.QUALITY_PROFILE when no run config is given
     current_profile = getattr(settings, "QUALITY_PROFILE", "QUALITY")
     profile = OPENMVS_PROFILES.get(current_profile, OPENMVS_PROFILES["QUALITY"])
     return profile.get(step_name, {})
 
 
-def build_command_with_params(base_cmd: list, step_name: str) -> list:
+def build_command_with_params(base_cmd: list, step_name: str, config=None) -> list:
     """Build command list with profile-specific parameters."""
-    params = get_profile_params(step_name)
+    params = get_profile_params(step_name, config)
     cmd = list(base_cmd)
     for param, value in params.items():
         cmd.extend([param, value])
     return cmd
 
 
-def should_skip_refine_mesh() -> bool:
+def should_skip_refine_mesh(config=None) -> bool:
     """Check if RefineMesh should be skipped based on profile."""
+    if config is not None:
+        return config.should_skip_refine_mesh()
     current_profile = getattr(settings, "QUALITY_PROFILE", "QUALITY")
     profile = OPENMVS_PROFILES.get(current_profile, OPENMVS_PROFILES["QUALITY"])
     return profile.get("skip_refine_mesh", False)
@@ -0,0 +1,382 @@
+"""
+Per-run configuration for the reconstruction pipeline.
+
+A RunConfig is an immutable snapshot of everything a run needs to know about
+its profile and environment. It is passed explicitly to every pipeline
+function instead of reading the mutable globals in ``settings``, so jobs with
+different profiles can run side by side in one process.
+"""
+
+import json
+import numbers
+import os
+from dataclasses import dataclass, field, fields, replace
+from types import MappingProxyType
+from typing import Any, Mapping, Optional, Tuple, Union, get_args, get_origin
+
+from . import settings
+from .profiles import QualityProfile, OPENMVS_PROFILES, COLMAP_PROFILES
+
+DEVICES = ("AUTO", "CUDA", "CPU")
+MESHERS = ("openmvs", "poisson")
+MODES = ("photogrammetry", "rgbd")
+RGBD_POSE_SOURCES = ("colmap", "odometry")
+TEXTURE_FORMATS = ("webp", "jpeg")
+PROFILING_MODES = ("off", "cpu", "memory")
+ROI_MODES = ("off", "auto", "manual")
+
+
+def _freeze(value):
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, Mapping):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+_TYPE_NAMES = {bool: "a boolean", int: "an integer", float: "a number", str: "a string"}
+_PLURAL_TYPE_NAMES = {int: "integers", float: "numbers", str: "strings"}
+
+
+def _matches_type(value, annotation) -> bool:
+    """Whether a value fits a field annotation; ints count as floats, bools as neither."""
+    origin = get_origin(annotation)
+    if origin is Union:
+        return any(_matches_type(value, arg) for arg in get_args(annotation))
+    if origin is tuple:
+        # A scalar string would otherwise be split into characters
+        item = get_args(annotation)[0]
+        return isinstance(value, (list, tuple)) and all(_matches_type(v, item) for v in value)
+    if origin is not None:
+        return isinstance(value, origin)
+    if annotation is Any:
+        return True
+    if annotation is type(None):
+        return value is None
+    if annotation is bool:
+        return isinstance(value, bool)
+    if annotation is int:
+        return isinstance(value, numbers.Integral) and not isinstance(value, bool)
+    if annotation is float:
+        return isinstance(value, numbers.Real) and not isinstance(value, bool)
+    return isinstance(value, annotation)
+
+
+def _describe_type(annotation) -> str:
+    origin = get_origin(annotation)
+    if origin is Union:
+        names = [_describe_type(arg) for arg in get_args(annotation) if arg is not type(None)]
+        return " or ".join(names) + " or None"
+    if origin is tuple:
+        return f"a list of {_PLURAL_TYPE_NAMES[get_args(annotation)[0]]}"
+    if origin is not None:
+        return "a mapping"
+    return _TYPE_NAMES.get(annotation, getattr(annotation, "__name__", str(annotation)))
+
+
+def deep_merge(base: Mapping, overrides: Mapping) -> dict:
+    """Recursively merge two mappings into a new plain dictionary."""
+    merged = _thaw(base)
+    for key, value in overrides.items():
+        if isinstance(value, Mapping) and isinstance(merged.get(key), dict):
+            merged[key] = deep_merge(merged[key], value)
+        else:
+            merged[key] = _thaw(value)
+    return merged
+
+
+@dataclass(frozen=True)
+class RunConfig:
+    """
+    Immutable configuration of a single reconstruction run.
+
+    Attributes:
+        quality_profile: One of the QualityProfile names
+        device: Compute device for COLMAP, one of "AUTO", "CUDA" or "CPU"
+        openmvs_bin_path: Directory containing the OpenMVS binaries
+        openmvs_overrides: Per-step OpenMVS flags layered over the profile,
+            e.g. {"DensifyPointCloud": {"--resolution-level": "2"}}
+        colmap_overrides: Per-step COLMAP options layered over the profile,
+            e.g. {"feature_extraction": {"max_image_size": 2400}}
+        skip_refine_mesh: Overrides the profile's RefineMesh setting if not None
+        web_export: Write compact GLB files for web delivery after texturing
+        web_texture_sizes: Texture side lengths of the GLB variants, also
+            the tiers of the texture atlas variants
+        web_lod_ratios: Vertex ratios of additional simplified GLB variants
+        texture_variants: Write tiered, mipmapped copies of the texture
+            atlases after texturing
+        texture_formats: Encodings of the atlas variants, "webp" and/or
+            "jpeg" (progressive)
+        texture_quality: Encoder quality of the atlas variants, 1 to 100
+        mesher: "openmvs" for ReconstructMesh, or "poisson" for the faster
+            density-adaptive Poisson reconstruction of the dense cloud
+        poisson_memory_budget_mb: Memory budget of the Poisson mesher
+        mode: "photogrammetry" for COLMAP and OpenMVS, or "rgbd" to fuse the
+            depth images in the dataset's depth/ folder into a TSDF volume
+        rgbd_pose_source: Camera poses for RGB-D fusion, from the COLMAP
+            sparse model or from frame-to-frame RGB-D odometry
+        tsdf_voxel_length: TSDF voxel edge length in metres
+        depth_scale: Depth image units per metre
+        depth_trunc: Depth beyond this many metres is ignored
+        feature_cache_path: Shared SIFT feature and match store, or None to
+            always extract and match from scratch
+        colmap_text_model: Also write the undistorted model as TXT, for
+            OpenMVS builds whose InterfaceCOLMAP cannot read binary models
+        retention: Artifact name to retention policy ("keep-all",
+            "keep-final-only" or "keep-for-resume:N"), merged over the
+            defaults of the retention module
+        roi: Region of interest dense reconstruction is restricted to: "off",
+            "auto" to estimate the object's box from the sparse cloud, or
+            "manual" to use roi_box
+        roi_box: Box in the sparse model's frame with center and extent
+            (3 values each) and optionally a 3x3 rotation, for roi="manual"
+        roi_border: Margin added on each side of an estimated box, as a
+            fraction of its extent
+        profiling: "off", "cpu" to profile every stage with cProfile, or
+            "memory" to also track allocations with tracemalloc. Profiles
+            are saved in the result folder's profiles/ directory
+    """
+
+    quality_profile: str = "BALANCED"
+    device: str = "AUTO"
+    openmvs_bin_path: str = settings.OPENMVS_BIN_PATH
+    openmvs_overrides: Mapping[str, Mapping[str, str]] = field(default_factory=dict)
+    colmap_overrides: Mapping[str, Mapping[str, Any]] = field(default_factory=dict)
+    skip_refine_mesh: Optional[bool] = None
+    web_export: bool = True
+    web_texture_sizes: Tuple[int, ...] = (1024, 2048, 4096)
+    web_lod_ratios: Tuple[float, ...] = ()
+    texture_variants: bool = True
+    texture_formats: Tuple[str, ...] = TEXTURE_FORMATS
+    texture_quality: int = 85
+    mesher: str = "openmvs"
+    poisson_memory_budget_mb: float = 4096
+    mode: str = "photogrammetry"
+    rgbd_pose_source: str = "colmap"
+    tsdf_voxel_length: float = 0.005
+    depth_scale: float = 1000.0
+    depth_trunc: float = 5.0
+    feature_cache_path: Optional[str] = settings.FEATURE_CACHE_PATH
+    colmap_text_model: bool = False
+    retention: Mapping[str, str] = field(default_factory=dict)
+    roi: str = "auto"
+    roi_box: Mapping[str, Any] = field(default_factory=dict)
+    roi_border: float = 0.1
+    profiling: str = "off"
+
+    def __post_init__(self):
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if not _matches_type(value, f.type):
+                raise ValueError(f"{f.name} must be {_describe_type(f.type)}, got {value!r}")
+
+        profile = self.quality_profile.upper()
+        if profile not in QualityProfile.__members__:
+            raise ValueError(
+                f"Unknown quality profile '{self.quality_profile}', "
+                f"expected one of {list(QualityProfile.__members__)}"
+            )
+        device = self.device.upper()
+        if device not in DEVICES:
+            raise ValueError(f"Unknown device '{self.device}', expected one of {list(DEVICES)}")
+        if self.mesher not in MESHERS:
+            raise ValueError(f"Unknown mesher '{self.mesher}', expected one of {list(MESHERS)}")
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown mode '{self.mode}', expected one of {list(MODES)}")
+        unknown_formats = set(self.texture_formats) - set(TEXTURE_FORMATS)
+        if unknown_formats:
+            raise ValueError(
+                f"Unknown texture formats {sorted(unknown_formats)}, expected any of {list(TEXTURE_FORMATS)}"
+            )
+        if not 1 <= int(self.texture_quality) <= 100:
+            raise ValueError(f"Texture quality must be between 1 and 100, got {self.texture_quality}")
+        if self.roi not in ROI_MODES:
+            raise ValueError(f"Unknown ROI mode '{self.roi}', expected one of {list(ROI_MODES)}")
+        if self.roi == "manual" and not {"center", "extent"} <= set(self.roi_box):
+            raise ValueError("A manual ROI needs roi_box with center and extent")
+        if self.profiling not in PROFILING_MODES:
+            raise ValueError(f"Unknown profiling mode '{self.profiling}', expected one of {list(PROFILING_MODES)}")
+        if self.rgbd_pose_source not in RGBD_POSE_SOURCES:
+            raise ValueError(
+                f"Unknown RGB-D pose source '{self.rgbd_pose_source}', expected one of {list(RGBD_POSE_SOURCES)}"
+            )
+
+        object.__setattr__(self, "quality_profile", profile)
+        object.__setattr__(self, "device", device)
+        object.__setattr__(self, "openmvs_overrides", _freeze(self.openmvs_overrides))
+        object.__setattr__(self, "colmap_overrides", _freeze(self.colmap_overrides))
+        object.__setattr__(self, "retention", _freeze(self.retention))
+        object.__setattr__(self, "roi_box", _freeze(self.roi_box))
+        object.__setattr__(self, "roi_border", float(self.roi_border))
+        if self.retention:
+            # Imported here because the retention package depends on the pipeline
+            from ..retention.policy import resolve_policies
+
+            resolve_policies(self.retention)
+        object.__setattr__(self, "web_texture_sizes", tuple(int(s) for s in self.web_texture_sizes))
+        object.__setattr__(self, "web_lod_ratios", tuple(float(r) for r in self.web_lod_ratios))
+        object.__setattr__(self, "texture_formats", tuple(self.texture_formats))
+        object.__setattr__(self, "texture_quality", int(self.texture_quality))
+
+    def __hash__(self):
+        return hash((self.fingerprint(), self.openmvs_bin_path))
+
+    def __reduce__(self):
+        # MappingProxyType cannot be pickled, so rebuild from plain data
+        return (RunConfig.from_dict, (self.to_dict(),))
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "RunConfig":
+        """
+        Build a config from a plain mapping, as loaded from TOML or YAML.
+
+        The sections "openmvs" and "colmap" map to the override fields, and
+        "quality" is accepted as an alias of "quality_profile" so the
+        sidebar's dictionary can be passed directly.
+        """
+        data = dict(data)
+        if "quality" in data and "quality_profile" not in data:
+            data["quality_profile"] = data.pop("quality")
+        if "openmvs" in data:
+            data["openmvs_overrides"] = data.pop("openmvs")
+        if "colmap" in data:
+            data["colmap_overrides"] = data.pop("colmap")
+
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown run configuration keys: {sorted(unknown)}")
+        return cls(**data)
+
+    @classmethod
+    def from_settings(cls) -> "RunConfig":
+        """Snapshot the process-wide defaults from the settings module."""
+        return cls(
+            quality_profile=getattr(settings, "QUALITY_PROFILE", "BALANCED"),
+            device=getattr(settings, "COLMAP_DEVICE_NAME", "AUTO").upper(),
+            openmvs_bin_path=settings.OPENMVS_BIN_PATH,
+            profiling=getattr(settings, "PROFILING", "off"),
+        )
+
+    def with_overrides(self, **changes) -> "RunConfig":
+        """
+        Return a copy with the given fields replaced.
+
+        The override and retention mappings are merged into the existing ones rather than
+        replacing them.
+        """
+        for name in ("openmvs_overrides", "colmap_overrides", "retention"):
+            if name in changes:
+                changes[name] = deep_merge(getattr(self, name), changes[name])
+        return replace(self, **changes)
+
+    def to_dict(self) -> dict:
+        return {
+            "quality_profile": self.quality_profile,
+            "device": self.device,
+            "openmvs_bin_path": self.openmvs_bin_path,
+            "openmvs": _thaw(self.openmvs_overrides),
+            "colmap": _thaw(self.colmap_overrides),
+            "skip_refine_mesh": self.skip_refine_mesh,
+            "web_export": self.web_export,
+            "web_texture_sizes": list(self.web_texture_sizes),
+            "web_lod_ratios": list(self.web_lod_ratios),
+            "texture_variants": self.texture_variants,
+            "texture_formats": list(self.texture_formats),
+            "texture_quality": self.texture_quality,
+            "mesher": self.mesher,
+            "poisson_memory_budget_mb": self.poisson_memory_budget_mb,
+            "mode": self.mode,
+            "rgbd_pose_source": self.rgbd_pose_source,
+            "tsdf_voxel_length": self.tsdf_voxel_length,
+            "depth_scale": self.depth_scale,
+            "depth_trunc": self.depth_trunc,
+            "feature_cache_path": self.feature_cache_path,
+            "colmap_text_model": self.colmap_text_model,
+            "retention": _thaw(self.retention),
+            "roi": self.roi,
+            "roi_box": _thaw(self.roi_box),
+            "roi_border": self.roi_border,
+            "profiling": self.profiling,
+        }
+
+    def fingerprint(self) -> str:
+        """Stable string identifying the settings that affect the outputs."""
+        data = self.to_dict()
+        data.pop("openmvs_bin_path")
+        data.pop("feature_cache_path")
+        # Retention decides what is kept, not what is produced
+        data.pop("retention")
+        data.pop("profiling")
+        return json.dumps(data, sort_keys=True)
+
+    def openmvs_params(self, step_name: str) -> dict:
+        """OpenMVS flags for a step: profile defaults plus overrides."""
+        profile = OPENMVS_PROFILES[self.quality_profile]
+        params = dict(profile.get(step_name, {}))
+        params.update(self.openmvs_overrides.get(step_name, {}))
+        return params
+
+    def colmap_params(self, step_name: str) -> dict:
+        """COLMAP options for a step: profile defaults plus overrides."""
+        profile = COLMAP_PROFILES[self.quality_profile]
+        params = dict(profile.get(step_name, {}))
+        params.update(self.colmap_overrides.get(step_name, {}))
+        return params
+
+    def should_skip_refine_mesh(self) -> bool:
+        if self.skip_refine_mesh is not None:
+            return self.skip_refine_mesh
+        return OPENMVS_PROFILES[self.quality_profile].get("skip_refine_mesh", False)
+
+
+def read_config_file(path: str) -> dict:
+    """Parse a TOML, YAML or JSON file into a dictionary."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".toml":
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            import tomli as tomllib
+
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    if ext in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise ImportError("PyYAML is required to load YAML run configurations") from e
+        with open(path, "r") as f:
+            return yaml.safe_load(f) or {}
+    if ext == ".json":
+        with open(path, "r") as f:
+            return json.load(f)
+    raise ValueError(f"Unsupported run configuration format: {path}")
+
+
+def load_run_config(path: str = None, **overrides) -> RunConfig:
+    """
+    Load a run configuration from a TOML, YAML or JSON file.
+
+    Args:
+        path: Configuration file, or None to start from the settings defaults
+        **overrides: Per-run field overrides applied on top of the file
+
+    Returns:
+        A frozen RunConfig
+    """
+    if path is None:
+        config = RunConfig.from_settings()
+    else:
+        config = RunConfig.from_dict(read_config_file(path))
+    if overrides:
+        config = config.with_overrides(**overrides)
+    return config
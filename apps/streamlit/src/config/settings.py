@@ -3,7 +3,6 @@ Global settings and configuration for the reconstruction pipeline.
 """
 
 import os
-import pycolmap
 
 # ============================================================================
 # QUALITY PROFILE CONFIGURATION
@@ -13,17 +12,58 @@ import pycolmap
 QUALITY_PROFILE = "SPEED"
 # ============================================================================
 
+# Streamlit app folder, every default path below is anchored to it so
+# they do not depend on the working directory
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 # Path to OpenMVS binaries (relative to project root)
 OPENMVS_BIN_PATH = os.path.join(
-    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    APP_DIR,
     "thirdparty",
     "openMVS",
     "make",
     "bin"
 )
 
-COLMAP_DEVICE=pycolmap.Device.cpu
+# Device COLMAP runs on: "AUTO", "CUDA" or "CPU". A plain name, so reading
+# settings never loads pycolmap; pipeline/colmap.py resolves it to a
+# pycolmap.Device
+COLMAP_DEVICE_NAME = "CPU"
 
 # Default paths
-DEFAULT_DATASET_PATH = "test/images"
-DEFAULT_RESULT_PATH = "test/result"
+DEFAULT_DATASET_PATH = os.path.join(APP_DIR, "test", "images")
+DEFAULT_RESULT_PATH = os.path.join(APP_DIR, "test", "result")
+
+# SQLite database recording per-run stage timings and memory
+RUN_HISTORY_PATH = os.path.join(APP_DIR, "test", "run_history.sqlite")
+
+# SIFT features and matches shared between jobs, keyed by image content
+FEATURE_CACHE_PATH = os.path.join(APP_DIR, "test", "feature_cache.sqlite")
+
+# Working directory of the HTTP API, one sub-directory per submitted job
+API_JOBS_ROOT = os.path.join(APP_DIR, "test", "api_jobs")
+
+# The only folder whose datasets API clients may submit by path
+API_DATASETS_ROOT = os.path.join(APP_DIR, "test", "datasets")
+
+# Job store shared by distributed workers, must be on storage every node mounts
+DISTRIBUTED_STORE_PATH = os.path.join(APP_DIR, "test", "distributed", "jobs.sqlite")
+
+# What each stage needs from a distributed worker's node, unlisted stages
+# run anywhere. Sparse mapping scales with cores, dense reconstruction and
+# fusion with memory. Jobs can override them when submitted
+DISTRIBUTED_STAGE_REQUIREMENTS = {
+    "sparse": {"min_cpu_count": 8},
+    "dense": {"min_ram_mb": 32768},
+    "fusion": {"min_ram_mb": 16384},
+}
+
+# Binary level files the WebGL viewer fetches, one sub-folder per shown
+# dataset. Served by Streamlit as a component folder, so any local folder
+# works, read when the viewer module is imported
+VIEWER_LEVELS_DIR = os.path.join(APP_DIR, "test", "viewer_levels")
+
+# Python-side profiling of every job: "off", "cpu" (cProfile) or "memory"
+# (cProfile and tracemalloc). Jobs can also enable it in their RunConfig
+PROFILING = "off"
+
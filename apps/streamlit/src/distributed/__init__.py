@@ -0,0 +1,20 @@
+"""Distributed module running pipeline stages on several nodes over shared storage."""
+
+from .lock import LockDir
+from .store import (
+    SharedJobStore,
+    stage_requirements,
+    fits,
+)
+from .worker import Worker, node_capabilities, run_stage_task, stub_stage_task
+
+__all__ = [
+    "LockDir",
+    "SharedJobStore",
+    "stage_requirements",
+    "fits",
+    "Worker",
+    "node_capabilities",
+    "run_stage_task",
+    "stub_stage_task",
+]
@@ -0,0 +1,110 @@
+"""
+Cross-host mutual exclusion on shared storage.
+
+SQLite's own locking relies on POSIX byte-range locks, which NFS and SMB
+mounts implement unreliably. Creating a directory is atomic on every shared
+filesystem, so the job store serializes its writes by holding a lock
+directory instead.
+"""
+
+import json
+import os
+import platform
+import shutil
+import time
+import uuid
+
+
+class LockDir:
+    """
+    Exclusive lock held by creating a directory.
+
+    A lock whose directory is older than stale_after seconds belongs to a
+    process that died inside its critical section and is broken. Critical
+    sections must therefore stay far shorter than stale_after. Processes
+    breaking a stale lock take turns through a second lock directory, and
+    releasing only removes the lock if this process still holds it.
+
+    Args:
+        path: Lock directory to create, on the shared filesystem
+        stale_after: Age in seconds after which a held lock is broken
+        timeout: Seconds to wait for the lock before raising TimeoutError
+        poll_interval: Seconds between attempts
+    """
+
+    def __init__(self, path: str, stale_after: float = 60.0, timeout: float = 60.0, poll_interval: float = 0.05):
+        self.path = path
+        self.stale_after = stale_after
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._token = None
+
+    def _is_stale(self, path: str) -> bool:
+        try:
+            return time.time() - os.stat(path).st_mtime >= self.stale_after
+        except FileNotFoundError:
+            return False
+
+    def _break_if_stale(self) -> None:
+        if not self._is_stale(self.path):
+            return
+        # Otherwise a process that found the lock stale could remove the
+        # one taken after another process broke it
+        breaker = f"{self.path}.break"
+        try:
+            os.mkdir(breaker)
+        except FileExistsError:
+            # Held for milliseconds, unless its holder died
+            if self._is_stale(breaker):
+                try:
+                    os.rmdir(breaker)
+                except OSError:
+                    pass
+            return
+        try:
+            # Checked again now that no other process can break it
+            if self._is_stale(self.path):
+                shutil.rmtree(self.path, ignore_errors=True)
+        finally:
+            os.rmdir(breaker)
+
+    def _owner_token(self) -> str:
+        try:
+            with open(os.path.join(self.path, "owner.json")) as f:
+                return json.load(f).get("token")
+        except (OSError, ValueError):
+            return None
+
+    def acquire(self) -> None:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                os.mkdir(self.path)
+                break
+            except FileExistsError:
+                self._break_if_stale()
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Timed out waiting for lock {self.path}")
+                time.sleep(self.poll_interval)
+        self._token = uuid.uuid4().hex
+        with open(os.path.join(self.path, "owner.json"), "w") as f:
+            json.dump({
+                "hostname": platform.node(),
+                "pid": os.getpid(),
+                "acquired_at": time.time(),
+                "token": self._token,
+            }, f)
+
+    def release(self) -> None:
+        # Cleared first, the next thread of this process may take the lock once it is removed
+        token, self._token = self._token, None
+        # A lock broken as stale may since belong to another process
+        if token is not None and self._owner_token() == token:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
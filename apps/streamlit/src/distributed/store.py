@@ -0,0 +1,415 @@
+"""
+Shared job store for distributing pipeline stages over several nodes.
+
+Jobs are split into one task per stage. Workers on any node with access to
+the shared filesystem claim the next runnable task their capabilities
+allow, report heartbeats while it runs, and mark it completed or failed.
+A task whose worker stops sending heartbeats is put back in the queue for
+another worker to take over, and one that no live worker can run is
+reported as blocked.
+
+The store is a SQLite file on the shared filesystem. Every write runs under
+a LockDir next to it, and connections are short-lived with the rollback
+journal, because WAL needs shared memory that network filesystems lack.
+"""
+
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing, contextmanager
+
+from ..config import settings, RunConfig
+from ..pipeline import stages_for_config
+from .lock import LockDir
+
+PENDING = "pending"
+CLAIMED = "claimed"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Workers report every few seconds, a task is taken over after missing many
+HEARTBEAT_INTERVAL_S = 10.0
+STALL_TIMEOUT_S = 120.0
+MAX_ATTEMPTS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    dataset_path TEXT NOT NULL,
+    result_path TEXT NOT NULL,
+    config_json TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    job_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    requirements_json TEXT NOT NULL,
+    status TEXT NOT NULL,
+    worker_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    claimed_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL,
+    error TEXT,
+    PRIMARY KEY (job_id, stage)
+);
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    capabilities_json TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL,
+    job_id TEXT,
+    stage TEXT
+);
+"""
+
+
+def stage_requirements(stage_name: str, config: RunConfig, overrides: dict = None) -> dict:
+    """
+    Node requirements of one stage of a job.
+
+    Args:
+        stage_name: Stage of the job's pipeline
+        config: Job configuration
+        overrides: Requirements replacing those of settings.DISTRIBUTED_STAGE_REQUIREMENTS
+            for this stage, a value of 0 dropping one
+
+    Returns:
+        Dictionary mapping "min_<capability>" to the minimum value
+    """
+    requirements = dict(settings.DISTRIBUTED_STAGE_REQUIREMENTS.get(stage_name, {}))
+    if stage_name == "sparse" and config.device == "CUDA":
+        requirements["min_gpu_count"] = 1
+    requirements.update(overrides or {})
+    return {key: minimum for key, minimum in requirements.items() if minimum}
+
+
+def fits(capabilities: dict, requirements: dict) -> bool:
+    """True if a node with these capabilities meets every requirement."""
+    for key, minimum in requirements.items():
+        available = capabilities.get(key[len("min_"):]) if key.startswith("min_") else None
+        if available is None or available < minimum:
+            return False
+    return True
+
+
+def _can_run(capabilities: dict, stage: str, requirements: dict) -> bool:
+    # Workers restricted to some stages register them with their capabilities
+    stages = capabilities.get("stages")
+    return (stages is None or stage in stages) and fits(capabilities, requirements)
+
+
+def _weight(requirements: dict) -> tuple:
+    # Heaviest tasks first, so large nodes are not busy with light work
+    return (
+        requirements.get("min_ram_mb", 0),
+        requirements.get("min_cpu_count", 0),
+        requirements.get("min_gpu_count", 0),
+    )
+
+
+class SharedJobStore:
+    """
+    Job and task queue in a SQLite file on shared storage.
+
+    Args:
+        db_path: Store file, reachable under the same path from every node
+        stall_timeout: Seconds without a heartbeat before a task is taken over
+        max_attempts: Claims of a task before it fails the job
+    """
+
+    def __init__(self, db_path: str, stall_timeout: float = STALL_TIMEOUT_S, max_attempts: int = MAX_ATTEMPTS):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self.stall_timeout = stall_timeout
+        self.max_attempts = max_attempts
+        self._lock = LockDir(db_path + ".lock")
+        with self._write() as db:
+            db.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        with closing(sqlite3.connect(self.db_path, timeout=30)) as db:
+            db.row_factory = sqlite3.Row
+            yield db
+
+    @contextmanager
+    def _write(self):
+        with self._lock, self._connect() as db:
+            yield db
+            db.commit()
+
+    def submit(
+        self,
+        dataset_path: str,
+        result_path: str,
+        config: RunConfig,
+        stages: list = None,
+        requirements: dict = None,
+    ) -> str:
+        """
+        Queue a job, one task per stage.
+
+        Args:
+            stages: Stage names to run, defaults to stages_for_config(config)
+            requirements: Per stage name, requirements overriding the default
+                ones, e.g. {"dense": {"min_ram_mb": 16384}}
+
+        Returns:
+            The job id
+
+        Raises:
+            ValueError: If a stage is not part of the configuration's pipeline,
+                or a requirement does not name a minimum
+        """
+        available = [stage.name for stage in stages_for_config(config)]
+        names = stages or available
+        requirements = requirements or {}
+        unknown = [name for name in list(names) + list(requirements) if name not in available]
+        if unknown:
+            raise ValueError(f"Unknown stages {unknown}, expected any of {available}")
+        invalid = [key for overrides in requirements.values() for key in overrides if not key.startswith("min_")]
+        if invalid:
+            raise ValueError(f"Unknown requirements {invalid}, expected min_<capability> such as min_ram_mb")
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._write() as db:
+            db.execute(
+                "INSERT INTO jobs (job_id, dataset_path, result_path, config_json, status, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, os.path.abspath(dataset_path), os.path.abspath(result_path),
+                 json.dumps(config.to_dict()), PENDING, now),
+            )
+            for position, name in enumerate(names):
+                db.execute(
+                    "INSERT INTO tasks (job_id, stage, position, requirements_json, status) VALUES (?, ?, ?, ?, ?)",
+                    (job_id, name, position,
+                     json.dumps(stage_requirements(name, config, requirements.get(name))), PENDING),
+                )
+        return job_id
+
+    def register_worker(self, worker_id: str, capabilities: dict) -> None:
+        now = time.time()
+        with self._write() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO workers (worker_id, capabilities_json, started_at, heartbeat_at)"
+                " VALUES (?, ?, ?, ?)",
+                (worker_id, json.dumps(capabilities), now, now),
+            )
+
+    def unregister_worker(self, worker_id: str) -> None:
+        with self._write() as db:
+            db.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+
+    def _requeue_stalled(self, db, now: float) -> None:
+        db.execute("DELETE FROM workers WHERE heartbeat_at < ?", (now - self.stall_timeout,))
+        stalled = db.execute(
+            "SELECT job_id, stage, attempts, worker_id FROM tasks WHERE status = ? AND heartbeat_at < ?",
+            (CLAIMED, now - self.stall_timeout),
+        ).fetchall()
+        for task in stalled:
+            error = f"Worker {task['worker_id']} stopped sending heartbeats"
+            if task["attempts"] >= self.max_attempts:
+                error += f", giving up after {task['attempts']} attempts"
+                self._fail(db, task["job_id"], task["stage"], error, now)
+            else:
+                db.execute(
+                    "UPDATE tasks SET status = ?, worker_id = NULL, error = ? WHERE job_id = ? AND stage = ?",
+                    (PENDING, error, task["job_id"], task["stage"]),
+                )
+
+    def _fail(self, db, job_id: str, stage: str, error: str, now: float) -> None:
+        db.execute(
+            "UPDATE tasks SET status = ?, error = ?, finished_at = ? WHERE job_id = ? AND stage = ?",
+            (FAILED, error, now, job_id, stage),
+        )
+        db.execute(
+            "UPDATE tasks SET status = ? WHERE job_id = ? AND status = ?",
+            (CANCELLED, job_id, PENDING),
+        )
+        db.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE job_id = ?",
+            (FAILED, f"{stage}: {error}", now, job_id),
+        )
+
+    def claim(self, worker_id: str, capabilities: dict, stages: list = None) -> dict:
+        """
+        Claim the next runnable task this worker can take.
+
+        A task is runnable once every earlier stage of its job completed.
+        Among runnable tasks the node fits, the most demanding is taken
+        first, then the oldest job. Stalled tasks are requeued beforehand.
+
+        Args:
+            stages: Only consider these stage names, or any if None
+
+        Returns:
+            The task with its job's fields and a "last" flag, or None
+        """
+        now = time.time()
+        with self._write() as db:
+            self._requeue_stalled(db, now)
+            candidates = db.execute(
+                "SELECT t.*, j.dataset_path, j.result_path, j.config_json, j.created_at,"
+                " (SELECT MAX(position) FROM tasks WHERE job_id = t.job_id) AS last_position"
+                " FROM tasks t JOIN jobs j ON j.job_id = t.job_id"
+                " WHERE t.status = ? AND j.status IN (?, ?)"
+                " AND NOT EXISTS (SELECT 1 FROM tasks p WHERE p.job_id = t.job_id"
+                " AND p.position < t.position AND p.status != ?)",
+                (PENDING, PENDING, RUNNING, COMPLETED),
+            ).fetchall()
+            runnable = []
+            for row in candidates:
+                requirements = json.loads(row["requirements_json"])
+                if (stages is None or row["stage"] in stages) and _can_run(capabilities, row["stage"], requirements):
+                    runnable.append((requirements, row))
+            if not runnable:
+                return None
+            runnable.sort(key=lambda item: (tuple(-w for w in _weight(item[0])), item[1]["created_at"]))
+            requirements, row = runnable[0]
+
+            db.execute(
+                "UPDATE tasks SET status = ?, worker_id = ?, attempts = attempts + 1, claimed_at = ?,"
+                " heartbeat_at = ? WHERE job_id = ? AND stage = ?",
+                (CLAIMED, worker_id, now, now, row["job_id"], row["stage"]),
+            )
+            db.execute("UPDATE jobs SET status = ? WHERE job_id = ?", (RUNNING, row["job_id"]))
+            db.execute(
+                "UPDATE workers SET job_id = ?, stage = ?, heartbeat_at = ? WHERE worker_id = ?",
+                (row["job_id"], row["stage"], now, worker_id),
+            )
+        return {
+            "job_id": row["job_id"],
+            "stage": row["stage"],
+            "dataset_path": row["dataset_path"],
+            "result_path": row["result_path"],
+            "config": json.loads(row["config_json"]),
+            "requirements": requirements,
+            "attempt": row["attempts"] + 1,
+            "last": row["position"] == row["last_position"],
+        }
+
+    def heartbeat(self, worker_id: str, job_id: str = None, stage: str = None) -> bool:
+        """
+        Record that a worker is alive, and its task if it has one.
+
+        Returns:
+            False if the task is no longer claimed by this worker, because it
+            was taken over after missed heartbeats
+        """
+        now = time.time()
+        with self._write() as db:
+            db.execute(
+                "UPDATE workers SET heartbeat_at = ?, job_id = ?, stage = ? WHERE worker_id = ?",
+                (now, job_id, stage, worker_id),
+            )
+            if job_id is None:
+                return True
+            cursor = db.execute(
+                "UPDATE tasks SET heartbeat_at = ? WHERE job_id = ? AND stage = ? AND worker_id = ? AND status = ?",
+                (now, job_id, stage, worker_id, CLAIMED),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, worker_id: str, job_id: str, stage: str) -> bool:
+        """
+        Mark a claimed task completed, and its job once no task is left.
+
+        Returns:
+            False if the task was taken over and the result is discarded
+        """
+        now = time.time()
+        with self._write() as db:
+            cursor = db.execute(
+                "UPDATE tasks SET status = ?, finished_at = ?, error = NULL"
+                " WHERE job_id = ? AND stage = ? AND worker_id = ? AND status = ?",
+                (COMPLETED, now, job_id, stage, worker_id, CLAIMED),
+            )
+            if cursor.rowcount != 1:
+                return False
+            remaining = db.execute(
+                "SELECT COUNT(*) FROM tasks WHERE job_id = ? AND status != ?", (job_id, COMPLETED)
+            ).fetchone()[0]
+            db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE job_id = ?",
+                (COMPLETED, now, job_id) if remaining == 0 else (RUNNING, None, job_id),
+            )
+            db.execute("UPDATE workers SET job_id = NULL, stage = NULL WHERE worker_id = ?", (worker_id,))
+        return True
+
+    def fail(self, worker_id: str, job_id: str, stage: str, error: str) -> bool:
+        """Fail a claimed task and its job, cancelling the stages after it."""
+        with self._write() as db:
+            owner = db.execute(
+                "SELECT worker_id, status FROM tasks WHERE job_id = ? AND stage = ?", (job_id, stage)
+            ).fetchone()
+            if owner is None or owner["worker_id"] != worker_id or owner["status"] != CLAIMED:
+                return False
+            self._fail(db, job_id, stage, error, time.time())
+            db.execute("UPDATE workers SET job_id = NULL, stage = NULL WHERE worker_id = ?", (worker_id,))
+        return True
+
+    def unfinished_jobs(self) -> int:
+        """Number of jobs that are queued or running."""
+        with self._connect() as db:
+            return db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (PENDING, RUNNING)
+            ).fetchone()[0]
+
+    def blocked_tasks(self) -> list:
+        """
+        Pending tasks no live worker can run, next in their job.
+
+        They stay pending until a worker that fits them joins, and their
+        jobs cannot finish before.
+
+        Returns:
+            The tasks, with their requirements parsed
+        """
+        workers = self.workers()
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT t.* FROM tasks t JOIN jobs j ON j.job_id = t.job_id"
+                " WHERE t.status = ? AND j.status IN (?, ?)"
+                " AND NOT EXISTS (SELECT 1 FROM tasks p WHERE p.job_id = t.job_id"
+                " AND p.position < t.position AND p.status != ?)"
+                " ORDER BY j.created_at, t.position",
+                (PENDING, PENDING, RUNNING, COMPLETED),
+            ).fetchall()
+        blocked = []
+        for row in rows:
+            requirements = json.loads(row["requirements_json"])
+            if not any(_can_run(worker["capabilities"], row["stage"], requirements) for worker in workers):
+                blocked.append({**dict(row), "requirements": requirements})
+        return blocked
+
+    def jobs(self) -> list:
+        with self._connect() as db:
+            return [dict(row) for row in db.execute("SELECT * FROM jobs ORDER BY created_at")]
+
+    def tasks(self, job_id: str = None) -> list:
+        with self._connect() as db:
+            if job_id is None:
+                rows = db.execute("SELECT * FROM tasks ORDER BY job_id, position")
+            else:
+                rows = db.execute("SELECT * FROM tasks WHERE job_id = ? ORDER BY position", (job_id,))
+            return [dict(row) for row in rows]
+
+    def workers(self) -> list:
+        """Workers that sent a heartbeat within the stall timeout."""
+        with self._connect() as db:
+            return [
+                {**dict(row), "capabilities": json.loads(row["capabilities_json"])}
+                for row in db.execute(
+                    "SELECT * FROM workers WHERE heartbeat_at >= ? ORDER BY started_at",
+                    (time.time() - self.stall_timeout,),
+                )
+            ]
@@ -0,0 +1,210 @@
+"""
+Worker process claiming pipeline stages from a SharedJobStore.
+
+Every node runs one worker per stage it should execute at a time. Workers
+advertise their capabilities when they start, poll the store for tasks
+they fit, and run each task as a single stage of run_job against the
+job's result folder on the shared filesystem. A background thread sends
+heartbeats while a stage runs, and aborts the stage if another worker took
+the task over.
+"""
+
+import os
+import platform
+import sqlite3
+import threading
+import time
+import uuid
+
+from ..config import RunConfig
+from ..pipeline import CommandAborted, stages_for_config, run_job
+from .store import HEARTBEAT_INTERVAL_S, SharedJobStore
+
+
+def node_capabilities(**overrides) -> dict:
+    """
+    Resources of this node as matched against stage requirements.
+
+    Overrides replace probed values, e.g. to reserve part of a node or to
+    simulate a mixed fleet with local processes.
+
+    Returns:
+        Dictionary with hostname, cpu_count, ram_mb and gpu_count
+    """
+    # Imported here because the history package depends on the pipeline
+    from ..history import get_host_specs
+
+    specs = get_host_specs()
+    capabilities = {
+        "hostname": specs["hostname"],
+        "cpu_count": specs["cpu_count"],
+        "ram_mb": specs["ram_total_mb"],
+        "gpu_count": len(specs["gpus"]),
+    }
+    capabilities.update({key: value for key, value in overrides.items() if value is not None})
+    return capabilities
+
+
+def run_stage_task(task: dict, log_callback=None, history_path: str = None) -> None:
+    """Run the stage a task names, raising PipelineError on failure."""
+    config = RunConfig.from_dict(task["config"])
+    stages = [stage for stage in stages_for_config(config) if stage.name == task["stage"]]
+    if not stages:
+        raise ValueError(f"Stage '{task['stage']}' is not part of this job's pipeline")
+    run_job(
+        task["dataset_path"],
+        task["result_path"],
+        config,
+        log_callback=log_callback,
+        history_path=history_path,
+        stages=stages,
+        finalize=task["last"],
+    )
+
+
+def stub_stage_task(task: dict, log_callback=None, stage_seconds: float = 2.0, **kwargs) -> None:
+    """Stand-in for run_stage_task that sleeps and writes a marker file."""
+    if log_callback:
+        log_callback(f"[stub] {task['stage']} of job {task['job_id']}\n")
+    time.sleep(stage_seconds)
+    os.makedirs(task["result_path"], exist_ok=True)
+    with open(os.path.join(task["result_path"], f"stub_{task['stage']}.done"), "w") as f:
+        f.write(f"{platform.node()} {os.getpid()}\n")
+
+
+class Worker:
+    """
+    Claims and runs tasks until stopped.
+
+    Args:
+        store: Shared job store
+        capabilities: Advertised resources, see node_capabilities
+        stages: Only claim these stage names, or any if None
+        stage_fn: Callable with run_stage_task's signature
+        history_path: Run history database, or None to disable recording
+        poll_interval: Seconds between claims while idle
+        heartbeat_interval: Seconds between heartbeats
+        output_callback: Receives the worker's own log lines
+    """
+
+    def __init__(
+        self,
+        store: SharedJobStore,
+        capabilities: dict = None,
+        stages: list = None,
+        stage_fn=run_stage_task,
+        history_path: str = None,
+        poll_interval: float = 2.0,
+        heartbeat_interval: float = HEARTBEAT_INTERVAL_S,
+        output_callback=None,
+    ):
+        self.store = store
+        self.capabilities = capabilities or node_capabilities()
+        hostname = self.capabilities.get("hostname") or platform.node()
+        self.worker_id = f"{hostname}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.stages = stages
+        self.stage_fn = stage_fn
+        self.history_path = history_path
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.output_callback = output_callback
+        self._stop = threading.Event()
+
+    def log(self, msg: str) -> None:
+        msg = f"[{self.worker_id}] {msg}"
+        print(msg)
+        if self.output_callback: self.output_callback(msg + "\n")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _heartbeats(self, task: dict, done: threading.Event, lost: threading.Event) -> None:
+        while not done.wait(self.heartbeat_interval):
+            try:
+                claimed = self.store.heartbeat(self.worker_id, task["job_id"], task["stage"])
+            except (TimeoutError, sqlite3.OperationalError) as e:
+                # A busy or briefly unreachable store, the task only stalls after many misses
+                self.log(f"Heartbeat for {task['job_id']}/{task['stage']} failed, retrying: {e}")
+                continue
+            if not claimed:
+                self.log(f"Lost the claim on {task['job_id']}/{task['stage']}, another worker took it over")
+                lost.set()
+                return
+
+    def run_task(self, task: dict) -> bool:
+        """Run one claimed task and report the outcome to the store."""
+        self.log(f"Running {task['job_id']}/{task['stage']} (attempt {task['attempt']})")
+        log_path = os.path.join(task["result_path"], f"stage_{task['stage']}.log")
+        os.makedirs(task["result_path"], exist_ok=True)
+
+        done = threading.Event()
+        lost = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeats, args=(task, done, lost), daemon=True)
+        heartbeat.start()
+        start = time.perf_counter()
+        try:
+            with open(log_path, "a") as log_file:
+                def write_log(msg):
+                    log_file.write(msg)
+                    log_file.flush()
+                    # Stages log as they go, so the next line stops the stage and its running command
+                    if lost.is_set():
+                        raise CommandAborted("Another worker took the task over")
+
+                self.stage_fn(task, log_callback=write_log, history_path=self.history_path)
+        except Exception as e:
+            if lost.is_set():
+                self.log(f"{task['job_id']}/{task['stage']} aborted after being taken over")
+                return False
+            self.log(f"{task['job_id']}/{task['stage']} failed: {e}")
+            self.store.fail(self.worker_id, task["job_id"], task["stage"], str(e))
+            return False
+        finally:
+            done.set()
+            heartbeat.join()
+
+        if not self.store.complete(self.worker_id, task["job_id"], task["stage"]):
+            self.log(f"{task['job_id']}/{task['stage']} finished after being taken over, result discarded")
+            return False
+        self.log(f"{task['job_id']}/{task['stage']} completed in {time.perf_counter() - start:.1f} s")
+        return True
+
+    def _drained(self) -> bool:
+        """True once every unfinished job waits on a task no live worker can run."""
+        blocked = self.store.blocked_tasks()
+        if self.store.unfinished_jobs() > len(blocked):
+            return False
+        for task in blocked:
+            self.log(f"{task['job_id']}/{task['stage']} needs {task['requirements']}, which no live worker has")
+        return True
+
+    def run(self, max_tasks: int = None, exit_when_drained: bool = False) -> int:
+        """
+        Claim and run tasks until stopped.
+
+        Args:
+            max_tasks: Stop after this many tasks
+            exit_when_drained: Stop once every job in the store has finished,
+                or waits on a task no live worker can run
+
+        Returns:
+            Number of tasks run
+        """
+        # With the stage filter, so the store knows which tasks no worker can run
+        self.store.register_worker(self.worker_id, {**self.capabilities, "stages": self.stages})
+        self.log(f"Started with {self.capabilities}")
+        count = 0
+        try:
+            while not self._stop.is_set() and (max_tasks is None or count < max_tasks):
+                task = self.store.claim(self.worker_id, self.capabilities, self.stages)
+                if task is None:
+                    if exit_when_drained and self._drained():
+                        break
+                    self.store.heartbeat(self.worker_id)
+                    self._stop.wait(self.poll_interval)
+                    continue
+                self.run_task(task)
+                count += 1
+        finally:
+            self.store.unregister_worker(self.worker_id)
+        return count
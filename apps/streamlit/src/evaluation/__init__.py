@@ -0,0 +1,37 @@
+"""Evaluation module scoring reconstructions against references and costs."""
+
+from .metrics import (
+    load_points,
+    voxel_downsample,
+    compare_point_sets,
+    umeyama_similarity,
+    align_by_cameras,
+    texture_coverage,
+)
+from .report import (
+    EVALUATION_NAME,
+    TARGETS,
+    dataset_class,
+    evaluate_result,
+    read_evaluation,
+    collect_scores,
+    pareto_front,
+    pareto_report,
+)
+
+__all__ = [
+    "load_points",
+    "voxel_downsample",
+    "compare_point_sets",
+    "umeyama_similarity",
+    "align_by_cameras",
+    "texture_coverage",
+    "EVALUATION_NAME",
+    "TARGETS",
+    "dataset_class",
+    "evaluate_result",
+    "read_evaluation",
+    "collect_scores",
+    "pareto_front",
+    "pareto_report",
+]
@@ -0,0 +1,289 @@
+"""
+Geometric and texture quality metrics for reconstruction outputs.
+
+Clouds are compared in the style of the Tanks and Temples benchmark: both
+are voxel-downsampled so point density does not bias the result, nearest
+neighbour distances are queried from a KD-tree in both directions, and
+precision and recall count the points within a distance tolerance.
+Reconstructions from different runs live in different coordinate frames,
+so results are first aligned with a similarity transform estimated from
+the camera centres both sparse models registered.
+"""
+
+import numpy as np
+
+# Points per KD-tree query, bounds the distance and index arrays in memory
+DEFAULT_CHUNK_SIZE = 1_000_000
+# Surface samples drawn from a mesh before voxel downsampling
+DEFAULT_MESH_SAMPLES = 2_000_000
+# Tolerance as a fraction of the reference bounding box diagonal when not given
+DEFAULT_TOLERANCE_RATIO = 0.005
+MIN_COMMON_CAMERAS = 3
+
+
+def load_points(path: str, mesh_samples: int = DEFAULT_MESH_SAMPLES) -> np.ndarray:
+    """
+    Points of a cloud, or samples spread uniformly over a mesh surface.
+
+    Returns:
+        (N, 3) float64 array
+
+    Raises:
+        ValueError: If the file holds no geometry
+    """
+    import trimesh
+
+    geometry = trimesh.load(path)
+    if isinstance(geometry, trimesh.Scene):
+        geometry = geometry.dump(concatenate=True) if geometry.geometry else None
+    if isinstance(geometry, trimesh.points.PointCloud):
+        points = np.asarray(geometry.vertices, dtype=np.float64)
+    elif isinstance(geometry, trimesh.Trimesh) and len(geometry.faces):
+        points, _ = trimesh.sample.sample_surface(geometry, mesh_samples, seed=0)
+        points = np.asarray(points, dtype=np.float64)
+    else:
+        points = np.empty((0, 3))
+    if len(points) == 0:
+        raise ValueError(f"No geometry found in {path}")
+    return points
+
+
+def voxel_downsample(points: np.ndarray, voxel_size: float) -> np.ndarray:
+    """Keep the first point of every occupied voxel."""
+    if voxel_size <= 0 or len(points) == 0:
+        return points
+    keys = np.floor((points - points.min(axis=0)) / voxel_size).astype(np.int64)
+    dims = keys.max(axis=0) + 1
+    if float(dims[0]) * float(dims[1]) * float(dims[2]) < 2 ** 62:
+        # One integer per voxel, far faster to deduplicate than rows
+        keys = (keys[:, 0] * dims[1] + keys[:, 1]) * dims[2] + keys[:, 2]
+        _, first = np.unique(keys, return_index=True)
+    else:
+        _, first = np.unique(keys, axis=0, return_index=True)
+    return points[np.sort(first)]
+
+
+def nearest_distances(query: np.ndarray, tree, chunk_size: int = DEFAULT_CHUNK_SIZE) -> np.ndarray:
+    """
+    Distance from every query point to its nearest neighbour in a KD-tree.
+
+    Args:
+        query: (N, 3) points
+        tree: scipy.spatial.cKDTree over the other cloud
+        chunk_size: Points per query, all CPU cores work on each chunk
+
+    Returns:
+        (N,) float32 distances
+    """
+    distances = np.empty(len(query), dtype=np.float32)
+    for start in range(0, len(query), chunk_size):
+        stop = start + chunk_size
+        distances[start:stop], _ = tree.query(query[start:stop], k=1, workers=-1)
+    return distances
+
+
+def bounding_diagonal(points: np.ndarray) -> float:
+    return float(np.linalg.norm(points.max(axis=0) - points.min(axis=0)))
+
+
+def compare_point_sets(
+    points: np.ndarray,
+    reference: np.ndarray,
+    tolerance: float,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> dict:
+    """
+    Chamfer distance, precision, recall and F-score of a cloud against a reference.
+
+    Args:
+        points: (N, 3) reconstructed points, in the reference frame
+        reference: (M, 3) reference points
+        tolerance: Distance below which a point counts as matched
+        chunk_size: Points per KD-tree query
+
+    Returns:
+        Dictionary with accuracy (mean distance to the reference), completeness
+        (mean distance from the reference), chamfer, their medians, precision,
+        recall, fscore and the point counts
+    """
+    from scipy.spatial import cKDTree
+
+    # Unbalanced trees build several times faster and query about as fast
+    to_reference = nearest_distances(
+        points, cKDTree(reference, balanced_tree=False, compact_nodes=False), chunk_size
+    )
+    from_reference = nearest_distances(
+        reference, cKDTree(points, balanced_tree=False, compact_nodes=False), chunk_size
+    )
+
+    precision = float(np.count_nonzero(to_reference < tolerance)) / len(to_reference)
+    recall = float(np.count_nonzero(from_reference < tolerance)) / len(from_reference)
+    accuracy = float(to_reference.mean(dtype=np.float64))
+    completeness = float(from_reference.mean(dtype=np.float64))
+    return {
+        "tolerance": tolerance,
+        "num_points": len(points),
+        "num_reference_points": len(reference),
+        "accuracy": accuracy,
+        "completeness": completeness,
+        "chamfer": (accuracy + completeness) / 2,
+        "accuracy_median": float(np.median(to_reference)),
+        "completeness_median": float(np.median(from_reference)),
+        "precision": precision,
+        "recall": recall,
+        "fscore": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+    }
+
+
+def apply_transform(points: np.ndarray, transform: np.ndarray) -> np.ndarray:
+    """Apply a 4x4 similarity transform to (N, 3) points."""
+    return points @ transform[:3, :3].T + transform[:3, 3]
+
+
+def umeyama_similarity(source: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """
+    Least-squares similarity transform mapping source points onto target points.
+
+    Returns:
+        4x4 matrix with scale folded into the rotation block
+    """
+    source_mean = source.mean(axis=0)
+    target_mean = target.mean(axis=0)
+    source_centered = source - source_mean
+    target_centered = target - target_mean
+
+    covariance = target_centered.T @ source_centered / len(source)
+    u, singular, vt = np.linalg.svd(covariance)
+    correction = np.eye(3)
+    if np.linalg.det(u) * np.linalg.det(vt) < 0:
+        correction[2, 2] = -1
+    rotation = u @ correction @ vt
+    variance = (source_centered ** 2).sum() / len(source)
+    scale = float(np.trace(np.diag(singular) @ correction) / variance) if variance else 1.0
+
+    transform = np.eye(4)
+    transform[:3, :3] = scale * rotation
+    transform[:3, 3] = target_mean - scale * rotation @ source_mean
+    return transform
+
+
+def camera_centers(sparse_model_path: str) -> dict:
+    """Projection centres of the registered images of a COLMAP model, keyed by image name."""
+    import pycolmap
+
+    reconstruction = pycolmap.Reconstruction(sparse_model_path)
+    return {image.name: np.asarray(image.projection_center()) for image in reconstruction.images.values()}
+
+
+def align_by_cameras(sparse_model_path: str, reference_model_path: str) -> tuple:
+    """
+    Similarity transform from one sparse model's frame into another's.
+
+    Both models must come from the same images, so registered image names
+    give point correspondences between the frames.
+
+    Returns:
+        (transform, info) where info holds the number of common cameras and
+        the RMS camera centre residual in reference units
+
+    Raises:
+        ValueError: If too few images are registered in both models
+    """
+    centers = camera_centers(sparse_model_path)
+    reference_centers = camera_centers(reference_model_path)
+    common = sorted(set(centers) & set(reference_centers))
+    if len(common) < MIN_COMMON_CAMERAS:
+        raise ValueError(
+            f"Only {len(common)} images are registered in both {sparse_model_path} "
+            f"and {reference_model_path}, at least {MIN_COMMON_CAMERAS} are needed"
+        )
+
+    source = np.array([centers[name] for name in common])
+    target = np.array([reference_centers[name] for name in common])
+    transform = umeyama_similarity(source, target)
+    residuals = np.linalg.norm(apply_transform(source, transform) - target, axis=1)
+    return transform, {
+        "method": "cameras",
+        "common_cameras": len(common),
+        "camera_rms": float(np.sqrt((residuals ** 2).mean())),
+    }
+
+
+def refine_alignment_icp(points: np.ndarray, reference: np.ndarray, max_distance: float) -> tuple:
+    """
+    Refine an approximate alignment with scaled point-to-point ICP.
+
+    Returns:
+        (transform, info) with the 4x4 correction to apply on top of the
+        approximate alignment, and the ICP fitness and inlier RMSE
+    """
+    import open3d as o3d
+
+    source = o3d.geometry.PointCloud(o3d.utility.Vector3dVector(points))
+    target = o3d.geometry.PointCloud(o3d.utility.Vector3dVector(reference))
+    result = o3d.pipelines.registration.registration_icp(
+        source, target, max_distance, np.eye(4),
+        o3d.pipelines.registration.TransformationEstimationPointToPoint(with_scaling=True),
+    )
+    return np.asarray(result.transformation), {
+        "icp_fitness": float(result.fitness),
+        "icp_rmse": float(result.inlier_rmse),
+    }
+
+
+def _unpack_color(color: int) -> np.ndarray:
+    return np.array([(color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF], dtype=np.uint8)
+
+
+def texture_coverage(mesh_path: str, empty_color: int = 0) -> dict:
+    """
+    Share of a textured mesh's surface that received texture from the images.
+
+    OpenMVS fills faces no view sees with --empty-color. Each face samples the
+    atlas at its UV centroid; faces landing on the empty colour, and faces
+    without UVs or a texture image, count as uncovered. Shares are weighted by
+    face area.
+
+    Args:
+        mesh_path: Textured OBJ, e.g. result.obj
+        empty_color: The --empty-color TextureMesh ran with, as 0xRRGGBB
+
+    Returns:
+        Dictionary with texture_coverage and textured_faces share of faces
+    """
+    import trimesh
+
+    loaded = trimesh.load(mesh_path)
+    meshes = list(loaded.geometry.values()) if isinstance(loaded, trimesh.Scene) else [loaded]
+    empty = _unpack_color(empty_color)
+
+    covered_area = total_area = 0.0
+    covered_faces = total_faces = 0
+    for mesh in meshes:
+        if not isinstance(mesh, trimesh.Trimesh) or not len(mesh.faces):
+            continue
+        areas = mesh.area_faces
+        total_area += float(areas.sum())
+        total_faces += len(mesh.faces)
+
+        visual = mesh.visual
+        uv = getattr(visual, "uv", None)
+        image = getattr(getattr(visual, "material", None), "image", None)
+        if uv is None or len(uv) != len(mesh.vertices) or image is None:
+            continue
+
+        atlas = np.asarray(image.convert("RGB"))
+        height, width = atlas.shape[:2]
+        centroids = np.asarray(uv)[mesh.faces].mean(axis=1) % 1.0
+        columns = np.clip((centroids[:, 0] * width).astype(np.int64), 0, width - 1)
+        rows = np.clip(((1.0 - centroids[:, 1]) * height).astype(np.int64), 0, height - 1)
+        covered = np.any(atlas[rows, columns] != empty, axis=1)
+        covered_area += float(areas[covered].sum())
+        covered_faces += int(np.count_nonzero(covered))
+
+    if not total_faces:
+        raise ValueError(f"No faces found in {mesh_path}")
+    return {
+        "texture_coverage": covered_area / total_area if total_area else 0.0,
+        "textured_faces": covered_faces / total_faces,
+    }
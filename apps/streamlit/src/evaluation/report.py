@@ -0,0 +1,305 @@
+"""
+Quality-versus-cost report across reconstruction profiles.
+
+evaluate_result scores one result folder against a reference and stores the
+scores in the folder as evaluation.json. pareto_report joins the scores of
+many folders with the runtime and memory the run history recorded for them,
+groups the results by dataset class and finds, per class, the profiles on
+the Pareto front of cost against F-score and the cheapest profile whose
+F-score is within a margin of the best one.
+"""
+
+import json
+import os
+import statistics
+import time
+
+import numpy as np
+
+from ..config import RunConfig
+from ..pipeline.journal import JobJournal
+from .metrics import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_MESH_SAMPLES,
+    DEFAULT_TOLERANCE_RATIO,
+    align_by_cameras,
+    apply_transform,
+    bounding_diagonal,
+    compare_point_sets,
+    load_points,
+    refine_alignment_icp,
+    texture_coverage,
+    voxel_downsample,
+)
+
+EVALUATION_NAME = "evaluation.json"
+# Output compared for each evaluation target
+TARGETS = {"dense": "scene_dense.ply", "mesh": "result.obj"}
+# F-score difference below which profiles count as equally accurate
+DEFAULT_FSCORE_MARGIN = 0.01
+# Dataset class bounds: image counts and megapixels
+_IMAGE_COUNT_BOUNDS = (50, 200, 1000)
+_MEGAPIXEL_BOUNDS = (4, 12)
+
+
+def _bucket(value: float, bounds: tuple, unit: str) -> str:
+    lower = 0
+    for upper in bounds:
+        if value <= upper:
+            return f"{lower}-{upper} {unit}"
+        lower = upper
+    return f">{lower} {unit}"
+
+
+def dataset_class(num_images: int, image_width: int = None, image_height: int = None) -> str:
+    """Dataset class from its size and resolution, e.g. "50-200 images, 4-12 MP"."""
+    name = _bucket(num_images, _IMAGE_COUNT_BOUNDS, "images")
+    if image_width and image_height:
+        name += ", " + _bucket(image_width * image_height / 1e6, _MEGAPIXEL_BOUNDS, "MP")
+    return name
+
+
+def _result_config(result_path: str) -> RunConfig:
+    """Run configuration a result folder was produced with, from its journal."""
+    fingerprint = JobJournal(result_path).data.get("fingerprint")
+    return RunConfig.from_dict(json.loads(fingerprint)) if fingerprint else None
+
+
+def _empty_color(config: RunConfig) -> int:
+    """The --empty-color TextureMesh ran with, given as a string such as "0x00FF7F" or as an integer."""
+    value = config.openmvs_params("TextureMesh").get("--empty-color", 0) if config else 0
+    return int(str(value), 0)
+
+
+def _sparse_model(result_path: str) -> str:
+    return os.path.join(result_path, "sparse", "0")
+
+
+def read_evaluation(result_path: str) -> dict:
+    path = os.path.join(result_path, EVALUATION_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def evaluate_result(
+    result_path: str,
+    reference: str,
+    target: str = "dense",
+    tolerance: float = None,
+    transform: np.ndarray = None,
+    refine_icp: bool = False,
+    dataset_class_name: str = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    mesh_samples: int = DEFAULT_MESH_SAMPLES,
+    output_callback=None,
+) -> dict:
+    """
+    Score a result folder against a reference and write evaluation.json.
+
+    Args:
+        result_path: Result folder to score
+        reference: Result folder of a reference run over the same images, or
+            a ground-truth scan file (point cloud or mesh)
+        target: Key of TARGETS, the output to compare
+        tolerance: Match distance in reference units, by default 0.5% of the
+            reference bounding box diagonal
+        transform: 4x4 matrix from the result's frame into a scan's frame.
+            Reference folders are aligned through their camera centres instead
+        refine_icp: Refine the alignment with scaled ICP
+        dataset_class_name: Class to report the result under, by default
+            derived from the dataset size and resolution
+        chunk_size: Points per KD-tree query
+        mesh_samples: Points sampled from meshes before downsampling
+
+    Returns:
+        The evaluation as written
+
+    Raises:
+        ValueError: On an unknown target, or when alignment is impossible
+        FileNotFoundError: If the output or reference is missing
+    """
+    if target not in TARGETS:
+        raise ValueError(f"Unknown evaluation target '{target}', expected one of {sorted(TARGETS)}")
+    output_file = os.path.join(result_path, TARGETS[target])
+    reference_file = os.path.join(reference, TARGETS[target]) if os.path.isdir(reference) else reference
+    for path in (output_file, reference_file):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} does not exist")
+
+    start = time.perf_counter()
+    points = load_points(output_file, mesh_samples)
+    reference_points = load_points(reference_file, mesh_samples)
+
+    if transform is not None:
+        alignment = {"method": "transform"}
+    elif os.path.isdir(reference):
+        transform, alignment = align_by_cameras(_sparse_model(result_path), _sparse_model(reference))
+    else:
+        transform, alignment = np.eye(4), {"method": "none"}
+    points = apply_transform(points, np.asarray(transform, dtype=np.float64))
+
+    if tolerance is None:
+        tolerance = DEFAULT_TOLERANCE_RATIO * bounding_diagonal(reference_points)
+    # Equal density on both sides, otherwise the denser cloud wins recall
+    points = voxel_downsample(points, tolerance / 2)
+    reference_points = voxel_downsample(reference_points, tolerance / 2)
+
+    if refine_icp:
+        correction, icp_info = refine_alignment_icp(points, reference_points, 2 * tolerance)
+        points = apply_transform(points, correction)
+        transform = correction @ transform
+        alignment.update(icp_info)
+    alignment["transform"] = np.asarray(transform).tolist()
+
+    scores = compare_point_sets(points, reference_points, tolerance, chunk_size)
+
+    config = _result_config(result_path)
+    result_obj = os.path.join(result_path, "result.obj")
+    if os.path.exists(result_obj):
+        scores.update(texture_coverage(result_obj, _empty_color(config)))
+
+    evaluation = {
+        "reference": os.path.abspath(reference),
+        "target": target,
+        "profile": config.quality_profile if config else None,
+        "dataset_class": dataset_class_name,
+        "alignment": alignment,
+        "scores": scores,
+        "evaluated_at": time.time(),
+    }
+    with open(os.path.join(result_path, EVALUATION_NAME), "w") as f:
+        json.dump(evaluation, f, indent=2)
+
+    msg = (
+        f"{result_path}: F-score {scores['fscore']:.3f} (precision {scores['precision']:.3f}, "
+        f"recall {scores['recall']:.3f}) at {tolerance:.4g}, chamfer {scores['chamfer']:.4g}"
+    )
+    if "texture_coverage" in scores:
+        msg += f", texture coverage {scores['texture_coverage']:.1%}"
+    msg += f" [{time.perf_counter() - start:.1f} s]\n"
+    print(msg)
+    if output_callback: output_callback(msg)
+    return evaluation
+
+
+def collect_scores(job_dirs: list, history=None) -> list:
+    """
+    Join the evaluations of result folders with their recorded costs.
+
+    Args:
+        job_dirs: Result folders, those without evaluation.json are skipped
+        history: RunHistory to read runtime and memory from, or None
+
+    Returns:
+        List of dicts with result_path, profile, dataset_class, the scores,
+        duration_s, seconds_per_100_images, peak_memory_mb and stages. Cost
+        fields are None for folders the history has no runs for
+    """
+    rows = []
+    for job_dir in job_dirs:
+        evaluation = read_evaluation(job_dir)
+        if evaluation is None:
+            continue
+        costs = history.result_costs(job_dir) if history else None
+        costs = costs or {}
+        num_images = costs.get("num_images")
+        class_name = evaluation.get("dataset_class")
+        if not class_name:
+            class_name = dataset_class(num_images, costs.get("image_width"), costs.get("image_height")) \
+                if num_images else "unknown"
+        duration = costs.get("duration_s")
+        rows.append({
+            "result_path": job_dir,
+            "profile": evaluation.get("profile") or costs.get("profile") or "unknown",
+            "dataset_class": class_name,
+            "target": evaluation["target"],
+            **evaluation["scores"],
+            "duration_s": duration,
+            "seconds_per_100_images": duration * 100.0 / num_images if duration and num_images else None,
+            "peak_memory_mb": costs.get("peak_memory_mb"),
+            "stages": costs.get("stages", {}),
+        })
+    return rows
+
+
+def pareto_front(entries: list, cost_key: str, quality_key: str) -> list:
+    """
+    Entries no other entry beats on both cost (lower) and quality (higher).
+
+    Returns:
+        The non-dominated entries, cheapest first
+    """
+    ordered = sorted(entries, key=lambda e: (e[cost_key], -e[quality_key]))
+    front = []
+    for entry in ordered:
+        if not front or entry[quality_key] > front[-1][quality_key]:
+            front.append(entry)
+    return front
+
+
+def _median(values: list):
+    values = [v for v in values if v is not None]
+    return statistics.median(values) if values else None
+
+
+def pareto_report(
+    rows: list,
+    quality_key: str = "fscore",
+    cost_key: str = "seconds_per_100_images",
+    margin: float = DEFAULT_FSCORE_MARGIN,
+) -> list:
+    """
+    Per dataset class, compare profiles on median quality and median cost.
+
+    The recommended profile is the cheapest one whose median quality is
+    within margin of the best. Profiles costing more than it buy no
+    measurable quality and are listed as retirable.
+
+    Args:
+        rows: Output of collect_scores
+        quality_key: Score to maximise
+        cost_key: Cost to minimise
+        margin: Quality difference treated as no difference
+
+    Returns:
+        List of dicts with dataset_class, profiles (one summary per profile,
+        flagged with pareto), recommended and retire
+    """
+    classes = {}
+    for row in rows:
+        classes.setdefault(row["dataset_class"], {}).setdefault(row["profile"], []).append(row)
+
+    report = []
+    for class_name, profiles in sorted(classes.items()):
+        summaries = []
+        for profile, profile_rows in sorted(profiles.items()):
+            summaries.append({
+                "profile": profile,
+                "runs": len(profile_rows),
+                quality_key: _median([r.get(quality_key) for r in profile_rows]),
+                "chamfer": _median([r.get("chamfer") for r in profile_rows]),
+                "texture_coverage": _median([r.get("texture_coverage") for r in profile_rows]),
+                cost_key: _median([r.get(cost_key) for r in profile_rows]),
+                "peak_memory_mb": _median([r.get("peak_memory_mb") for r in profile_rows]),
+                "pareto": False,
+            })
+
+        comparable = [s for s in summaries if s[quality_key] is not None and s[cost_key] is not None]
+        for summary in pareto_front(comparable, cost_key, quality_key):
+            summary["pareto"] = True
+
+        recommended, retire = None, []
+        if comparable:
+            best = max(s[quality_key] for s in comparable)
+            adequate = [s for s in comparable if s[quality_key] >= best - margin]
+            recommended = min(adequate, key=lambda s: s[cost_key])
+            retire = [s["profile"] for s in comparable if s[cost_key] > recommended[cost_key]]
+        report.append({
+            "dataset_class": class_name,
+            "profiles": summaries,
+            "recommended": recommended["profile"] if recommended else None,
+            "retire": retire,
+        })
+    return report
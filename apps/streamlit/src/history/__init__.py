@@ -0,0 +1,11 @@
+"""Run history module for recording and querying past pipeline runs."""
+
+from .store import RunHistory, RunRecorder
+from .probe import get_host_specs, probe_image_size
+
+__all__ = [
+    "RunHistory",
+    "RunRecorder",
+    "get_host_specs",
+    "probe_image_size",
+]
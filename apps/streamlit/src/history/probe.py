@@ -0,0 +1,81 @@
+"""
+Host and dataset probing used to annotate recorded runs.
+"""
+
+import os
+import platform
+import shutil
+import struct
+import subprocess
+
+
+def get_host_specs() -> dict:
+    """
+    Describe the machine a run executes on.
+
+    Returns:
+        Dictionary with hostname, platform, CPU count, total RAM in MB and
+        the list of visible GPUs (empty if nvidia-smi is unavailable).
+    """
+    return {
+        "hostname": platform.node(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "ram_total_mb": _total_ram_mb(),
+        "gpus": _list_gpus(),
+    }
+
+
+def _total_ram_mb():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def _list_gpus() -> list:
+    if shutil.which("nvidia-smi") is None:
+        return []
+    try:
+        output = subprocess.run(
+            ["nvidia-smi", "--query-gpu=name,memory.total", "--format=csv,noheader"],
+            capture_output=True,
+            text=True,
+            timeout=10,
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return []
+    return [line.strip() for line in output.splitlines() if line.strip()]
+
+
+def probe_image_size(image_path: str):
+    """
+    Read the pixel size of a JPEG or PNG file from its header.
+
+    Only the header is parsed, so this is cheap even for large images.
+
+    Args:
+        image_path: Path to the image file
+
+    Returns:
+        (width, height) tuple, or None if the format is not recognised
+    """
+    with open(image_path, "rb") as f:
+        head = f.read(24)
+        if head[:8] == b"\x89PNG\r\n\x1a\n":
+            width, height = struct.unpack(">II", head[16:24])
+            return width, height
+        if head[:2] != b"\xff\xd8":
+            return None
+
+        f.seek(2)
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            length = struct.unpack(">H", f.read(2))[0]
+            # SOF0..SOF15 carry the frame size, except DHT/JPG/DAC markers
+            if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack(">xHH", f.read(5))
+                return width, height
+            f.seek(length - 2, os.SEEK_CUR)
@@ -0,0 +1,354 @@
+"""
+SQLite-backed history of pipeline runs.
+
+Each run records the dataset size and resolution, the resolved profile
+parameters, the host it ran on, and the duration and peak memory of every
+stage. Stage times are compared per 100 images so that datasets of
+different sizes fall into the same cohort.
+"""
+
+import json
+import os
+import resource
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from ..pipeline.runner import track_child_memory
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    status TEXT NOT NULL DEFAULT 'running',
+    dataset_path TEXT,
+    result_path TEXT,
+    num_images INTEGER NOT NULL,
+    image_width INTEGER,
+    image_height INTEGER,
+    profile TEXT NOT NULL,
+    params_json TEXT NOT NULL,
+    host_json TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    duration_s REAL NOT NULL,
+    peak_memory_mb REAL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_stages_run ON stages(run_id);
+CREATE INDEX IF NOT EXISTS idx_stages_stage ON stages(stage);
+"""
+
+# Columns added after the first release, created on databases that lack them
+_ADDED_COLUMNS = {
+    "runs": (("result_path", "TEXT"),),
+}
+
+# Robust z-score above which a stage time is flagged as anomalous
+DEFAULT_OUTLIER_THRESHOLD = 3.5
+# Minimum number of other runs needed before a cohort is considered
+MIN_COHORT_SIZE = 5
+
+
+def _self_maxrss_mb() -> float:
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return maxrss / (1024 * 1024)
+    return maxrss / 1024
+
+
+def _percentile(values: list, pct: float) -> float:
+    """Linear-interpolated percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+class RunHistory:
+    """Persistent store of past runs and their per-stage timings."""
+
+    def __init__(self, db_path: str):
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.executescript(_SCHEMA)
+        self._add_missing_columns()
+        self._conn.commit()
+
+    def _add_missing_columns(self) -> None:
+        for table, columns in _ADDED_COLUMNS.items():
+            existing = {row["name"] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            for name, sql_type in columns:
+                if name not in existing:
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {sql_type}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_result ON runs(result_path)")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _execute(self, sql: str, args: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            cursor = self._conn.execute(sql, args)
+            self._conn.commit()
+            return cursor
+
+    def start_run(
+        self,
+        dataset_path: str,
+        num_images: int,
+        image_size,
+        profile: str,
+        params: dict,
+        host: dict,
+        result_path: str = None,
+    ) -> int:
+        """Create a run entry and return its id."""
+        width, height = image_size if image_size else (None, None)
+        if result_path:
+            result_path = os.path.abspath(result_path)
+        cursor = self._execute(
+            "INSERT INTO runs (started_at, dataset_path, result_path, num_images, image_width, image_height,"
+            " profile, params_json, host_json) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                time.time(), dataset_path, result_path, num_images, width, height,
+                profile, json.dumps(params, sort_keys=True), json.dumps(host, sort_keys=True),
+            ),
+        )
+        return cursor.lastrowid
+
+    def record_stage(
+        self,
+        run_id: int,
+        stage: str,
+        duration_s: float,
+        peak_memory_mb: float = None,
+        status: str = "success",
+    ) -> None:
+        self._execute(
+            "INSERT INTO stages (run_id, stage, duration_s, peak_memory_mb, status)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (run_id, stage, duration_s, peak_memory_mb, status),
+        )
+
+    def finish_run(self, run_id: int, status: str) -> None:
+        self._execute(
+            "UPDATE runs SET finished_at = ?, status = ? WHERE id = ?",
+            (time.time(), status, run_id),
+        )
+
+    def get_run(self, run_id: int) -> dict:
+        with self._lock:
+            run = self._conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+            stages = self._conn.execute(
+                "SELECT stage, duration_s, peak_memory_mb, status FROM stages"
+                " WHERE run_id = ? ORDER BY id",
+                (run_id,),
+            ).fetchall()
+        if run is None:
+            return None
+        result = dict(run)
+        result["params"] = json.loads(result.pop("params_json"))
+        result["host"] = json.loads(result.pop("host_json"))
+        result["stages"] = [dict(row) for row in stages]
+        return result
+
+    def result_costs(self, result_path: str) -> dict:
+        """
+        Runtime and memory spent producing a result folder.
+
+        A job resumed after an interruption, or split over several workers,
+        records one run per invocation. Each stage is counted once, from the
+        latest run that completed it.
+
+        Returns:
+            Dictionary with profile, num_images, image_width, image_height,
+            duration_s, peak_memory_mb and per-stage "stages" entries, or None
+            if no run wrote to the folder
+        """
+        with self._lock:
+            runs = self._conn.execute(
+                "SELECT * FROM runs WHERE result_path = ? ORDER BY id",
+                (os.path.abspath(result_path),),
+            ).fetchall()
+            stages = self._conn.execute(
+                "SELECT s.stage, s.duration_s, s.peak_memory_mb FROM stages s"
+                " JOIN runs r ON r.id = s.run_id"
+                " WHERE r.result_path = ? AND s.status = 'success' ORDER BY s.id",
+                (os.path.abspath(result_path),),
+            ).fetchall()
+        if not runs:
+            return None
+
+        latest = {row["stage"]: dict(row) for row in stages}
+        peaks = [stage["peak_memory_mb"] for stage in latest.values() if stage["peak_memory_mb"] is not None]
+        run = runs[-1]
+        return {
+            "profile": run["profile"],
+            "num_images": run["num_images"],
+            "image_width": run["image_width"],
+            "image_height": run["image_height"],
+            "duration_s": sum(stage["duration_s"] for stage in latest.values()),
+            "peak_memory_mb": max(peaks) if peaks else None,
+            "stages": latest,
+        }
+
+    def _normalized_stage_times(self, stage: str = None, profile: str = None) -> list:
+        """Successful stage durations in seconds per 100 images."""
+        sql = (
+            "SELECT r.id AS run_id, r.profile, s.stage,"
+            " s.duration_s * 100.0 / r.num_images AS per_100"
+            " FROM stages s JOIN runs r ON r.id = s.run_id"
+            " WHERE s.status = 'success' AND r.num_images > 0"
+        )
+        args = []
+        if stage is not None:
+            sql += " AND s.stage = ?"
+            args.append(stage)
+        if profile is not None:
+            sql += " AND r.profile = ?"
+            args.append(profile)
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, args).fetchall()]
+
+    def stage_percentiles(
+        self,
+        stage: str = None,
+        profile: str = None,
+        percentiles: tuple = (50, 95),
+    ) -> list:
+        """
+        Stage time percentiles per profile, normalised per 100 images.
+
+        Args:
+            stage: Restrict to a single stage name
+            profile: Restrict to a single quality profile
+            percentiles: Percentiles to compute
+
+        Returns:
+            List of dicts with profile, stage, runs and one "p<N>" key per
+            requested percentile, in seconds per 100 images
+        """
+        cohorts = {}
+        for row in self._normalized_stage_times(stage, profile):
+            cohorts.setdefault((row["profile"], row["stage"]), []).append(row["per_100"])
+
+        report = []
+        for (cohort_profile, cohort_stage), values in sorted(cohorts.items()):
+            entry = {"profile": cohort_profile, "stage": cohort_stage, "runs": len(values)}
+            for pct in percentiles:
+                entry[f"p{pct}"] = _percentile(values, pct)
+            report.append(entry)
+        return report
+
+    def find_outliers(self, run_id: int, threshold: float = DEFAULT_OUTLIER_THRESHOLD) -> list:
+        """
+        Flag stages of a run whose time deviates sharply from their cohort.
+
+        The cohort is every other successful run of the same stage and profile.
+        Deviation is measured as a robust z-score based on the median absolute
+        deviation, so a few earlier outliers do not hide a new one.
+
+        Returns:
+            List of dicts with stage, value, cohort median and score for every
+            flagged stage
+        """
+        run = self.get_run(run_id)
+        if run is None or not run["num_images"]:
+            return []
+
+        flagged = []
+        for stage in run["stages"]:
+            if stage["status"] != "success":
+                continue
+            cohort = [
+                row["per_100"]
+                for row in self._normalized_stage_times(stage["stage"], run["profile"])
+                if row["run_id"] != run_id
+            ]
+            if len(cohort) < MIN_COHORT_SIZE:
+                continue
+
+            value = stage["duration_s"] * 100.0 / run["num_images"]
+            median = statistics.median(cohort)
+            mad = statistics.median(abs(v - median) for v in cohort)
+            # 1.4826 scales the MAD to a standard deviation for normal data
+            scale = 1.4826 * mad or max(median * 0.05, 1e-6)
+            score = (value - median) / scale
+            if abs(score) > threshold:
+                flagged.append({
+                    "stage": stage["stage"],
+                    "seconds_per_100_images": value,
+                    "cohort_median": median,
+                    "score": score,
+                })
+        return flagged
+
+
+class _StageHandle:
+    def __init__(self):
+        self.status = "success"
+
+    def fail(self) -> None:
+        """Mark the stage as failed without raising."""
+        self.status = "failed"
+
+
+class RunRecorder:
+    """Records one run's stages into a RunHistory as they execute."""
+
+    def __init__(self, history: RunHistory, run_id: int):
+        self.history = history
+        self.run_id = run_id
+        self.failed = False
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Time a stage and record its duration and peak memory.
+
+        Peak memory is the largest of the commands run inside the stage, or
+        for in-process work the amount by which the stage raised this
+        process' high-water mark. ru_maxrss never decreases, so in a
+        long-lived process that already peaked higher in an earlier stage or
+        job the growth is zero and only child commands are counted. Stages that report failure through a return value should call
+        ``fail()`` on the yielded handle.
+        """
+        start = time.perf_counter()
+        self_peak_before = _self_maxrss_mb()
+        handle = _StageHandle()
+        with track_child_memory() as child_peaks:
+            try:
+                yield handle
+            except BaseException:
+                handle.fail()
+                raise
+            finally:
+                duration = time.perf_counter() - start
+                self_peak_after = _self_maxrss_mb()
+                peaks = list(child_peaks)
+                if self_peak_after > self_peak_before:
+                    peaks.append(self_peak_after - self_peak_before)
+                self.history.record_stage(
+                    self.run_id, name, duration, max(peaks) if peaks else None, handle.status
+                )
+                if handle.status != "success":
+                    self.failed = True
+
+    def mark_failed(self) -> None:
+        self.failed = True
+
+    def finish(self) -> None:
+        self.history.finish_run(self.run_id, "failed" if self.failed else "success")
@@ -1,19 +1,65 @@
 """Pipeline module for COLMAP and OpenMVS reconstruction."""
 
-from .runner import run_command
+from .runner import CommandAborted, run_command
 from .colmap import (
     sparse_reconstruction,
     convert_colmap_to_txt,
     get_point_cloud_from_sparse_model,
     undistort_images,
+    stage_images,
+    staged_image_name,
 )
 from .openmvs import run_openmvs_pipeline
+from .journal import JobJournal
+from .feature_cache import FeatureStore
+from .preview import build_sparse_preview, is_preview_current, preview_paths
+from .profiling import Profiler, read_profiles
+from .roi import estimate_roi, read_roi, roi_from_box, write_roi_masks
+from .sparse_gate import check_sparse_quality, read_quality_report, select_largest_model, sparse_metrics
+from .job import (
+    PipelineError,
+    JobContext,
+    Stage,
+    PIPELINE_STAGES,
+    RGBD_STAGES,
+    stages_for_config,
+    IMAGE_EXTENSIONS,
+    find_images,
+    run_job,
+)
 
 __all__ = [
+    "CommandAborted",
     "run_command",
     "sparse_reconstruction",
     "convert_colmap_to_txt",
     "get_point_cloud_from_sparse_model",
     "undistort_images",
+    "stage_images",
+    "staged_image_name",
     "run_openmvs_pipeline",
+    "JobJournal",
+    "FeatureStore",
+    "build_sparse_preview",
+    "is_preview_current",
+    "preview_paths",
+    "Profiler",
+    "read_profiles",
+    "estimate_roi",
+    "read_roi",
+    "roi_from_box",
+    "write_roi_masks",
+    "check_sparse_quality",
+    "read_quality_report",
+    "select_largest_model",
+    "sparse_metrics",
+    "PipelineError",
+    "JobContext",
+    "Stage",
+    "PIPELINE_STAGES",
+    "RGBD_STAGES",
+    "stages_for_config",
+    "IMAGE_EXTENSIONS",
+    "find_images",
+    "run_job",
 ]
@@ -1,28 +1,96 @@
-from ..config import settings, get_colmap_params
-from ..pipeline import run_command
-import open3d as o3d
+from ..config import RunConfig
+from .feature_cache import FeatureStore, file_hash, options_key
+from .sparse_gate import list_models, select_largest_model
+import numpy as np
 import os
-import pycolmap
 import shutil
 
-def sparse_reconstruction(color_files: list, result_path: str, output_callback=None):
-    database_path = os.path.join(result_path, "database.db")
-    image_dir = os.path.join(result_path, "images_temp")
-    output_path = os.path.join(result_path, "sparse")
+# pycolmap and open3d are imported inside the functions that need them, so
+# importing the pipeline package stays cheap for the app and the API
+
+MATCHERS = ("sequential", "exhaustive")
+
+
+def staged_image_name(index: int) -> str:
+    """Name COLMAP knows the index-th input image by, see sparse_reconstruction."""
+    return f"image{index+1}.jpg"
+
 
+def stage_images(color_files: list, image_dir: str) -> None:
+    """Copy the inputs into image_dir under the names COLMAP knows them by."""
     os.makedirs(image_dir, exist_ok=True)
 
     for i, color_file in enumerate(color_files):
-        image_name = f"image{i+1}.jpg"
+        image_name = staged_image_name(i)
         image_path = os.path.join(image_dir, image_name)
         shutil.copyfile(color_file, image_path)
 
-    fe_params = get_colmap_params("feature_extraction")
-    match_params = get_colmap_params("matching")
-    map_params = get_colmap_params("incremental_mapping")
+
+def _colmap_device(config: RunConfig):
+    """The pycolmap.Device matching the configured device."""
+    import pycolmap
+
+    return {
+        "AUTO": pycolmap.Device.auto,
+        "CUDA": pycolmap.Device.cuda,
+        "CPU": pycolmap.Device.cpu,
+    }[config.device]
+
+
+def _feature_device(config: RunConfig) -> str:
+    """The device SIFT actually runs on, "CUDA" or "CPU", resolving AUTO like COLMAP does."""
+    import pycolmap
+
+    if config.device == "AUTO":
+        return "CUDA" if getattr(pycolmap, "has_cuda", False) else "CPU"
+    return config.device
+
+
+def sparse_reconstruction(
+    color_files: list,
+    result_path: str,
+    config: RunConfig,
+    output_callback=None,
+    matcher: str = "sequential",
+):
+    """
+    Extract, match and map the inputs with COLMAP.
+
+    Running again on the same result folder reuses the feature database,
+    adds the pairs of the given matcher, and remaps from scratch.
+
+    Args:
+        matcher: "sequential" for ordered captures, "exhaustive" to match
+            every pair, much slower but robust to unordered images
+
+    Returns:
+        The model with the most registered images, moved to sparse/0, or
+        None if mapping produced nothing
+    """
+    import pycolmap
+
+    if matcher not in MATCHERS:
+        raise ValueError(f"Unknown matcher '{matcher}', expected one of {list(MATCHERS)}")
+
+    database_path = os.path.join(result_path, "database.db")
+    image_dir = os.path.join(result_path, "images_temp")
+    output_path = os.path.join(result_path, "sparse")
+
+    stage_images(color_files, image_dir)
+
+    fe_params = config.colmap_params("feature_extraction")
+    match_params = config.colmap_params("matching")
+    map_params = config.colmap_params("incremental_mapping")
+
+    store = FeatureStore(config.feature_cache_path) if config.feature_cache_path else None
+    if store is not None:
+        image_hashes = {staged_image_name(i): file_hash(f) for i, f in enumerate(color_files)}
+        # CPU and GPU SIFT produce different keypoints, so their features are kept apart
+        extraction_key = options_key({**fe_params, "device": _feature_device(config)})
+        matching_key = options_key({"matcher": matcher, "features": extraction_key, **match_params})
     
-    quality_profile = getattr(settings, "QUALITY_PROFILE", "BALANCED")
-    colmap_device = getattr(settings, "COLMAP_DEVICE", pycolmap.Device.cpu)
+    quality_profile = config.quality_profile
+    colmap_device = _colmap_device(config)
 
     msg = f"\n{'='*60}\n  COLMAP Sparse Reconstruction - Profile: {quality_profile}\n{'='*60}\n"
     print(msg)
@@ -33,6 +101,13 @@ def sparse_reconstruction(color_files: list, result_path: str, output_callback=N
     if output_callback: output_callback(msg)
     
     if not os.path.exists(database_path):
+        if store is not None:
+            pycolmap.import_images(database_path, image_dir)
+            seeded = store.seed_features(database_path, image_hashes, extraction_key)
+            msg = f"Reused cached features for {seeded}/{len(color_files)} images\n"
+            print(msg)
+            if output_callback: output_callback(msg)
+
         feature_extraction_options = pycolmap.FeatureExtractionOptions()
         feature_extraction_options.num_threads = fe_params.get("num_threads", 8)
         feature_extraction_options.max_image_size = fe_params.get("max_image_size", 2000)
@@ -52,12 +127,14 @@ def sparse_reconstruction(color_files: list, result_path: str, output_callback=N
         except Exception as e:
             if output_callback: output_callback(f"Error in extract_features: {e}\n")
             raise e
+        if store is not None:
+            store.store_features(database_path, image_hashes, extraction_key)
     else:
         msg = "Database file already exists. Skipping feature extraction.\n"
         print(msg)
         if output_callback: output_callback(msg)
 
-    msg = "Matching Features\n"
+    msg = f"Matching Features ({matcher})\n"
     print(msg)
     if output_callback: output_callback(msg)
     
@@ -66,13 +143,27 @@ def sparse_reconstruction(color_files: list, result_path: str, output_callback=N
 
     if match_params.get("guided_matching", False):
         matching_options.guided_matching = True
+
+    if store is not None:
+        # Pairs left by an earlier matcher, e.g. sequential before an exhaustive
+        # fallback, must not be stored as this matcher's results
+        earlier_pairs = store.matched_pairs(database_path)
+        seeded = store.seed_matches(database_path, image_hashes, extraction_key, matching_key)
+        msg = f"Reused cached matches for {seeded} image pairs\n"
+        print(msg)
+        if output_callback: output_callback(msg)
     
-    pycolmap.match_sequential(
+    match = pycolmap.match_exhaustive if matcher == "exhaustive" else pycolmap.match_sequential
+    match(
         database_path, 
         device=colmap_device, 
         matching_options=matching_options
     )
 
+    if store is not None:
+        store.store_matches(database_path, image_hashes, extraction_key, matching_key, skip_pairs=earlier_pairs)
+        store.close()
+
     msg = "Performing Incremental Mapping\n"
     print(msg)
     if output_callback: output_callback(msg)
@@ -83,6 +174,9 @@ def sparse_reconstruction(color_files: list, result_path: str, output_callback=N
     incremental_mapping_options.multiple_models = map_params.get("multiple_models", False)
     
     os.makedirs(output_path, exist_ok=True)
+    for model_path in list_models(output_path):
+        # Left by an earlier mapping, they would mix with the new models
+        shutil.rmtree(model_path)
     
     pycolmap.incremental_mapping(
         database_path, 
@@ -91,66 +185,102 @@ def sparse_reconstruction(color_files: list, result_path: str, output_callback=N
         options=incremental_mapping_options
     )
 
-    sparse_model_path = os.path.join(output_path, "0")
-    if not os.path.exists(sparse_model_path):
-        if os.path.exists(os.path.join(output_path, "cameras.bin")) or \
-           os.path.exists(os.path.join(output_path, "cameras.txt")):
-            sparse_model_path = output_path
-        else:
-            msg = "Error: Sparse reconstruction failed to produce a model.\n"
+    sparse_model = select_largest_model(output_path, output_callback=output_callback)
+    if sparse_model is None and (
+        os.path.exists(os.path.join(output_path, "cameras.bin"))
+        or os.path.exists(os.path.join(output_path, "cameras.txt"))
+    ):
+        try:
+            sparse_model = pycolmap.Reconstruction(output_path)
+        except Exception as e:
+            msg = f"Error loading sparse model: {e}\n"
             print(msg)
             if output_callback: output_callback(msg)
             return None
-
-    try:
-        sparse_model = pycolmap.Reconstruction(sparse_model_path)
-        summary = sparse_model.summary()
-        print(summary)
-        if output_callback: output_callback(str(summary) + "\n")
-        return sparse_model
-    except Exception as e:
-        msg = f"Error loading sparse model: {e}\n"
+    if sparse_model is None:
+        msg = "Error: Sparse reconstruction failed to produce a model.\n"
         print(msg)
         if output_callback: output_callback(msg)
         return None
 
+    summary = sparse_model.summary()
+    print(summary)
+    if output_callback: output_callback(str(summary) + "\n")
+    return sparse_model
+
+
+def convert_colmap_to_txt(sparse_model_path: str, output_path: str = None, output_callback=None) -> bool:
+    """
+    Write a binary COLMAP model as TXT, in-process through pycolmap.
+
+    Args:
+        sparse_model_path: Folder with cameras.bin, images.bin and points3D.bin
+        output_path: Destination folder, defaults to the model folder itself
+    """
+    import pycolmap
 
-def convert_colmap_to_txt(sparse_model_path: str, output_callback=None) -> bool:
-    txt_output_dir = os.path.join(sparse_model_path, "sparse")
+    txt_output_dir = output_path or sparse_model_path
     os.makedirs(txt_output_dir, exist_ok=True)
     
     msg = f"\n--- Converting COLMAP model to TXT at {txt_output_dir} ---\n"
     print(msg)
     if output_callback: output_callback(msg)
     
-    cmd = [
-        "colmap", "model_converter",
-        "--input_path", sparse_model_path,
-        "--output_path", txt_output_dir,
-        "--output_type", "TXT"
-    ]
-    return run_command(cmd, output_callback=output_callback)
+    try:
+        pycolmap.Reconstruction(sparse_model_path).write_text(txt_output_dir)
+        return True
+    except Exception as e:
+        msg = f"Error converting COLMAP model: {e}\n"
+        print(msg)
+        if output_callback: output_callback(msg)
+        return False
 
 
-def undistort_images(sparse_model_path: str, output_path: str, image_dir: str, output_callback=None) -> bool:
+def undistort_images(
+    sparse_model_path: str,
+    output_path: str,
+    image_dir: str,
+    config: RunConfig = None,
+    output_callback=None,
+) -> bool:
+    """
+    Undistort the registered images and model for dense reconstruction.
+
+    Runs in-process through pycolmap; COLMAP's undistorter spreads the
+    images over a thread pool, decoding each one once. The output size
+    comes from the profile's "undistortion" step.
+    """
+    import pycolmap
+
     os.makedirs(output_path, exist_ok=True)
+    params = config.colmap_params("undistortion") if config is not None else {}
+    max_image_size = params.get("max_image_size", 2000)
     
-    msg = f"\n--- Undistorting Images to {output_path} ---\n"
+    msg = f"\n--- Undistorting Images to {output_path} (max size {max_image_size}) ---\n"
     print(msg)
     if output_callback: output_callback(msg)
     
-    cmd = [
-        "colmap", "image_undistorter",
-        "--image_path", image_dir,
-        "--input_path", sparse_model_path,
-        "--output_path", output_path,
-        "--output_type", "COLMAP",
-        "--max_image_size", "2000",
-    ]
-    return run_command(cmd, output_callback=output_callback)
-
-
-def get_point_cloud_from_sparse_model(sparse_model) -> o3d.geometry.PointCloud:
+    undistort_options = pycolmap.UndistortCameraOptions()
+    undistort_options.max_image_size = max_image_size
+    try:
+        pycolmap.undistort_images(
+            output_path,
+            sparse_model_path,
+            image_dir,
+            output_type="COLMAP",
+            undistort_options=undistort_options,
+        )
+        return True
+    except Exception as e:
+        msg = f"Error undistorting images: {e}\n"
+        print(msg)
+        if output_callback: output_callback(msg)
+        return False
+
+
+def get_point_cloud_from_sparse_model(sparse_model) -> "o3d.geometry.PointCloud":
+    import open3d as o3d
+
     points = []
     colors = []
     for point in sparse_model.points3D.values():
@@ -0,0 +1,286 @@
+"""
+Cross-job cache of SIFT features and matches keyed by image content.
+
+Features are stored per image hash, extraction options and SIFT device,
+matches per ordered pair of image hashes and matching options. Before
+extraction a new job's COLMAP database is seeded from the store; COLMAP
+then skips images that already have keypoints and descriptors, and pairs
+that already have matches and a two-view geometry. Whatever COLMAP
+computed is written back afterwards.
+
+The COLMAP database is accessed with sqlite3 through its documented
+schema, which is stable across pycolmap releases unlike the Database
+bindings.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS features (
+    image_hash TEXT NOT NULL,
+    options_key TEXT NOT NULL,
+    keypoint_rows INTEGER NOT NULL,
+    keypoint_cols INTEGER NOT NULL,
+    keypoints BLOB,
+    descriptor_rows INTEGER NOT NULL,
+    descriptor_cols INTEGER NOT NULL,
+    descriptors BLOB,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (image_hash, options_key)
+);
+CREATE TABLE IF NOT EXISTS matches (
+    hash1 TEXT NOT NULL,
+    hash2 TEXT NOT NULL,
+    options_key TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    cols INTEGER NOT NULL,
+    data BLOB,
+    geometry_json TEXT,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (hash1, hash2, options_key)
+);
+"""
+
+# COLMAP packs an ordered image id pair into one integer
+MAX_NUM_IMAGES = 2147483647
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_hash(path: str) -> str:
+    """SHA-1 of a file's content."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def options_key(options: dict) -> str:
+    """Stable key for a set of options, ignoring thread counts."""
+    return json.dumps({k: v for k, v in options.items() if k != "num_threads"}, sort_keys=True)
+
+
+def _pair_id_to_image_ids(pair_id: int) -> tuple:
+    image_id2 = pair_id % MAX_NUM_IMAGES
+    return (pair_id - image_id2) // MAX_NUM_IMAGES, image_id2
+
+
+def _image_ids_to_pair_id(image_id1: int, image_id2: int) -> int:
+    return image_id1 * MAX_NUM_IMAGES + image_id2
+
+
+@contextmanager
+def _colmap_database(path: str):
+    with closing(sqlite3.connect(path, timeout=30)) as db:
+        yield db
+        db.commit()
+
+
+def _encode_row(row: dict) -> str:
+    return json.dumps({
+        key: {"b64": base64.b64encode(value).decode("ascii")} if isinstance(value, bytes) else value
+        for key, value in row.items()
+    })
+
+
+def _decode_row(text: str) -> dict:
+    return {
+        key: base64.b64decode(value["b64"]) if isinstance(value, dict) else value
+        for key, value in json.loads(text).items()
+    }
+
+
+class FeatureStore:
+    """SQLite store of features and matches shared between jobs."""
+
+    def __init__(self, db_path: str):
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def seed_features(self, database_path: str, image_hashes: dict, extraction_key: str) -> int:
+        """
+        Copy cached features into a COLMAP database for images it lacks them for.
+
+        Args:
+            database_path: COLMAP database with the images already imported
+            image_hashes: Image name to content hash
+            extraction_key: options_key of the feature extraction options
+
+        Returns:
+            Number of images seeded
+        """
+        seeded = 0
+        with _colmap_database(database_path) as db:
+            have = {row[0] for row in db.execute("SELECT image_id FROM keypoints")}
+            for image_id, name in db.execute("SELECT image_id, name FROM images").fetchall():
+                if image_id in have or name not in image_hashes:
+                    continue
+                with self._lock:
+                    row = self._conn.execute(
+                        "SELECT keypoint_rows, keypoint_cols, keypoints, descriptor_rows, descriptor_cols,"
+                        " descriptors FROM features WHERE image_hash = ? AND options_key = ?",
+                        (image_hashes[name], extraction_key),
+                    ).fetchone()
+                if row is None:
+                    continue
+                db.execute("INSERT INTO keypoints VALUES (?, ?, ?, ?)", (image_id, row[0], row[1], row[2]))
+                db.execute("INSERT INTO descriptors VALUES (?, ?, ?, ?)", (image_id, row[3], row[4], row[5]))
+                seeded += 1
+        return seeded
+
+    def store_features(self, database_path: str, image_hashes: dict, extraction_key: str) -> int:
+        """Copy the features of a COLMAP database into the store, returning the count added."""
+        added = 0
+        with _colmap_database(database_path) as db:
+            rows = db.execute(
+                "SELECT i.name, k.rows, k.cols, k.data, d.rows, d.cols, d.data FROM images i"
+                " JOIN keypoints k ON k.image_id = i.image_id"
+                " JOIN descriptors d ON d.image_id = i.image_id"
+            ).fetchall()
+        with self._lock:
+            for name, *values in rows:
+                if name not in image_hashes:
+                    continue
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO features VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (image_hashes[name], extraction_key, *values, time.time()),
+                )
+                added += cursor.rowcount
+            self._conn.commit()
+        return added
+
+    def _cached_keypoints(self, image_hash: str, extraction_key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT keypoints FROM features WHERE image_hash = ? AND options_key = ?",
+                (image_hash, extraction_key),
+            ).fetchone()
+        return row[0] if row else None
+
+    def seed_matches(self, database_path: str, image_hashes: dict, extraction_key: str, matching_key: str) -> int:
+        """
+        Copy cached matches and two-view geometries into a COLMAP database.
+
+        Matches index into keypoints, so only images whose keypoints are
+        byte-identical to the cached ones take part. A pair is only reused
+        when its images have the same id order as when it was stored, since
+        geometries are not symmetric.
+
+        Returns:
+            Number of image pairs seeded
+        """
+        seeded = 0
+        with _colmap_database(database_path) as db:
+            keypoints = dict(db.execute("SELECT image_id, data FROM keypoints"))
+            ids = {name: image_id for image_id, name in db.execute("SELECT image_id, name FROM images")}
+            by_hash = {
+                image_hashes[name]: image_id
+                for name, image_id in ids.items()
+                if name in image_hashes
+                and keypoints.get(image_id) is not None
+                and keypoints[image_id] == self._cached_keypoints(image_hashes[name], extraction_key)
+            }
+            have = {row[0] for row in db.execute("SELECT pair_id FROM two_view_geometries")}
+            geometry_columns = [row[1] for row in db.execute("PRAGMA table_info(two_view_geometries)")]
+
+            with self._lock:
+                cached = self._conn.execute(
+                    "SELECT hash1, hash2, rows, cols, data, geometry_json FROM matches WHERE options_key = ?",
+                    (matching_key,),
+                ).fetchall()
+            for hash1, hash2, rows, cols, data, geometry_json in cached:
+                image_id1, image_id2 = by_hash.get(hash1), by_hash.get(hash2)
+                if image_id1 is None or image_id2 is None or image_id1 >= image_id2:
+                    continue
+                pair_id = _image_ids_to_pair_id(image_id1, image_id2)
+                if pair_id in have:
+                    continue
+                geometry = _decode_row(geometry_json)
+                geometry["pair_id"] = pair_id
+                columns = [c for c in geometry_columns if c in geometry]
+                db.execute("INSERT OR REPLACE INTO matches VALUES (?, ?, ?, ?)", (pair_id, rows, cols, data))
+                db.execute(
+                    f"INSERT INTO two_view_geometries ({', '.join(columns)})"
+                    f" VALUES ({', '.join('?' for _ in columns)})",
+                    [geometry[c] for c in columns],
+                )
+                seeded += 1
+        return seeded
+
+    def matched_pairs(self, database_path: str) -> set:
+        """Pair ids that already have a two-view geometry in a COLMAP database."""
+        with _colmap_database(database_path) as db:
+            return {row[0] for row in db.execute("SELECT pair_id FROM two_view_geometries")}
+
+    def store_matches(
+        self,
+        database_path: str,
+        image_hashes: dict,
+        extraction_key: str,
+        matching_key: str,
+        skip_pairs=(),
+    ) -> int:
+        """
+        Copy the verified pairs of a COLMAP database into the store.
+
+        Pairs are skipped unless both images' keypoints match the cached
+        features, so stored matches always index the stored keypoints.
+
+        Args:
+            skip_pairs: Pair ids not produced by the matcher matching_key
+                describes, e.g. left in the database by an earlier matcher
+
+        Returns:
+            Number of pairs added
+        """
+        skip_pairs = set(skip_pairs)
+        added = 0
+        with _colmap_database(database_path) as db:
+            db.row_factory = sqlite3.Row
+            keypoints = {row["image_id"]: row["data"] for row in db.execute("SELECT image_id, data FROM keypoints")}
+            names = {
+                row["image_id"]: row["name"]
+                for row in db.execute("SELECT image_id, name FROM images")
+                if row["name"] in image_hashes
+                and keypoints.get(row["image_id"]) is not None
+                and keypoints[row["image_id"]] == self._cached_keypoints(image_hashes[row["name"]], extraction_key)
+            }
+            geometries = {row["pair_id"]: dict(row) for row in db.execute("SELECT * FROM two_view_geometries")}
+            matches = db.execute("SELECT pair_id, rows, cols, data FROM matches").fetchall()
+
+        with self._lock:
+            for pair_id, rows, cols, data in matches:
+                geometry = geometries.get(pair_id)
+                if pair_id in skip_pairs:
+                    continue
+                image_id1, image_id2 = _pair_id_to_image_ids(pair_id)
+                name1, name2 = names.get(image_id1), names.get(image_id2)
+                if geometry is None or name1 not in image_hashes or name2 not in image_hashes:
+                    continue
+                geometry.pop("pair_id")
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO matches VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        image_hashes[name1], image_hashes[name2], matching_key,
+                        rows, cols, data, _encode_row(geometry), time.time(),
+                    ),
+                )
+                added += cursor.rowcount
+            self._conn.commit()
+        return added
@@ -0,0 +1,722 @@
+"""
+UI-independent orchestration of a full reconstruction job.
+
+A job is a fixed sequence of stages run against one dataset and one result
+directory. Progress and log output are reported through callbacks, so the
+same code drives the Streamlit app and the headless batch CLI.
+"""
+
+import glob
+import json
+import os
+import shutil
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Tuple
+
+from ..config import settings, RunConfig
+from .colmap import (
+    sparse_reconstruction,
+    convert_colmap_to_txt,
+    undistort_images,
+    stage_images,
+    staged_image_name,
+)
+from .journal import JobJournal
+from .openmvs import run_openmvs_pipeline
+from .preview import build_sparse_preview, is_preview_current
+from .profiling import PROFILES_DIR_NAME, Profiler
+from .roi import (
+    MASKS_DIR_NAME,
+    ROI_NAME,
+    clear_roi_masks,
+    estimate_roi,
+    masks_path,
+    read_masks_manifest,
+    read_roi,
+    roi_from_box,
+    roi_path,
+    same_box,
+    write_roi,
+    write_roi_masks,
+)
+from .sparse_gate import (
+    check_sparse_quality,
+    format_metrics,
+    list_models,
+    read_quality_report,
+    sparse_metrics,
+    write_quality_report,
+)
+
+IMAGE_EXTENSIONS = (".jpg", ".png", ".jpeg")
+OPENMVS_STEPS = ("DensifyPointCloud", "ReconstructMesh", "RefineMesh", "TextureMesh")
+# The ROI box and settings the dense outputs were built with, next to scene_dense.mvs
+DENSE_METADATA_NAME = "dense.json"
+# OpenMVS outputs rebuilt when the ROI or the dense settings change,
+# relative to the result folder
+DENSE_OUTPUTS = (
+    "scene_dense.mvs", "*.dmap", "scene_dense.ply", "scene_dense_mesh*.ply",
+    "result.obj", "result.mtl", "result*.png", "result*.jpg",
+)
+# Default history_path, looked up in settings when the job starts rather than
+# when this module is imported
+HISTORY_FROM_SETTINGS = object()
+
+
+class PipelineError(Exception):
+    """Raised when a pipeline stage fails."""
+
+
+@dataclass
+class JobContext:
+    """State shared between the stages of one job."""
+
+    dataset_path: str
+    result_path: str
+    config: RunConfig
+    color_files: list
+    log_callback: Optional[Callable[[str], None]] = None
+    sparse_model: Any = None
+
+    def log(self, msg: str) -> None:
+        print(msg)
+        if self.log_callback: self.log_callback(msg)
+
+    @property
+    def sparse_model_path(self) -> str:
+        return os.path.join(self.result_path, "sparse", "0")
+
+    @property
+    def undistorted_path(self) -> str:
+        return os.path.join(self.result_path, "images_undistorted")
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    A named pipeline step.
+
+    Attributes:
+        name: Identifier used in the journal and run history
+        label: Human-readable description for progress reporting
+        run: Executes the stage, raising PipelineError on failure
+        is_done: Returns True if the stage's outputs already exist
+        settings: Returns the settings of a RunConfig the stage's outputs
+            depend on; when they change, the outputs are removed and rebuilt
+        outputs: Glob patterns, relative to the result folder, of what the
+            stage writes
+        inputs: Names of the stages whose outputs this stage reads, it is
+            rebuilt whenever they are
+    """
+
+    name: str
+    label: str
+    run: Callable[[JobContext], None]
+    is_done: Callable[[JobContext], bool] = lambda ctx: False
+    settings: Callable[[RunConfig], dict] = lambda config: {}
+    outputs: Tuple[str, ...] = ()
+    inputs: Tuple[str, ...] = ()
+
+
+def _remove_outputs(result_path: str, patterns) -> int:
+    """Delete the files and folders matching glob patterns in a result folder, returning how many."""
+    removed = 0
+    for pattern in patterns:
+        for path in glob.glob(os.path.join(result_path, pattern)):
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+            removed += 1
+    return removed
+
+
+def _non_empty_dir(path: str) -> bool:
+    return os.path.isdir(path) and bool(os.listdir(path))
+
+
+def _sparse_path(ctx: JobContext) -> str:
+    return os.path.join(ctx.result_path, "sparse")
+
+
+def _sparse_done(ctx: JobContext) -> bool:
+    # A model the gate rejected must be rebuilt, not passed to the dense stages
+    report = read_quality_report(_sparse_path(ctx))
+    return _non_empty_dir(ctx.sparse_model_path) and (report is None or report["passed"])
+
+
+def _gate_sparse_model(ctx: JobContext, matcher: str) -> list:
+    thresholds = ctx.config.colmap_params("quality_gate")
+    metrics = sparse_metrics(ctx.sparse_model, len(ctx.color_files), len(list_models(_sparse_path(ctx))))
+    failures = check_sparse_quality(metrics, thresholds)
+    write_quality_report(_sparse_path(ctx), metrics, failures, matcher)
+    ctx.log(format_metrics(metrics))
+    for failure in failures:
+        ctx.log(f"Quality gate: {failure}\n")
+    return failures
+
+
+def _run_sparse(ctx: JobContext) -> None:
+    os.makedirs(_sparse_path(ctx), exist_ok=True)
+    matcher = "sequential"
+    ctx.sparse_model = sparse_reconstruction(
+        ctx.color_files, ctx.result_path, ctx.config, output_callback=ctx.log_callback, matcher=matcher
+    )
+    if ctx.sparse_model is None:
+        raise PipelineError("Sparse reconstruction failed.")
+
+    failures = _gate_sparse_model(ctx, matcher)
+    fallback = ctx.config.colmap_params("quality_gate").get("fallback_matcher")
+    if failures and fallback and fallback != matcher:
+        matcher = fallback
+        ctx.log(f"\nSparse model below the quality gate, retrying with {matcher} matching\n")
+        ctx.sparse_model = sparse_reconstruction(
+            ctx.color_files, ctx.result_path, ctx.config, output_callback=ctx.log_callback, matcher=matcher
+        )
+        if ctx.sparse_model is None:
+            raise PipelineError(f"Sparse reconstruction with {matcher} matching failed.")
+        failures = _gate_sparse_model(ctx, matcher)
+
+    if failures:
+        raise PipelineError(
+            "Sparse model failed the quality gate, skipping dense reconstruction: " + "; ".join(failures)
+        )
+
+
+def _run_preview(ctx: JobContext) -> None:
+    sparse_model = ctx.sparse_model
+    if sparse_model is None:
+        import pycolmap
+
+        sparse_model = pycolmap.Reconstruction(ctx.sparse_model_path)
+    ctx.log("\n--- Sparse Preview ---\n")
+    # A missing preview only costs the early look, so it never fails the job
+    build_sparse_preview(sparse_model, ctx.result_path, output_callback=ctx.log_callback)
+
+
+def _run_undistort(ctx: JobContext) -> None:
+    image_dir = os.path.join(ctx.result_path, "images_temp")
+    if not _non_empty_dir(image_dir):
+        # Removed by retention after the sparse stage, restage from the inputs
+        stage_images(ctx.color_files, image_dir)
+    if not undistort_images(
+        ctx.sparse_model_path, ctx.undistorted_path, image_dir, ctx.config, output_callback=ctx.log_callback
+    ):
+        raise PipelineError("Failed to undistort images.")
+
+
+def _undistorted_model_path(ctx: JobContext) -> str:
+    return os.path.join(ctx.undistorted_path, "sparse")
+
+
+def _convert_done(ctx: JobContext) -> bool:
+    if not ctx.config.colmap_text_model:
+        return True
+    return os.path.exists(os.path.join(_undistorted_model_path(ctx), "cameras.txt"))
+
+
+def _run_convert(ctx: JobContext) -> None:
+    if not convert_colmap_to_txt(_undistorted_model_path(ctx), output_callback=ctx.log_callback):
+        raise PipelineError("Failed to convert COLMAP model to TXT.")
+
+
+def _has_box(roi: dict) -> bool:
+    return roi is not None and roi.get("center") is not None
+
+
+def _model_mtime(model_path: str) -> float:
+    files = [
+        os.path.join(model_path, f)
+        for f in ("images.bin", "images.txt", "points3D.bin", "points3D.txt")
+        if os.path.exists(os.path.join(model_path, f))
+    ]
+    return max((os.path.getmtime(f) for f in files), default=0.0)
+
+
+def _roi_done(ctx: JobContext) -> bool:
+    if ctx.config.roi == "off":
+        return True
+    roi = read_roi(ctx.result_path)
+    if roi is None or roi.get("source") != ctx.config.roi:
+        return False
+    if ctx.config.roi == "manual":
+        if not same_box(roi, roi_from_box(ctx.config.roi_box)):
+            return False
+    elif os.path.getmtime(roi_path(ctx.result_path)) < _model_mtime(ctx.sparse_model_path):
+        return False
+    if not _has_box(roi):
+        return True
+    manifest = read_masks_manifest(ctx.result_path)
+    if manifest is None or manifest.get("roi") != roi:
+        return False
+    # Undistorting again rewrites the images the masks belong to
+    manifest_path = os.path.join(masks_path(ctx.result_path), "manifest.json")
+    return os.path.getmtime(manifest_path) >= _model_mtime(_undistorted_model_path(ctx))
+
+
+def _run_roi(ctx: JobContext) -> None:
+    ctx.log("\n--- Region of Interest ---\n")
+    if ctx.config.roi == "manual":
+        roi = roi_from_box(ctx.config.roi_box)
+    else:
+        sparse_model = ctx.sparse_model
+        if sparse_model is None:
+            import pycolmap
+
+            sparse_model = pycolmap.Reconstruction(ctx.sparse_model_path)
+        roi = estimate_roi(sparse_model, ctx.config.roi_border, output_callback=ctx.log_callback)
+        roi = roi or {"source": "auto", "center": None}
+
+    write_roi(ctx.result_path, roi)
+    if _has_box(roi):
+        write_roi_masks(
+            roi, _undistorted_model_path(ctx), masks_path(ctx.result_path), output_callback=ctx.log_callback
+        )
+    else:
+        clear_roi_masks(masks_path(ctx.result_path))
+
+
+def _dense_roi(ctx: JobContext) -> dict:
+    """The box dense reconstruction is restricted to, None for the whole scene."""
+    if ctx.config.roi == "off":
+        return None
+    roi = read_roi(ctx.result_path)
+    return roi if _has_box(roi) else None
+
+
+def _dense_settings(config: RunConfig) -> dict:
+    """The settings the dense outputs depend on, as stored in the dense metadata."""
+    settings = {
+        "mesher": config.mesher,
+        "skip_refine_mesh": config.should_skip_refine_mesh(),
+        "openmvs": {step: config.openmvs_params(step) for step in OPENMVS_STEPS},
+    }
+    if config.mesher == "poisson":
+        settings["poisson_memory_budget_mb"] = config.poisson_memory_budget_mb
+    # In the form it takes when read back from the metadata file
+    return json.loads(json.dumps(settings))
+
+
+def _read_dense_metadata(result_path: str) -> dict:
+    path = os.path.join(result_path, DENSE_METADATA_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _dense_current(ctx: JobContext, metadata: dict) -> bool:
+    """Whether dense outputs built as the metadata records match the job's ROI and settings."""
+    # Outputs written before ROIs existed cover the whole scene. Those written
+    # before settings were recorded are kept, nothing tells what built them
+    if not same_box(metadata.get("roi"), _dense_roi(ctx)):
+        return False
+    settings = metadata.get("settings")
+    return settings is None or settings == _dense_settings(ctx.config)
+
+
+def _dense_done(ctx: JobContext) -> bool:
+    if not os.path.exists(os.path.join(ctx.result_path, "result.obj")):
+        return False
+    return _dense_current(ctx, _read_dense_metadata(ctx.result_path))
+
+
+def _run_dense(ctx: JobContext) -> None:
+    roi = _dense_roi(ctx)
+    # Outputs of another box or mesher would otherwise be reused as they are
+    if not _dense_current(ctx, _read_dense_metadata(ctx.result_path)):
+        removed = _remove_outputs(ctx.result_path, DENSE_OUTPUTS)
+        if removed:
+            ctx.log(f"ROI or dense settings changed, removed {removed} outdated dense outputs\n")
+    with open(os.path.join(ctx.result_path, DENSE_METADATA_NAME), "w") as f:
+        json.dump({"roi": roi, "settings": _dense_settings(ctx.config)}, f, indent=2)
+
+    undistorted_images_path = os.path.join(ctx.undistorted_path, "images")
+    mask_dir = None
+    if roi is not None and read_masks_manifest(ctx.result_path):
+        mask_dir = masks_path(ctx.result_path)
+    if not run_openmvs_pipeline(
+        ctx.undistorted_path, undistorted_images_path, ctx.result_path, ctx.config,
+        output_callback=ctx.log_callback, mask_dir=mask_dir, roi=roi,
+    ):
+        raise PipelineError("Pipeline failed during OpenMVS steps.")
+
+
+def _textures_path(ctx: JobContext) -> str:
+    return os.path.join(ctx.result_path, "textures")
+
+
+def _textures_done(ctx: JobContext) -> bool:
+    if not ctx.config.texture_variants:
+        return True
+    # Newer than the material file, or atlases may have changed since
+    manifest = os.path.join(_textures_path(ctx), "manifest.json")
+    result_mtl = os.path.join(ctx.result_path, "result.mtl")
+    if not os.path.exists(manifest) or not os.path.exists(result_mtl):
+        return False
+    return os.path.getmtime(manifest) >= os.path.getmtime(result_mtl)
+
+
+def _run_textures(ctx: JobContext) -> None:
+    from ..processing import build_texture_variants
+
+    result_mtl = os.path.join(ctx.result_path, "result.mtl")
+    if not os.path.exists(result_mtl):
+        ctx.log("\n--- Texture Variants ---\nNo result.mtl, the mesh is untextured. Skipping step.\n")
+        return
+    ctx.log(f"\n--- Texture Variants ---\nWriting atlas tiers to {_textures_path(ctx)}\n")
+    manifest = build_texture_variants(
+        result_mtl,
+        _textures_path(ctx),
+        tiers=ctx.config.web_texture_sizes,
+        formats=ctx.config.texture_formats,
+        quality=ctx.config.texture_quality,
+        output_callback=ctx.log_callback,
+    )
+    for material in manifest["materials"]:
+        ctx.log(f"  {material['file']}\n")
+
+
+def _web_export_path(ctx: JobContext) -> str:
+    return os.path.join(ctx.result_path, "web")
+
+
+def _web_export_done(ctx: JobContext) -> bool:
+    manifest = os.path.join(_web_export_path(ctx), "manifest.json")
+    result_obj = os.path.join(ctx.result_path, "result.obj")
+    if not os.path.exists(manifest) or not os.path.exists(result_obj):
+        return False
+    return os.path.getmtime(manifest) >= os.path.getmtime(result_obj)
+
+
+def _run_web_export(ctx: JobContext) -> None:
+    from ..processing import export_web_glb
+
+    if not ctx.config.web_export:
+        ctx.log("\n--- Web Export ---\nDisabled in run configuration. Skipping step.\n")
+        return
+    ctx.log(f"\n--- Web Export ---\nWriting GLB variants to {_web_export_path(ctx)}\n")
+    manifest = export_web_glb(
+        os.path.join(ctx.result_path, "result.obj"),
+        _web_export_path(ctx),
+        texture_sizes=ctx.config.web_texture_sizes,
+        lod_ratios=ctx.config.web_lod_ratios,
+    )
+    for variant in manifest["variants"]:
+        ctx.log(f"  {variant['file']}: {variant['bytes'] / 1e6:.1f} MB, {variant['triangles']} triangles\n")
+
+
+def _fusion_done(ctx: JobContext) -> bool:
+    return all(
+        os.path.exists(os.path.join(ctx.result_path, name))
+        for name in ("scene_dense.ply", "scene_dense_mesh.ply")
+    )
+
+
+def _run_fusion(ctx: JobContext) -> None:
+    import numpy as np
+    import open3d as o3d
+    from ..processing import tsdf
+
+    config = ctx.config
+    try:
+        depth_files = tsdf.find_depth_images(ctx.dataset_path, ctx.color_files)
+    except FileNotFoundError as e:
+        raise PipelineError(str(e)) from e
+    intrinsic = tsdf.load_dataset_intrinsic(ctx.dataset_path)
+    extrinsics = None
+
+    if config.rgbd_pose_source == "colmap":
+        import pycolmap
+
+        reconstruction = ctx.sparse_model
+        if reconstruction is None:
+            reconstruction = pycolmap.Reconstruction(ctx.sparse_model_path)
+        image_names = [staged_image_name(i) for i in range(len(ctx.color_files))]
+        try:
+            scale = tsdf.estimate_metric_scale(
+                reconstruction, image_names, depth_files, config.depth_scale, config.depth_trunc
+            )
+        except ValueError as e:
+            raise PipelineError(str(e)) from e
+        ctx.log(f"Metric scale of the sparse model: {scale:.4f} m per unit\n")
+        extrinsics = tsdf.colmap_extrinsics(reconstruction, image_names, scale)
+        if intrinsic is None:
+            first = next(iter(reconstruction.images.values()))
+            height, width = np.asarray(o3d.io.read_image(depth_files[0])).shape[:2]
+            intrinsic = tsdf.intrinsic_from_colmap_camera(
+                reconstruction.cameras[first.camera_id], width, height
+            )
+    elif intrinsic is None:
+        raise PipelineError(
+            f"Odometry poses need sensor intrinsics in {tsdf.INTRINSIC_FILE_NAME} inside the dataset folder"
+        )
+
+    ctx.log(
+        f"\n--- TSDF Fusion ---\n{len(ctx.color_files)} frames, poses from {config.rgbd_pose_source}, "
+        f"voxel {config.tsdf_voxel_length * 1000:.1f} mm\n"
+    )
+    volume, info = tsdf.fuse_rgbd_frames(
+        ctx.color_files,
+        depth_files,
+        intrinsic,
+        extrinsics=extrinsics,
+        voxel_length=config.tsdf_voxel_length,
+        depth_scale=config.depth_scale,
+        depth_trunc=config.depth_trunc,
+        output_callback=ctx.log_callback,
+    )
+    ctx.log(f"Integrated {info['integrated']} frames, skipped {info['skipped']}\n")
+    if not info["integrated"]:
+        raise PipelineError("No RGB-D frames could be integrated.")
+
+    mesh, point_cloud = tsdf.extract_tsdf_geometry(volume)
+    ctx.log(f"Extracted {len(mesh.triangles)} triangles and {len(point_cloud.points)} points\n")
+    o3d.io.write_point_cloud(os.path.join(ctx.result_path, "scene_dense.ply"), point_cloud)
+    o3d.io.write_triangle_mesh(os.path.join(ctx.result_path, "scene_dense_mesh.ply"), mesh)
+
+
+def _sparse_settings(config: RunConfig) -> dict:
+    steps = ("feature_extraction", "matching", "incremental_mapping", "quality_gate")
+    return {"device": config.device, "colmap": {step: config.colmap_params(step) for step in steps}}
+
+
+def _fields(*names) -> Callable[[RunConfig], dict]:
+    return lambda config: {name: config.to_dict()[name] for name in names}
+
+
+_SPARSE_STAGE = Stage(
+    "sparse", "Sparse Reconstruction (COLMAP)", _run_sparse, _sparse_done,
+    settings=_sparse_settings, outputs=("sparse", "database.db", "database.db-*"),
+)
+_FUSION_STAGE = Stage(
+    "fusion", "RGB-D TSDF Fusion", _run_fusion, _fusion_done,
+    settings=_fields("rgbd_pose_source", "tsdf_voxel_length", "depth_scale", "depth_trunc"),
+    outputs=("scene_dense.ply", "scene_dense_mesh.ply"), inputs=("sparse",),
+)
+
+PIPELINE_STAGES = [
+    _SPARSE_STAGE,
+    Stage("preview", "Building Sparse Preview", _run_preview,
+          lambda ctx: is_preview_current(ctx.result_path, ctx.sparse_model_path), inputs=("sparse",)),
+    Stage("undistort", "Undistorting Images", _run_undistort,
+          lambda ctx: _non_empty_dir(ctx.undistorted_path),
+          settings=lambda config: config.colmap_params("undistortion"),
+          outputs=("images_undistorted",), inputs=("sparse",)),
+    Stage("convert", "Converting Model", _run_convert, _convert_done, inputs=("undistort",)),
+    Stage("roi", "Restricting to the Region of Interest", _run_roi, _roi_done,
+          settings=_fields("roi", "roi_box", "roi_border"), outputs=(ROI_NAME, MASKS_DIR_NAME),
+          inputs=("undistort",)),
+    # The dense stage compares its own settings and ROI, see _dense_current
+    Stage("dense", "Dense Reconstruction (OpenMVS)", _run_dense, _dense_done,
+          outputs=DENSE_OUTPUTS + ("scene.mvs", DENSE_METADATA_NAME), inputs=("undistort",)),
+    Stage("textures", "Encoding Texture Variants", _run_textures, _textures_done,
+          settings=_fields("texture_variants", "web_texture_sizes", "texture_formats", "texture_quality"),
+          outputs=("textures",), inputs=("dense",)),
+    Stage("web_export", "Exporting Web Delivery GLB", _run_web_export, _web_export_done,
+          settings=_fields("web_export", "web_texture_sizes", "web_lod_ratios"),
+          outputs=("web",), inputs=("dense",)),
+]
+
+# Depth-camera captures: fuse depth directly instead of running MVS
+RGBD_STAGES = [_SPARSE_STAGE, _FUSION_STAGE]
+
+
+def stages_for_config(config: RunConfig) -> list:
+    """The stage sequence a run configuration calls for."""
+    if config.mode == "rgbd":
+        if config.rgbd_pose_source == "odometry":
+            return [_FUSION_STAGE]
+        return RGBD_STAGES
+    return PIPELINE_STAGES
+
+
+def _dependents(name: str, stages: list) -> list:
+    """Names of the stages reading the outputs of a stage, directly or through others."""
+    found = []
+    # Stages are in pipeline order, so a stage's inputs come before it
+    for stage in stages:
+        if any(i == name or i in found for i in stage.inputs):
+            found.append(stage.name)
+    return found
+
+
+def _is_stale(stage: Stage, settings: dict, journal: JobJournal) -> bool:
+    """Whether a stage's outputs were built with other settings or from outdated inputs."""
+    if journal.is_invalidated(stage.name):
+        return True
+    recorded = journal.stage_settings(stage.name)
+    if recorded is None:
+        # Folders written before settings were recorded keep their outputs.
+        # Otherwise a stage without a record never ran here, and outputs
+        # in its place were written by another mode's stages
+        return journal.has_settings()
+    return recorded != settings
+
+
+def find_images(dataset_path: str) -> list:
+    """Sorted list of the image files directly inside a dataset folder."""
+    return sorted([
+        os.path.join(dataset_path, f)
+        for f in os.listdir(dataset_path)
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+    ])
+
+
+def _start_recorder(history_path: str, dataset_path: str, result_path: str, color_files: list, config: RunConfig):
+    # Imported here because the history store itself depends on this package
+    from ..history import RunHistory, RunRecorder, get_host_specs, probe_image_size
+
+    params = {
+        "openmvs": {step: config.openmvs_params(step) for step in OPENMVS_STEPS},
+        "skip_refine_mesh": config.should_skip_refine_mesh(),
+        "colmap": {
+            step: config.colmap_params(step)
+            for step in ("feature_extraction", "matching", "incremental_mapping", "quality_gate")
+        },
+        "device": config.device,
+    }
+    try:
+        image_size = probe_image_size(color_files[0])
+    except OSError:
+        image_size = None
+
+    history = RunHistory(history_path)
+    run_id = history.start_run(
+        dataset_path, len(color_files), image_size, config.quality_profile, params, get_host_specs(),
+        result_path=result_path,
+    )
+    return RunRecorder(history, run_id)
+
+
+def _collect_garbage(ctx: JobContext) -> None:
+    # Imported here because the retention package depends on this package
+    from ..retention import collect_garbage
+
+    try:
+        freed = collect_garbage(ctx.result_path, ctx.config.retention, output_callback=ctx.log_callback)
+    except OSError as e:
+        ctx.log(f"Retention cleanup failed: {e}\n")
+        return
+    if freed:
+        ctx.log(f"Retention freed {sum(freed.values()) / 1e6:.1f} MB\n")
+
+
+def run_job(
+    dataset_path: str,
+    result_path: str,
+    config: RunConfig,
+    log_callback: Callable[[str], None] = None,
+    progress_callback: Callable[[float, str], None] = None,
+    stage_callback: Callable[[str], None] = None,
+    history_path: Optional[str] = HISTORY_FROM_SETTINGS,
+    stages: list = None,
+    finalize: bool = True,
+) -> bool:
+    """
+    Run every pipeline stage for one dataset.
+
+    Stages whose outputs already exist, or were removed by retention after
+    an earlier successful run, are skipped, and progress is written to a
+    journal in the result directory so interrupted jobs can resume. When a
+    stage's settings differ from those its outputs were built with, its
+    outputs are removed and rebuilt, and so are those of every stage that
+    reads them. Once the job completes, the retention policies in the
+    config are applied.
+
+    Args:
+        dataset_path: Folder containing the input images
+        result_path: Folder receiving all intermediate and final outputs
+        config: Run configuration
+        log_callback: Receives every log message
+        progress_callback: Receives (fraction complete, status text)
+        stage_callback: Receives the name of each stage once its outputs
+            are available, whether it ran or was skipped
+        history_path: Run history database, or None to disable recording,
+            defaults to settings.RUN_HISTORY_PATH
+        stages: Stages to run, defaults to stages_for_config(config)
+        finalize: Mark the job completed and apply retention afterwards;
+            False when the stages are only part of the job, as with
+            distributed workers running one stage each
+
+    Returns:
+        True on success
+
+    Raises:
+        PipelineError: If no images are found or a stage fails
+    """
+    stages = stages_for_config(config) if stages is None else stages
+    if history_path is HISTORY_FROM_SETTINGS:
+        history_path = settings.RUN_HISTORY_PATH
+
+    color_files = find_images(dataset_path)
+    if not color_files:
+        raise PipelineError(f"No images found in {dataset_path}")
+
+    os.makedirs(result_path, exist_ok=True)
+    journal = JobJournal(result_path)
+    journal.start(dataset_path, config.fingerprint())
+
+    recorder = _start_recorder(history_path, dataset_path, result_path, color_files, config) if history_path else None
+    profiler = None
+    if config.profiling != "off":
+        profiler = Profiler(
+            os.path.join(result_path, PROFILES_DIR_NAME),
+            memory=config.profiling == "memory",
+            output_callback=log_callback,
+        )
+        log_callback = profiler.wrap_callback("log", log_callback)
+        progress_callback = profiler.wrap_callback("progress", progress_callback)
+    ctx = JobContext(dataset_path, result_path, config, color_files, log_callback)
+
+    def report(fraction, text):
+        if progress_callback: progress_callback(fraction, text)
+
+    # The whole pipeline, as dependents of a stage may not be among those run now
+    pipeline = stages_for_config(config)
+    graph = pipeline + [stage for stage in stages if stage.name not in {s.name for s in pipeline}]
+
+    try:
+        for index, stage in enumerate(stages):
+            step = f"Step {index + 1}/{len(stages)}: {stage.label}"
+            # In the form it takes when read back from the journal
+            stage_settings = json.loads(json.dumps(stage.settings(config)))
+            if _is_stale(stage, stage_settings, journal):
+                # Before removing anything, so they are rebuilt even if this job stops here
+                journal.invalidate([stage.name] + _dependents(stage.name, graph))
+                removed = _remove_outputs(result_path, stage.outputs)
+                ctx.log(f"Settings of {stage.name} or its inputs changed, removed {removed} outdated outputs\n")
+            # Still asked, stages that do not apply to the settings count as done
+            if stage.is_done(ctx) or journal.is_collected(stage.name):
+                report(index / len(stages), f"{step} (Skipping, already exists)...")
+                if journal.stage_status(stage.name) != "completed":
+                    journal.mark_stage(stage.name, "skipped")
+                journal.record_settings(stage.name, stage_settings)
+                if stage_callback: stage_callback(stage.name)
+                continue
+
+            report(index / len(stages), f"{step}...")
+            start = time.perf_counter()
+            with recorder.stage(stage.name) if recorder else nullcontext():
+                with profiler.section(stage.name) if profiler else nullcontext():
+                    stage.run(ctx)
+            journal.record_settings(stage.name, stage_settings)
+            journal.mark_stage(stage.name, "completed", time.perf_counter() - start)
+            if stage_callback: stage_callback(stage.name)
+
+        if not finalize:
+            return True
+        report(1.0, "Pipeline Finished Successfully!")
+        journal.finish("completed")
+        _collect_garbage(ctx)
+        return True
+    except BaseException as e:
+        journal.finish("failed", str(e))
+        if recorder: recorder.mark_failed()
+        raise
+    finally:
+        if recorder:
+            recorder.finish()
+            recorder.history.close()
@@ -0,0 +1,122 @@
+"""
+Resume journal recording which stages of a job have completed.
+"""
+
+import json
+import os
+import time
+
+JOURNAL_FILENAME = "job.json"
+
+
+class JobJournal:
+    """
+    JSON file in the result directory tracking a job's progress.
+
+    The journal is keyed by the run configuration's fingerprint: starting a
+    job with different settings resets the recorded stages. The settings
+    each stage's outputs were built with, and the stages whose outputs are
+    outdated, survive the reset so run_job can tell which outputs to rebuild.
+    """
+
+    def __init__(self, result_path: str):
+        self.path = os.path.join(result_path, JOURNAL_FILENAME)
+        self.data = self._load()
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def start(self, dataset_path: str, fingerprint: str) -> None:
+        if self.data.get("fingerprint") != fingerprint:
+            self.data = {
+                "fingerprint": fingerprint,
+                "stages": {},
+                "settings": self.data.get("settings", {}),
+                "invalidated": self.data.get("invalidated", []),
+            }
+        self.data.update({
+            "dataset_path": dataset_path,
+            "status": "running",
+            "started_at": time.time(),
+            "finished_at": None,
+            "error": None,
+        })
+        self.save()
+
+    def mark_stage(self, name: str, status: str, duration_s: float = None) -> None:
+        self.data.setdefault("stages", {})[name] = {
+            "status": status,
+            "duration_s": duration_s,
+            "finished_at": time.time(),
+        }
+        self.save()
+
+    def stage_status(self, name: str) -> str:
+        return self.data.get("stages", {}).get(name, {}).get("status")
+
+    def stage_settings(self, name: str) -> dict:
+        """The settings a stage's outputs were last built with, None if not recorded."""
+        return self.data.get("settings", {}).get(name)
+
+    def has_settings(self) -> bool:
+        """False for result folders written before stage settings were recorded."""
+        return bool(self.data.get("settings"))
+
+    def record_settings(self, name: str, settings: dict) -> None:
+        """Record the settings a stage's outputs are built with, clearing its invalidation."""
+        self.data.setdefault("settings", {})[name] = settings
+        self.data["invalidated"] = [n for n in self.data.get("invalidated", []) if n != name]
+        self.save()
+
+    def invalidate(self, names) -> None:
+        """Record that the outputs of these stages are outdated and must be rebuilt."""
+        self.data["invalidated"] = sorted(set(self.data.get("invalidated", [])) | set(names))
+        self.save()
+
+    def is_invalidated(self, name: str) -> bool:
+        return name in self.data.get("invalidated", [])
+
+    def finish(self, status: str, error: str = None) -> None:
+        self.data.update({"status": status, "finished_at": time.time(), "error": error})
+        self.save()
+
+    def mark_collected(self, artifact: str, freed_bytes: int, stages=()) -> None:
+        """
+        Record that retention removed an artifact.
+
+        The given stages are treated as done on resume even though their
+        outputs are gone, until the settings change and the journal resets.
+        """
+        collected = self.data.setdefault("collected", {})
+        collected.setdefault("artifacts", {})[artifact] = {
+            "freed_bytes": freed_bytes,
+            "collected_at": time.time(),
+        }
+        names = set(collected.get("stages", [])) | set(stages)
+        collected["stages"] = sorted(names)
+        self.save()
+
+    def is_collected(self, stage_name: str) -> bool:
+        return stage_name in self.data.get("collected", {}).get("stages", [])
+
+    @property
+    def status(self) -> str:
+        return self.data.get("status")
+
+    def is_complete(self, fingerprint: str = None) -> bool:
+        """True if the job finished successfully, optionally with these settings."""
+        if self.data.get("status") != "completed":
+            return False
+        return fingerprint is None or self.data.get("fingerprint") == fingerprint
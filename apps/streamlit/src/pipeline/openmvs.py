@@ -1,19 +1,89 @@
 import os
 
-from ..config import (
-    settings,
-    OPENMVS_BIN_PATH,
-    build_command_with_params,
-    should_skip_refine_mesh,
-)
+from ..config import RunConfig, build_command_with_params
+from .roi import MASK_IGNORE_LABEL, crop_to_roi
 from .runner import run_command
 
 
-def run_openmvs_pipeline(sparse_model_path: str, image_dir: str, output_dir: str, output_callback=None) -> bool:
-    mvs_bin = OPENMVS_BIN_PATH
-    
-    # Access settings dynamically
-    quality_profile = getattr(settings, "QUALITY_PROFILE", "QUALITY")
+def _camera_centers(sparse_model_path: str):
+    import numpy as np
+    import pycolmap
+
+    for candidate in (os.path.join(sparse_model_path, "sparse"), sparse_model_path):
+        if os.path.exists(os.path.join(candidate, "images.bin")) or \
+           os.path.exists(os.path.join(candidate, "images.txt")):
+            reconstruction = pycolmap.Reconstruction(candidate)
+            return np.array([image.projection_center() for image in reconstruction.images.values()])
+    return None
+
+
+def _poisson_mesh(sparse_model_path: str, output_dir: str, config: RunConfig, output_callback=None) -> bool:
+    """Mesh scene_dense.ply with the density-adaptive Poisson reconstruction."""
+    import open3d as o3d
+    from ..processing.mesh import adaptive_surface_reconstruction
+
+    dense_ply_path = os.path.join(output_dir, "scene_dense.ply")
+    point_cloud = o3d.io.read_point_cloud(dense_ply_path)
+    if not point_cloud.has_points():
+        msg = f"Error: No dense point cloud found at {dense_ply_path}\n"
+        print(msg)
+        if output_callback: output_callback(msg)
+        return False
+
+    mesh, info = adaptive_surface_reconstruction(
+        point_cloud,
+        memory_budget_mb=config.poisson_memory_budget_mb,
+        camera_centers=_camera_centers(sparse_model_path),
+    )
+    msg = (
+        f"Point spacing {info['spacing']:.5f}, normal radius {info['normal_radius']:.5f}, "
+        f"octree depth {info['depth']}: {len(mesh.triangles)} triangles\n"
+    )
+    print(msg)
+    if output_callback: output_callback(msg)
+
+    return o3d.io.write_triangle_mesh(os.path.join(output_dir, "scene_dense_mesh.ply"), mesh)
+
+
+def _crop_mesh(output_dir: str, roi: dict, output_callback=None) -> bool:
+    """Crop scene_dense_mesh.ply to an ROI box in place."""
+    import open3d as o3d
+
+    mesh_path = os.path.join(output_dir, "scene_dense_mesh.ply")
+    mesh = o3d.io.read_triangle_mesh(mesh_path)
+    cropped = crop_to_roi(mesh, roi)
+    msg = f"Cropped mesh to the ROI: kept {len(cropped.triangles)} of {len(mesh.triangles)} triangles\n"
+    print(msg)
+    if output_callback: output_callback(msg)
+    if not cropped.has_triangles():
+        # Not left behind, a resume would take it for the cropped mesh
+        os.remove(mesh_path)
+        msg = "Error: No part of the mesh lies inside the ROI\n"
+        print(msg)
+        if output_callback: output_callback(msg)
+        return False
+    return o3d.io.write_triangle_mesh(mesh_path, cropped)
+
+
+def run_openmvs_pipeline(
+    sparse_model_path: str,
+    image_dir: str,
+    output_dir: str,
+    config: RunConfig,
+    output_callback=None,
+    mask_dir: str = None,
+    roi: dict = None,
+) -> bool:
+    """
+    Densify, mesh, refine and texture a sparse model with OpenMVS.
+
+    Args:
+        mask_dir: Folder of <image stem>.mask.png files; depth is only
+            estimated where the mask is non-zero
+        roi: Box the mesh is cropped to before refinement and texturing
+    """
+    mvs_bin = config.openmvs_bin_path
+    quality_profile = config.quality_profile
     
     msg = f"\n{'='*60}\n  OpenMVS Pipeline - Profile: {quality_profile}\n{'='*60}\n"
     print(msg)
@@ -57,15 +127,25 @@ def run_openmvs_pipeline(sparse_model_path: str, image_dir: str, output_dir: str
             "scene.mvs",
             "-o", "scene_dense.mvs",
         ]
-        cmd = build_command_with_params(base_cmd, "DensifyPointCloud")
+        cmd = build_command_with_params(base_cmd, "DensifyPointCloud", config)
+        if mask_dir:
+            cmd.extend(["--mask-path", os.path.abspath(mask_dir), "--ignore-mask-label", str(MASK_IGNORE_LABEL)])
         if not run_command(cmd, cwd=output_dir, output_callback=output_callback): 
             return False
     
     scene_dense_mesh_path = os.path.join(output_dir, "scene_dense_mesh.ply")
-    if os.path.exists(scene_dense_mesh_path):
+    mesh_existed = os.path.exists(scene_dense_mesh_path)
+    if mesh_existed:
         msg = "\n--- Step 3: ReconstructMesh ---\nOutput file 'scene_dense_mesh.ply' already exists. Skipping step.\n"
         print(msg)
         if output_callback: output_callback(msg)
+    elif config.mesher == "poisson":
+        msg = "\n--- Step 3: Adaptive Poisson Reconstruction ---\n"
+        print(msg)
+        if output_callback: output_callback(msg)
+
+        if not _poisson_mesh(sparse_model_path, output_dir, config, output_callback):
+            return False
     else:
         msg = "\n--- Step 3: ReconstructMesh ---\n"
         print(msg)
@@ -76,14 +156,19 @@ def run_openmvs_pipeline(sparse_model_path: str, image_dir: str, output_dir: str
             "scene_dense.mvs",
             "-o", "scene_dense_mesh.ply"
         ]
-        cmd = build_command_with_params(base_cmd, "ReconstructMesh")
+        cmd = build_command_with_params(base_cmd, "ReconstructMesh", config)
         if not run_command(cmd, cwd=output_dir, output_callback=output_callback): 
             return False
+
+    # A mesh left by an earlier run was cropped when it was built
+    if roi is not None and not mesh_existed:
+        if not _crop_mesh(output_dir, roi, output_callback):
+            return False
     
     scene_dense_mesh_refine_path = os.path.join(output_dir, "scene_dense_mesh_refine.ply")
     mesh_for_texturing = "scene_dense_mesh.ply"
     
-    if should_skip_refine_mesh():
+    if config.should_skip_refine_mesh():
         msg = "\n--- Step 4: RefineMesh ---\nSkipping RefineMesh (profile setting)\n"
         print(msg)
         if output_callback: output_callback(msg)
@@ -104,7 +189,7 @@ def run_openmvs_pipeline(sparse_model_path: str, image_dir: str, output_dir: str
             "-m", "scene_dense_mesh.ply",
             "-o", "scene_dense_mesh_refine.ply"
         ]
-        cmd = build_command_with_params(base_cmd, "RefineMesh")
+        cmd = build_command_with_params(base_cmd, "RefineMesh", config)
         if not run_command(cmd, cwd=output_dir, output_callback=output_callback): 
             return False
         mesh_for_texturing = "scene_dense_mesh_refine.ply"
@@ -126,7 +211,7 @@ def run_openmvs_pipeline(sparse_model_path: str, image_dir: str, output_dir: str
             "-m", mesh_for_texturing,
             "-o", "result.obj"
         ]
-        cmd = build_command_with_params(base_cmd, "TextureMesh")
+        cmd = build_command_with_params(base_cmd, "TextureMesh", config)
         if not run_command(cmd, cwd=output_dir, output_callback=output_callback): 
             return False
     
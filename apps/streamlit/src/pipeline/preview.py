@@ -0,0 +1,87 @@
+"""
+Coarse preview of a reconstruction built from the sparse COLMAP model.
+
+The preview takes seconds to build, so coverage can be judged long before
+the dense stages finish. It lives in its own folder and is rebuilt only when
+the sparse model changes.
+"""
+
+import os
+
+from .colmap import get_point_cloud_from_sparse_model
+
+PREVIEW_DIR_NAME = "preview"
+PREVIEW_CLOUD_NAME = "preview_cloud.ply"
+PREVIEW_MESH_NAME = "preview_mesh.ply"
+# Sparse clouds hold thousands of points, a shallow octree is enough
+PREVIEW_POISSON_DEPTH = 8
+# Drop the weakly supported Poisson surface that bridges uncovered areas
+PREVIEW_DENSITY_QUANTILE = 0.1
+MIN_PREVIEW_POINTS = 20
+
+
+def preview_paths(result_path: str) -> tuple:
+    """(cloud, mesh) paths of the preview inside a result folder."""
+    preview_dir = os.path.join(result_path, PREVIEW_DIR_NAME)
+    return os.path.join(preview_dir, PREVIEW_CLOUD_NAME), os.path.join(preview_dir, PREVIEW_MESH_NAME)
+
+
+def is_preview_current(result_path: str, sparse_model_path: str) -> bool:
+    """True if the preview exists and is newer than the sparse model."""
+    cloud_path, mesh_path = preview_paths(result_path)
+    model_files = [
+        os.path.join(sparse_model_path, f)
+        for f in ("points3D.bin", "points3D.txt")
+        if os.path.exists(os.path.join(sparse_model_path, f))
+    ]
+    if not model_files or not os.path.exists(cloud_path) or not os.path.exists(mesh_path):
+        return False
+    model_mtime = max(os.path.getmtime(f) for f in model_files)
+    return min(os.path.getmtime(cloud_path), os.path.getmtime(mesh_path)) >= model_mtime
+
+
+def build_sparse_preview(sparse_model, result_path: str, output_callback=None) -> bool:
+    """
+    Write a filtered point cloud and a coarse Poisson mesh of a sparse model.
+
+    The normal radius follows the median point spacing because the sparse
+    model has no metric scale.
+
+    Returns:
+        True if both preview files were written
+    """
+    import numpy as np
+    import open3d as o3d
+    from ..processing import filter_outliers_indices, surface_reconstruction, estimate_point_spacing
+
+    cloud_path, mesh_path = preview_paths(result_path)
+    os.makedirs(os.path.dirname(cloud_path), exist_ok=True)
+
+    point_cloud = get_point_cloud_from_sparse_model(sparse_model)
+    if len(point_cloud.points) >= MIN_PREVIEW_POINTS:
+        point_cloud = point_cloud.select_by_index(filter_outliers_indices(point_cloud))
+    if len(point_cloud.points) < MIN_PREVIEW_POINTS:
+        msg = f"Sparse model has only {len(point_cloud.points)} points, not enough for a preview.\n"
+        print(msg)
+        if output_callback: output_callback(msg)
+        return False
+
+    o3d.io.write_point_cloud(cloud_path, point_cloud)
+
+    spacing = estimate_point_spacing(point_cloud)
+    mesh = surface_reconstruction(
+        point_cloud,
+        normal_radius=spacing * 5,
+        depth=PREVIEW_POISSON_DEPTH,
+        density_quantile=PREVIEW_DENSITY_QUANTILE,
+    )
+    mesh.compute_vertex_normals()
+    o3d.io.write_triangle_mesh(mesh_path, mesh)
+
+    msg = (
+        f"Preview: {len(point_cloud.points)} points, "
+        f"{len(np.asarray(mesh.triangles))} triangles in {os.path.dirname(cloud_path)}\n"
+    )
+    print(msg)
+    if output_callback: output_callback(msg)
+    return True
@@ -0,0 +1,228 @@
+"""
+Opt-in profiling of the Python side of a job.
+
+Each profiled section runs under cProfile and, in "memory" mode, under
+tracemalloc. The raw statistics are written as <section>.prof, loadable
+with pstats or snakeviz, next to a <section>.json summary holding the top
+functions, the largest allocation sites and the split between Python and
+native time.
+
+Native time is the time cProfile attributes to built-in functions: waits on
+external tools (reading their output, os.wait4), pycolmap, Open3D and NumPy
+calls. Python time is everything spent in interpreted code, including the
+log callbacks every output line of an external tool goes through.
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+PROFILES_DIR_NAME = "profiles"
+# Functions and allocation sites kept in each summary
+DEFAULT_TOP_N = 50
+# Frames recorded per allocation, one keeps tracemalloc's overhead low
+TRACEMALLOC_FRAMES = 1
+
+# Name of the section being profiled in this process. cProfile hooks the
+# interpreter, and before Python 3.12 enabling a second profiler silently
+# takes the hook over from the first, so sections never overlap: nested
+# sections and those of concurrent jobs are skipped
+_active_section = None
+_active_lock = threading.Lock()
+
+
+def _function_label(key: tuple) -> str:
+    filename, line, name = key
+    if filename == "~":
+        return name
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+class _CallTimer:
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+
+
+class Profiler:
+    """
+    Profiles named sections and the callbacks invoked inside them.
+
+    Args:
+        output_dir: Folder receiving the .prof and .json files
+        memory: Also track allocations with tracemalloc
+        top_n: Functions and allocation sites kept in each summary
+        output_callback: Receives a one-line summary per section
+    """
+
+    def __init__(self, output_dir: str, memory: bool = False, top_n: int = DEFAULT_TOP_N, output_callback=None):
+        self.output_dir = output_dir
+        self.memory = memory
+        self.top_n = top_n
+        self.output_callback = output_callback
+        self._callbacks = {}
+
+    def wrap_callback(self, name: str, callback):
+        """Wrap a callback so sections report how often it ran and for how long."""
+        if callback is None:
+            return None
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return callback(*args, **kwargs)
+            finally:
+                timer = self._callbacks.setdefault(name, _CallTimer())
+                timer.calls += 1
+                timer.seconds += time.perf_counter() - start
+
+        return timed
+
+    def _skip(self, name: str, reason: str) -> None:
+        msg = f"Profiling of {name} skipped: {reason}\n"
+        print(msg)
+        if self.output_callback: self.output_callback(msg)
+
+    @contextmanager
+    def section(self, name: str):
+        """
+        Profile the enclosed code and save its statistics as <name>.prof and <name>.json.
+
+        The code runs unprofiled if another section is active in the process.
+        """
+        global _active_section
+
+        with _active_lock:
+            active = _active_section
+            if active is None:
+                _active_section = name
+        if active is not None:
+            self._skip(name, f"{active} is already being profiled")
+            yield
+            return
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # A profiler not started through a section, e.g. python -m cProfile on 3.12+
+            with _active_lock:
+                _active_section = None
+            self._skip(name, str(e))
+            yield
+            return
+
+        started_tracing = False
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                started_tracing = True
+            tracemalloc.reset_peak()
+        self._callbacks = {}
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            profile.disable()
+            with _active_lock:
+                _active_section = None
+            wall = time.perf_counter() - start
+            snapshot = peak = None
+            if self.memory:
+                _, peak = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot()
+                if started_tracing:
+                    tracemalloc.stop()
+            self._save(name, profile, wall, snapshot, peak)
+
+    def _save(self, name: str, profile: cProfile.Profile, wall: float, snapshot, peak) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        profile.dump_stats(os.path.join(self.output_dir, f"{name}.prof"))
+        summary = summarize_profile(pstats.Stats(profile), wall, self.top_n)
+        summary["name"] = name
+        summary["callbacks"] = {
+            callback: {"calls": timer.calls, "seconds": timer.seconds}
+            for callback, timer in self._callbacks.items()
+        }
+        if snapshot is not None:
+            summary["memory"] = summarize_snapshot(snapshot, peak, self.top_n)
+        with open(os.path.join(self.output_dir, f"{name}.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+
+        msg = (
+            f"Profile of {name}: {summary['python_s']:.2f} s Python, {summary['native_s']:.2f} s native "
+            f"of {wall:.2f} s ({summary['python_share']:.1%} Python)\n"
+        )
+        print(msg)
+        if self.output_callback: self.output_callback(msg)
+
+
+def summarize_profile(stats: pstats.Stats, wall: float, top_n: int = DEFAULT_TOP_N) -> dict:
+    """
+    Top functions of a cProfile run and its Python versus native time.
+
+    Returns:
+        Dictionary with wall_s, python_s, native_s, python_share and
+        top_functions sorted by own time
+    """
+    functions = []
+    python_s = native_s = 0.0
+    for key, (_, calls, tottime, cumtime, _) in stats.stats.items():
+        if key[0] == "~":
+            native_s += tottime
+        else:
+            python_s += tottime
+        functions.append({
+            "function": _function_label(key),
+            "calls": calls,
+            "tottime": tottime,
+            "cumtime": cumtime,
+            "native": key[0] == "~",
+        })
+    functions.sort(key=lambda f: f["tottime"], reverse=True)
+    total = python_s + native_s
+    return {
+        "wall_s": wall,
+        "python_s": python_s,
+        "native_s": native_s,
+        "python_share": python_s / total if total else 0.0,
+        "top_functions": functions[:top_n],
+    }
+
+
+def summarize_snapshot(snapshot, peak_bytes: int, top_n: int = DEFAULT_TOP_N) -> dict:
+    """Peak traced memory and the allocation sites holding the most memory at the end of a section."""
+    statistics = snapshot.statistics("lineno")
+    return {
+        "peak_mb": peak_bytes / 1e6,
+        "retained_mb": sum(stat.size for stat in statistics) / 1e6,
+        "top_allocations": [
+            {
+                "location": f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                "size_mb": stat.size / 1e6,
+                "count": stat.count,
+            }
+            for stat in statistics[:top_n]
+        ],
+    }
+
+
+def read_profiles(result_path: str) -> list:
+    """Summaries saved in a result folder, in the order their sections finished."""
+    profiles_dir = os.path.join(result_path, PROFILES_DIR_NAME)
+    if not os.path.isdir(profiles_dir):
+        return []
+    paths = [os.path.join(profiles_dir, f) for f in os.listdir(profiles_dir) if f.endswith(".json")]
+    summaries = []
+    for path in sorted(paths, key=os.path.getmtime):
+        try:
+            with open(path) as f:
+                summaries.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return summaries
@@ -0,0 +1,299 @@
+"""
+Region of interest restricting dense reconstruction to the object.
+
+The ROI is an oriented box in the sparse model's frame. It is estimated
+from the sparse cloud or given by the user, then projected into every
+undistorted image as a mask: DensifyPointCloud skips masked pixels, so no
+depth is estimated for the background. The masks only bound the box from
+the views, so the mesh is also cropped to the box before it is refined and
+textured. The dense cloud scene_dense.ply is not cropped and may keep points
+just outside the box.
+
+Automatic estimation is meant for object captures, where the cameras look
+inward. Their optical axes converge on the object, and the sparse cluster
+nearest that point is taken as the object. When the axes do not converge,
+as in scene captures, no ROI is estimated and the whole scene is kept.
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+
+from .colmap import get_point_cloud_from_sparse_model
+
+ROI_NAME = "roi.json"
+MASKS_DIR_NAME = "masks"
+MASKS_MANIFEST_NAME = "manifest.json"
+# OpenMVS looks for <image stem> plus this suffix in --mask-path
+MASK_SUFFIX = ".mask.png"
+# Mask value of pixels outside the ROI, passed as --ignore-mask-label
+MASK_IGNORE_LABEL = 0
+MIN_ROI_POINTS = 50
+# DBSCAN radius in median point spacings
+ROI_CLUSTER_EPS_FACTOR = 5.0
+# DBSCAN runs on voxel centroids of this edge length, in median point spacings
+ROI_CLUSTER_VOXEL_FACTOR = 2.0
+# Occupied voxels a cluster needs
+ROI_CLUSTER_MIN_POINTS = 10
+# Share of cameras the convergence point must lie in front of
+MIN_CONVERGING_CAMERAS = 0.8
+
+
+def roi_path(result_path: str) -> str:
+    return os.path.join(result_path, ROI_NAME)
+
+
+def masks_path(result_path: str) -> str:
+    return os.path.join(result_path, MASKS_DIR_NAME)
+
+
+def read_roi(result_path: str) -> dict:
+    """The ROI stored in a result folder, None if none was determined yet."""
+    path = roi_path(result_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_roi(result_path: str, roi: dict) -> None:
+    with open(roi_path(result_path), "w") as f:
+        json.dump(roi, f, indent=2)
+
+
+def roi_from_box(box, source: str = "manual") -> dict:
+    """
+    ROI from a user-given box.
+
+    Args:
+        box: Mapping with center and extent (3 values each), and optionally
+            a 3x3 rotation whose columns are the box axes
+
+    Returns:
+        ROI dictionary with center, extent, rotation and source
+    """
+    rotation = box.get("rotation")
+    return {
+        "center": [float(v) for v in box["center"]],
+        "extent": [float(v) for v in box["extent"]],
+        "rotation": np.asarray(rotation if rotation is not None else np.eye(3), dtype=np.float64).tolist(),
+        "source": source,
+    }
+
+
+def same_box(roi: dict, other: dict) -> bool:
+    """Whether two ROIs describe the same box, regardless of how they were obtained."""
+    keys = ("center", "extent", "rotation")
+    return all((roi or {}).get(key) == (other or {}).get(key) for key in keys)
+
+
+def roi_corners(roi: dict) -> np.ndarray:
+    """The eight corners of an ROI box, (8, 3)."""
+    signs = np.array([[x, y, z] for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)], dtype=np.float64)
+    half = np.asarray(roi["extent"]) / 2
+    return np.asarray(roi["center"]) + (signs * half) @ np.asarray(roi["rotation"]).T
+
+
+def crop_to_roi(geometry, roi: dict):
+    """Part of an Open3D point cloud or triangle mesh inside an ROI box."""
+    import open3d as o3d
+
+    box = o3d.geometry.OrientedBoundingBox(
+        np.asarray(roi["center"], dtype=np.float64),
+        np.asarray(roi["rotation"], dtype=np.float64),
+        np.asarray(roi["extent"], dtype=np.float64),
+    )
+    return geometry.crop(box)
+
+
+def _camera_axes(sparse_model) -> tuple:
+    # Imported here because processing depends on open3d
+    from ..processing.tsdf import cam_from_world_matrix
+
+    centers, axes = [], []
+    for image in sparse_model.images.values():
+        pose = cam_from_world_matrix(image)
+        rotation = pose[:3, :3]
+        centers.append(-rotation.T @ pose[:3, 3])
+        axes.append(rotation[2])
+    return np.array(centers), np.array(axes)
+
+
+def view_convergence(centers: np.ndarray, axes: np.ndarray) -> np.ndarray:
+    """
+    Point closest to every camera's optical axis in the least-squares sense.
+
+    Returns:
+        (3,) point, or None if the axes are near parallel or the point is
+        not in front of most cameras
+    """
+    if len(centers) < 3:
+        return None
+    axes = axes / np.linalg.norm(axes, axis=1, keepdims=True)
+    # Projections onto the plane orthogonal to each axis
+    projections = np.eye(3)[None] - axes[:, :, None] * axes[:, None, :]
+    lhs = projections.sum(axis=0)
+    rhs = np.einsum("nij,nj->i", projections, centers)
+    if np.linalg.cond(lhs) > 1e6:
+        return None
+    point = np.linalg.solve(lhs, rhs)
+    in_front = np.einsum("ni,ni->n", point - centers, axes) > 0
+    if in_front.mean() < MIN_CONVERGING_CAMERAS:
+        return None
+    return point
+
+
+def estimate_roi(sparse_model, border: float = 0.1, output_callback=None) -> dict:
+    """
+    Estimate the object's bounding box from a sparse model.
+
+    Outliers are removed, the cloud is split into clusters, and the cluster
+    nearest the point the cameras look at is boxed with an oriented bounding
+    box enlarged by border times its extent on each side.
+
+    Args:
+        sparse_model: pycolmap.Reconstruction
+        border: Margin added on each side, as a fraction of the extent
+
+    Returns:
+        ROI dictionary, or None if the capture does not look object-centred
+        or the model has too few points
+    """
+    from ..processing import estimate_point_spacing, filter_outliers_indices, segment_point_cloud_indices
+
+    point_cloud = get_point_cloud_from_sparse_model(sparse_model)
+    if len(point_cloud.points) < MIN_ROI_POINTS:
+        msg = f"Sparse model has only {len(point_cloud.points)} points, not enough to estimate an ROI.\n"
+        print(msg)
+        if output_callback: output_callback(msg)
+        return None
+
+    focus = view_convergence(*_camera_axes(sparse_model))
+    if focus is None:
+        msg = "Camera axes do not converge on an object, keeping the whole scene.\n"
+        print(msg)
+        if output_callback: output_callback(msg)
+        return None
+
+    point_cloud = point_cloud.select_by_index(filter_outliers_indices(point_cloud))
+    spacing = estimate_point_spacing(point_cloud)
+    points = np.asarray(point_cloud.points)
+    clusters = [
+        indices for indices in segment_point_cloud_indices(
+            point_cloud,
+            eps=spacing * ROI_CLUSTER_EPS_FACTOR,
+            min_points=ROI_CLUSTER_MIN_POINTS,
+            voxel_size=spacing * ROI_CLUSTER_VOXEL_FACTOR,
+        )
+        if len(indices) >= MIN_ROI_POINTS
+    ]
+    if clusters:
+        distances = [np.linalg.norm(points[indices] - focus, axis=1).min() for indices in clusters]
+        obj = point_cloud.select_by_index(clusters[int(np.argmin(distances))])
+    else:
+        obj = point_cloud
+
+    box = obj.get_oriented_bounding_box()
+    roi = roi_from_box({
+        "center": np.asarray(box.center),
+        "extent": np.asarray(box.extent) * (1 + 2 * border),
+        "rotation": np.asarray(box.R),
+    }, source="auto")
+    roi["num_points"] = len(obj.points)
+    roi["total_points"] = len(point_cloud.points)
+
+    msg = (
+        f"ROI of {len(obj.points)} of {len(point_cloud.points)} sparse points, "
+        f"extent {' x '.join(f'{v:.3g}' for v in roi['extent'])}\n"
+    )
+    print(msg)
+    if output_callback: output_callback(msg)
+    return roi
+
+
+def _convex_hull(points: np.ndarray) -> list:
+    """Convex hull of 2-D points, counter-clockwise, by the monotone chain algorithm."""
+    ordered = sorted(map(tuple, points))
+
+    def half(sequence):
+        hull = []
+        for p in sequence:
+            while len(hull) >= 2:
+                (ax, ay), (bx, by) = np.subtract(hull[-1], hull[-2]), np.subtract(p, hull[-2])
+                if ax * by - ay * bx > 0:
+                    break
+                hull.pop()
+            hull.append(p)
+        return hull[:-1]
+
+    return half(ordered) + half(reversed(ordered))
+
+
+def write_roi_masks(roi: dict, model_path: str, output_dir: str, output_callback=None) -> float:
+    """
+    Write a mask per image of a COLMAP model, 255 inside the ROI and 0 outside.
+
+    The mask is the projected box's convex hull. Images that have a box
+    corner behind the camera get a full mask rather than a wrong one.
+
+    Args:
+        roi: ROI dictionary
+        model_path: Undistorted COLMAP model whose images OpenMVS reads
+        output_dir: Folder receiving <image stem>.mask.png files
+
+    Returns:
+        Mean share of image area inside the ROI
+    """
+    import pycolmap
+    from PIL import Image, ImageDraw
+    from ..processing.tsdf import cam_from_world_matrix
+
+    os.makedirs(output_dir, exist_ok=True)
+    corners = np.hstack([roi_corners(roi), np.ones((8, 1))])
+    reconstruction = pycolmap.Reconstruction(model_path)
+
+    coverage = []
+    for image in reconstruction.images.values():
+        camera = reconstruction.cameras[image.camera_id]
+        size = (camera.width, camera.height)
+        in_camera = corners @ cam_from_world_matrix(image)[:3].T
+        if np.any(in_camera[:, 2] <= 0):
+            mask = Image.new("L", size, 255)
+        else:
+            projected = in_camera @ np.asarray(camera.calibration_matrix()).T
+            pixels = projected[:, :2] / projected[:, 2:]
+            mask = Image.new("L", size, MASK_IGNORE_LABEL)
+            ImageDraw.Draw(mask).polygon(_convex_hull(pixels), fill=255)
+        coverage.append(np.count_nonzero(np.asarray(mask)) / (size[0] * size[1]))
+        stem = os.path.splitext(os.path.basename(image.name))[0]
+        mask.save(os.path.join(output_dir, stem + MASK_SUFFIX))
+
+    mean_coverage = float(np.mean(coverage)) if coverage else 1.0
+    _write_masks_manifest(output_dir, roi, mean_coverage, len(coverage))
+
+    msg = f"Wrote {len(coverage)} ROI masks, covering {mean_coverage:.1%} of the image area on average\n"
+    print(msg)
+    if output_callback: output_callback(msg)
+    return mean_coverage
+
+
+def _write_masks_manifest(output_dir: str, roi: dict, coverage: float, images: int) -> None:
+    with open(os.path.join(output_dir, MASKS_MANIFEST_NAME), "w") as f:
+        json.dump({"roi": roi, "coverage": coverage, "images": images}, f, indent=2)
+
+
+def clear_roi_masks(output_dir: str) -> None:
+    """Remove all masks, recording that dense reconstruction covers the whole scene."""
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.makedirs(output_dir)
+    _write_masks_manifest(output_dir, None, 1.0, 0)
+
+
+def read_masks_manifest(result_path: str) -> dict:
+    path = os.path.join(masks_path(result_path), MASKS_MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
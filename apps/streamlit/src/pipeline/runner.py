@@ -2,13 +2,60 @@
 Command execution utilities for running external processes.
 """
 
+import os
 import subprocess
+import sys
+import threading
+from contextlib import contextmanager
+
+_memory_trackers = threading.local()
+
+
+class CommandAborted(Exception):
+    """Raised by an output callback to stop the running command and its stage."""
+
+
+@contextmanager
+def track_child_memory():
+    """
+    Collect the peak resident memory (MB) of every command run in this thread.
+
+    Yields a list that receives one entry per finished command.
+    """
+    stack = getattr(_memory_trackers, "stack", None)
+    if stack is None:
+        stack = _memory_trackers.stack = []
+    peaks = []
+    stack.append(peaks)
+    try:
+        yield peaks
+    finally:
+        stack.remove(peaks)
+
+
+def _maxrss_to_mb(maxrss: int) -> float:
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == "darwin":
+        return maxrss / (1024 * 1024)
+    return maxrss / 1024
+
+
+def _wait_with_usage(process: subprocess.Popen) -> None:
+    if not hasattr(os, "wait4"):
+        process.wait()
+        return
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    for peaks in getattr(_memory_trackers, "stack", []):
+        peaks.append(_maxrss_to_mb(usage.ru_maxrss))
+
 
 def run_command(cmd: list, cwd: str = None, output_callback=None) -> bool:
     print(f"Executing: {' '.join(cmd)}")
     if output_callback:
         output_callback(f"Executing: {' '.join(cmd)}\n")
         
+    process = None
     try:
         process = subprocess.Popen(
             cmd,
@@ -20,12 +67,16 @@ def run_command(cmd: list, cwd: str = None, output_callback=None) -> bool:
             universal_newlines=True
         )
         
-        for line in process.stdout:
+        while True:
+            # An explicit call, so profiles count waiting on the tool as native time
+            line = process.stdout.readline()
+            if not line:
+                break
             print(line, end='')
             if output_callback:
                 output_callback(line)
                 
-        process.wait()
+        _wait_with_usage(process)
         
         if process.returncode != 0:
             err_msg = f"Command failed with exit code {process.returncode}"
@@ -35,6 +86,11 @@ def run_command(cmd: list, cwd: str = None, output_callback=None) -> bool:
             return False
             
         return True
+    except CommandAborted:
+        if process is not None and process.poll() is None:
+            process.kill()
+            process.wait()
+        raise
     except Exception as e:
         err_msg = f"Error executing command: {e}"
         print(err_msg)
@@ -0,0 +1,131 @@
+"""
+Quality gate between sparse and dense reconstruction.
+
+Dense reconstruction costs far more than the sparse stage, so a sparse
+model that registered few images or fits them badly is rejected before
+any dense work starts. Thresholds come from the profile's "quality_gate"
+step and can be overridden like any other COLMAP step.
+
+With multiple_models enabled, as in every profile, COLMAP writes one
+folder per model under sparse/ when it cannot connect all images. The
+largest model is moved into sparse/0, where the later stages expect it,
+and the number of models is part of the quality report.
+"""
+
+import json
+import os
+
+QUALITY_REPORT_NAME = "quality.json"
+
+
+def list_models(output_path: str) -> list:
+    """Model folders COLMAP wrote under output_path, in numeric order."""
+    if not os.path.isdir(output_path):
+        return []
+    names = [name for name in os.listdir(output_path) if name.isdigit()]
+    return [
+        os.path.join(output_path, name)
+        for name in sorted(names, key=int)
+        if os.path.isdir(os.path.join(output_path, name))
+    ]
+
+
+def select_largest_model(output_path: str, output_callback=None):
+    """
+    Load the model with the most registered images and move it into output_path/0.
+
+    Returns:
+        The loaded pycolmap.Reconstruction, or None if no model loads
+    """
+    import pycolmap
+
+    best_path, best_model = None, None
+    for model_path in list_models(output_path):
+        try:
+            model = pycolmap.Reconstruction(model_path)
+        except Exception as e:
+            msg = f"Skipping unreadable model {model_path}: {e}\n"
+            print(msg)
+            if output_callback: output_callback(msg)
+            continue
+        if best_model is None or model.num_reg_images() > best_model.num_reg_images():
+            best_path, best_model = model_path, model
+
+    first_path = os.path.join(output_path, "0")
+    if best_path is not None and best_path != first_path:
+        # Swap the folders so the smaller model is kept for inspection
+        swap_path = os.path.join(output_path, "swap")
+        os.replace(first_path, swap_path)
+        os.replace(best_path, first_path)
+        os.replace(swap_path, best_path)
+        msg = f"Largest model was {os.path.basename(best_path)}, moved it to {first_path}\n"
+        print(msg)
+        if output_callback: output_callback(msg)
+    return best_model
+
+
+def sparse_metrics(reconstruction, num_images: int, num_models: int) -> dict:
+    """Registration and accuracy statistics of a sparse model."""
+    registered = reconstruction.num_reg_images()
+    return {
+        "num_images": num_images,
+        "registered_images": registered,
+        "registration_ratio": registered / num_images if num_images else 0.0,
+        "num_points3D": reconstruction.num_points3D(),
+        "mean_track_length": reconstruction.compute_mean_track_length(),
+        "mean_reprojection_error": reconstruction.compute_mean_reprojection_error(),
+        "num_models": num_models,
+    }
+
+
+def check_sparse_quality(metrics: dict, thresholds: dict) -> list:
+    """
+    Compare sparse metrics against the gate thresholds.
+
+    Returns:
+        One message per failed check, empty if the model passes
+    """
+    failures = []
+    min_ratio = thresholds.get("min_registration_ratio")
+    if min_ratio is not None and metrics["registration_ratio"] < min_ratio:
+        failures.append(
+            f"registered {metrics['registered_images']}/{metrics['num_images']} images "
+            f"({metrics['registration_ratio']:.0%}), need {min_ratio:.0%}"
+        )
+    max_error = thresholds.get("max_reprojection_error")
+    if max_error is not None and metrics["mean_reprojection_error"] > max_error:
+        failures.append(
+            f"mean reprojection error {metrics['mean_reprojection_error']:.2f} px, "
+            f"limit {max_error:.2f} px"
+        )
+    min_track = thresholds.get("min_mean_track_length")
+    if min_track is not None and metrics["mean_track_length"] < min_track:
+        failures.append(
+            f"mean track length {metrics['mean_track_length']:.2f}, need {min_track:.2f}"
+        )
+    return failures
+
+
+def format_metrics(metrics: dict) -> str:
+    return (
+        f"Sparse quality: {metrics['registered_images']}/{metrics['num_images']} images registered "
+        f"({metrics['registration_ratio']:.0%}) in {metrics['num_models']} model(s), "
+        f"{metrics['num_points3D']} points, "
+        f"track length {metrics['mean_track_length']:.2f}, "
+        f"reprojection error {metrics['mean_reprojection_error']:.2f} px\n"
+    )
+
+
+def write_quality_report(output_path: str, metrics: dict, failures: list, matcher: str) -> None:
+    report = {"passed": not failures, "failures": failures, "matcher": matcher, **metrics}
+    with open(os.path.join(output_path, QUALITY_REPORT_NAME), "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def read_quality_report(output_path: str):
+    """The last gate report under output_path, or None if there is none."""
+    try:
+        with open(os.path.join(output_path, QUALITY_REPORT_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -1,11 +1,54 @@
 """Processing module for point cloud and mesh operations."""
 
-from .point_cloud import filter_outliers, segment_point_cloud
-from .mesh import surface_reconstruction, load_rgbd_images
+from .point_cloud import (
+    filter_outliers,
+    segment_point_cloud,
+    filter_outliers_indices,
+    segment_point_cloud_indices,
+    group_indices_by_label,
+    voxel_downsample_with_trace,
+    auto_tile_size,
+)
+from .mesh import (
+    surface_reconstruction,
+    adaptive_surface_reconstruction,
+    estimate_point_spacing,
+    choose_poisson_depth,
+    load_rgbd_images,
+)
+from .tsdf import (
+    find_depth_images,
+    load_dataset_intrinsic,
+    intrinsic_from_colmap_camera,
+    estimate_metric_scale,
+    colmap_extrinsics,
+    fuse_rgbd_frames,
+    extract_tsdf_geometry,
+)
+from .gltf import export_web_glb
+from .textures import build_texture_variants, read_mtl_textures
 
 __all__ = [
     "filter_outliers",
     "segment_point_cloud",
+    "filter_outliers_indices",
+    "segment_point_cloud_indices",
+    "group_indices_by_label",
+    "voxel_downsample_with_trace",
+    "auto_tile_size",
     "surface_reconstruction",
+    "adaptive_surface_reconstruction",
+    "estimate_point_spacing",
+    "choose_poisson_depth",
     "load_rgbd_images",
+    "find_depth_images",
+    "load_dataset_intrinsic",
+    "intrinsic_from_colmap_camera",
+    "estimate_metric_scale",
+    "colmap_extrinsics",
+    "fuse_rgbd_frames",
+    "extract_tsdf_geometry",
+    "export_web_glb",
+    "build_texture_variants",
+    "read_mtl_textures",
 ]
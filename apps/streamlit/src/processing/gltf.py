@@ -0,0 +1,429 @@
+"""
+Compact binary glTF export for web delivery.
+
+Geometry is written with KHR_mesh_quantization: positions as 16-bit integers
+dequantized by the node transform and UVs as normalized 16-bit integers.
+Triangles are reordered along a Morton curve and vertices renumbered in
+first-use order, which keeps both the GPU vertex cache and vertex fetches
+local. Textures are baked photographs, so materials use KHR_materials_unlit
+and no normals are stored.
+"""
+
+import io
+import json
+import os
+import struct
+
+import numpy as np
+
+GLB_MAGIC = 0x46546C67
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+# glTF component types
+UNSIGNED_SHORT = 5123
+UNSIGNED_INT = 5125
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+
+JPEG_QUALITY = 85
+
+
+def _part1by2(x: np.ndarray) -> np.ndarray:
+    """Spread the low 10 bits of x so two zero bits separate each bit."""
+    x = x.astype(np.uint32) & 0x3FF
+    x = (x | (x << 16)) & 0x030000FF
+    x = (x | (x << 8)) & 0x0300F00F
+    x = (x | (x << 4)) & 0x030C30C3
+    x = (x | (x << 2)) & 0x09249249
+    return x
+
+
+def morton_codes(points: np.ndarray) -> np.ndarray:
+    """30-bit Morton codes of points quantized to a 1024^3 grid."""
+    lo = points.min(axis=0)
+    extent = np.maximum(points.max(axis=0) - lo, 1e-12)
+    grid = ((points - lo) / extent * 1023).astype(np.uint32)
+    return _part1by2(grid[:, 0]) | (_part1by2(grid[:, 1]) << 1) | (_part1by2(grid[:, 2]) << 2)
+
+
+def reorder_for_locality(vertices: np.ndarray, faces: np.ndarray, uvs: np.ndarray = None) -> tuple:
+    """
+    Reorder triangles spatially and renumber vertices in first-use order.
+
+    Unreferenced vertices are dropped.
+
+    Returns:
+        (vertices, faces, uvs) with the new ordering
+    """
+    centroids = vertices[faces].mean(axis=1)
+    faces = faces[np.argsort(morton_codes(centroids), kind="stable")]
+
+    used, first_use = np.unique(faces.ravel(), return_index=True)
+    vertex_order = used[np.argsort(first_use)]
+    remap = np.empty(len(vertices), dtype=np.int64)
+    remap[vertex_order] = np.arange(len(vertex_order))
+
+    faces = remap[faces]
+    vertices = vertices[vertex_order]
+    if uvs is not None:
+        uvs = uvs[vertex_order]
+    return vertices, faces, uvs
+
+
+def cluster_decimate(
+    vertices: np.ndarray,
+    faces: np.ndarray,
+    uvs: np.ndarray,
+    ratio: float,
+    uv_cells: int = 16,
+) -> tuple:
+    """
+    Simplify a textured mesh by vertex clustering.
+
+    Vertices sharing a spatial grid cell are merged, but only if their UVs
+    also fall in the same coarse UV cell, so texture chart seams survive.
+    The grid resolution is searched so roughly ratio * len(vertices)
+    clusters remain.
+
+    Returns:
+        (vertices, faces, uvs) of the simplified mesh
+    """
+    target = max(int(len(vertices) * ratio), 4)
+    lo = vertices.min(axis=0)
+    extent = np.maximum(vertices.max(axis=0) - lo, 1e-12)
+    uv_key = np.clip((uvs * uv_cells).astype(np.int64), 0, uv_cells - 1)
+    uv_key = uv_key[:, 0] * uv_cells + uv_key[:, 1]
+
+    def cluster(resolution):
+        cells = np.minimum(((vertices - lo) / extent * resolution).astype(np.int64), resolution - 1)
+        keys = np.stack([cells[:, 0], cells[:, 1], cells[:, 2], uv_key], axis=1)
+        _, inverse = np.unique(keys, axis=0, return_inverse=True)
+        return inverse.ravel()
+
+    # Surfaces occupy roughly resolution^2 cells, so search around sqrt(target)
+    low, high = 2, max(4, int(np.sqrt(target) * 8))
+    inverse = cluster(high)
+    for _ in range(12):
+        if high - low <= 1:
+            break
+        mid = (low + high) // 2
+        candidate = cluster(mid)
+        if candidate.max() + 1 >= target:
+            high, inverse = mid, candidate
+        else:
+            low = mid
+
+    count = inverse.max() + 1
+    weights = np.bincount(inverse, minlength=count).astype(np.float64)
+    new_vertices = np.stack(
+        [np.bincount(inverse, vertices[:, i], count) for i in range(3)], axis=1
+    ) / weights[:, None]
+    new_uvs = np.stack(
+        [np.bincount(inverse, uvs[:, i], count) for i in range(2)], axis=1
+    ) / weights[:, None]
+
+    new_faces = inverse[faces]
+    keep = (
+        (new_faces[:, 0] != new_faces[:, 1])
+        & (new_faces[:, 1] != new_faces[:, 2])
+        & (new_faces[:, 0] != new_faces[:, 2])
+    )
+    return new_vertices, new_faces[keep], new_uvs
+
+
+def _encode_texture(image, max_size: int) -> bytes:
+    from PIL import Image
+
+    image = image.convert("RGB")
+    scale = max_size / max(image.size)
+    if scale < 1.0:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=JPEG_QUALITY, progressive=True, optimize=True)
+    return buffer.getvalue()
+
+
+class _GlbBuilder:
+    def __init__(self):
+        self.binary = bytearray()
+        self.gltf = {
+            "asset": {"version": "2.0", "generator": "sFM-Reconstruction"},
+            "extensionsUsed": ["KHR_mesh_quantization", "KHR_materials_unlit"],
+            "extensionsRequired": ["KHR_mesh_quantization"],
+            "buffers": [],
+            "bufferViews": [],
+            "accessors": [],
+            "images": [],
+            "samplers": [{"magFilter": 9729, "minFilter": 9987}],
+            "textures": [],
+            "materials": [],
+            "meshes": [],
+            "nodes": [],
+            "scenes": [{"nodes": [0]}],
+            "scene": 0,
+        }
+
+    def add_view(self, data: bytes, target: int = None, stride: int = None) -> int:
+        # Every bufferView starts on a 4-byte boundary
+        self.binary.extend(b"\x00" * (-len(self.binary) % 4))
+        view = {"buffer": 0, "byteOffset": len(self.binary), "byteLength": len(data)}
+        if target is not None:
+            view["target"] = target
+        if stride is not None:
+            view["byteStride"] = stride
+        self.binary.extend(data)
+        self.gltf["bufferViews"].append(view)
+        return len(self.gltf["bufferViews"]) - 1
+
+    def add_accessor(self, **accessor) -> int:
+        self.gltf["accessors"].append(accessor)
+        return len(self.gltf["accessors"]) - 1
+
+    def add_primitive(self, positions: np.ndarray, faces: np.ndarray, uvs: np.ndarray, material: int) -> dict:
+        # Pad vec3 uint16 to 8 bytes to keep attributes 4-byte aligned
+        padded = np.zeros((len(positions), 4), dtype=np.uint16)
+        padded[:, :3] = positions
+        position_accessor = self.add_accessor(
+            bufferView=self.add_view(padded.tobytes(), ARRAY_BUFFER, stride=8),
+            componentType=UNSIGNED_SHORT,
+            count=len(positions),
+            type="VEC3",
+            min=positions.min(axis=0).tolist(),
+            max=positions.max(axis=0).tolist(),
+        )
+        attributes = {"POSITION": position_accessor}
+
+        if uvs is not None:
+            quantized_uvs = np.round(np.clip(uvs, 0.0, 1.0) * 65535).astype(np.uint16)
+            attributes["TEXCOORD_0"] = self.add_accessor(
+                bufferView=self.add_view(quantized_uvs.tobytes(), ARRAY_BUFFER),
+                componentType=UNSIGNED_SHORT,
+                normalized=True,
+                count=len(quantized_uvs),
+                type="VEC2",
+            )
+
+        index_type = np.uint16 if len(positions) < 65536 else np.uint32
+        indices = faces.astype(index_type).ravel()
+        index_accessor = self.add_accessor(
+            bufferView=self.add_view(indices.tobytes(), ELEMENT_ARRAY_BUFFER),
+            componentType=UNSIGNED_SHORT if index_type == np.uint16 else UNSIGNED_INT,
+            count=len(indices),
+            type="SCALAR",
+        )
+        primitive = {"attributes": attributes, "indices": index_accessor, "mode": 4}
+        if material is not None:
+            primitive["material"] = material
+        return primitive
+
+    def add_material(self, jpeg_bytes: bytes = None) -> int:
+        material = {
+            "pbrMetallicRoughness": {"metallicFactor": 0.0, "roughnessFactor": 1.0},
+            "extensions": {"KHR_materials_unlit": {}},
+        }
+        if jpeg_bytes is not None:
+            image = {"bufferView": self.add_view(jpeg_bytes), "mimeType": "image/jpeg"}
+            self.gltf["images"].append(image)
+            self.gltf["textures"].append({"source": len(self.gltf["images"]) - 1, "sampler": 0})
+            material["pbrMetallicRoughness"]["baseColorTexture"] = {"index": len(self.gltf["textures"]) - 1}
+        self.gltf["materials"].append(material)
+        return len(self.gltf["materials"]) - 1
+
+    def to_bytes(self) -> bytes:
+        self.binary.extend(b"\x00" * (-len(self.binary) % 4))
+        self.gltf["buffers"] = [{"byteLength": len(self.binary)}]
+        if not self.gltf["images"]:
+            for key in ("images", "samplers", "textures"):
+                self.gltf.pop(key, None)
+
+        json_bytes = json.dumps(self.gltf, separators=(",", ":")).encode("utf-8")
+        json_bytes += b" " * (-len(json_bytes) % 4)
+        total = 12 + 8 + len(json_bytes) + 8 + len(self.binary)
+
+        return b"".join([
+            struct.pack("<III", GLB_MAGIC, 2, total),
+            struct.pack("<II", len(json_bytes), CHUNK_JSON),
+            json_bytes,
+            struct.pack("<II", len(self.binary), CHUNK_BIN),
+            bytes(self.binary),
+        ])
+
+
+def encode_quantized_glb(parts: list, texture_size: int) -> bytes:
+    """
+    Encode mesh parts as one quantized GLB.
+
+    Args:
+        parts: List of (vertices, faces, uvs, image) tuples, one per material;
+            uvs and image may be None
+        texture_size: Maximum texture side length in pixels
+
+    Returns:
+        The GLB file content
+    """
+    lo = np.min([p[0].min(axis=0) for p in parts], axis=0)
+    hi = np.max([p[0].max(axis=0) for p in parts], axis=0)
+    scale = np.maximum(hi - lo, 1e-12) / 65535.0
+
+    builder = _GlbBuilder()
+    primitives = []
+    for vertices, faces, uvs, image in parts:
+        positions = np.round((vertices - lo) / scale).astype(np.uint16)
+        texture = _encode_texture(image, texture_size) if image is not None else None
+        material = builder.add_material(texture)
+        # OBJ puts the UV origin at the bottom left, glTF at the top left
+        gltf_uvs = np.column_stack([uvs[:, 0], 1.0 - uvs[:, 1]]) if uvs is not None else None
+        primitives.append(builder.add_primitive(positions, faces, gltf_uvs, material))
+
+    builder.gltf["meshes"].append({"primitives": primitives})
+    builder.gltf["nodes"].append({
+        "mesh": 0,
+        "translation": lo.tolist(),
+        "scale": scale.tolist(),
+    })
+    return builder.to_bytes()
+
+
+def write_quantized_glb(path: str, parts: list, texture_size: int) -> int:
+    """
+    Write mesh parts into one quantized GLB file, see encode_quantized_glb.
+
+    Returns:
+        Size of the written file in bytes
+    """
+    data = encode_quantized_glb(parts, texture_size)
+    with open(path, "wb") as f:
+        f.write(data)
+    return len(data)
+
+
+def _load_obj_parts(obj_path: str) -> list:
+    import trimesh
+
+    scene = trimesh.load(obj_path, force="scene", process=False, maintain_order=True)
+    parts = []
+    for geometry in scene.dump():
+        if not isinstance(geometry, trimesh.Trimesh) or len(geometry.faces) == 0:
+            continue
+        uvs = getattr(geometry.visual, "uv", None)
+        image = None
+        material = getattr(geometry.visual, "material", None)
+        if material is not None:
+            image = getattr(material, "image", None) or getattr(material, "baseColorTexture", None)
+        vertices = np.asarray(geometry.vertices, dtype=np.float64)
+        faces = np.asarray(geometry.faces, dtype=np.int64)
+        parts.append((vertices, faces, np.asarray(uvs, dtype=np.float64) if uvs is not None else None, image))
+    return parts
+
+
+def mesh_file_glb_levels(
+    mesh_path: str,
+    texture_size: int = 2048,
+    lod_ratios: tuple = (),
+    lod_min_faces: int = 0,
+) -> list:
+    """
+    Encode a mesh file as quantized GLBs, coarsest level first.
+
+    Used to ship meshes without a web export, such as previews and
+    untextured Poisson meshes, to a browser viewer.
+
+    Args:
+        mesh_path: Any mesh file trimesh reads, e.g. OBJ or PLY
+        texture_size: Maximum texture side length in pixels
+        lod_ratios: Vertex ratios of simplified levels sent before the mesh
+        lod_min_faces: Only simplify meshes with more faces than this
+
+    Returns:
+        List of GLB byte strings
+    """
+    parts = _load_obj_parts(mesh_path)
+    if not parts:
+        raise ValueError(f"No triangles found in {mesh_path}")
+    parts = [(*reorder_for_locality(v, f, uv), image) for v, f, uv, image in parts]
+
+    levels = []
+    if sum(len(p[1]) for p in parts) <= lod_min_faces:
+        lod_ratios = ()
+    for ratio in sorted(lod_ratios):
+        lod_parts = []
+        for vertices, faces, uvs, image in parts:
+            v, f, uv = cluster_decimate(
+                vertices, faces, uvs if uvs is not None else np.zeros((len(vertices), 2)), ratio
+            )
+            if len(f):
+                lod_parts.append((*reorder_for_locality(v, f, uv if uvs is not None else None), image))
+        if lod_parts:
+            levels.append(encode_quantized_glb(lod_parts, texture_size))
+    levels.append(encode_quantized_glb(parts, texture_size))
+    return levels
+
+
+def export_web_glb(
+    obj_path: str,
+    output_dir: str,
+    texture_sizes: tuple = (1024, 2048, 4096),
+    lod_ratios: tuple = (),
+) -> dict:
+    """
+    Export a textured OBJ as compact GLB files for web delivery.
+
+    One self-contained GLB is written per texture size for the full mesh,
+    named result_<size>.glb. Texture sizes above the source atlas size are
+    skipped. Each mesh LOD ratio adds a result_lod<N>_<size>.glb using the
+    smallest texture size. A manifest.json lists every file.
+
+    Args:
+        obj_path: Textured OBJ, e.g. OpenMVS' result.obj
+        output_dir: Directory receiving the GLB files and manifest
+        texture_sizes: Maximum texture side lengths to produce
+        lod_ratios: Fractions of the vertex count for additional mesh LODs
+
+    Returns:
+        The manifest dictionary
+    """
+    parts = _load_obj_parts(obj_path)
+    if not parts:
+        raise ValueError(f"No triangles found in {obj_path}")
+    parts = [
+        (*reorder_for_locality(v, f, uv), image)
+        for v, f, uv, image in parts
+    ]
+
+    source_size = max((max(p[3].size) for p in parts if p[3] is not None), default=0)
+    sizes = sorted({s for s in texture_sizes if not source_size or s <= source_size})
+    if not sizes:
+        sizes = [source_size or min(texture_sizes)]
+
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {"source": os.path.basename(obj_path), "variants": []}
+
+    def emit(name, mesh_parts, size, lod_ratio):
+        path = os.path.join(output_dir, name)
+        manifest["variants"].append({
+            "file": name,
+            "bytes": write_quantized_glb(path, mesh_parts, size),
+            "texture_size": size,
+            "lod_ratio": lod_ratio,
+            "triangles": int(sum(len(p[1]) for p in mesh_parts)),
+        })
+
+    for size in sizes:
+        emit(f"result_{size}.glb", parts, size, 1.0)
+
+    for level, ratio in enumerate(sorted(lod_ratios, reverse=True), start=1):
+        lod_parts = []
+        for vertices, faces, uvs, image in parts:
+            if uvs is None:
+                uvs = np.zeros((len(vertices), 2))
+            v, f, uv = cluster_decimate(vertices, faces, uvs, ratio)
+            if len(f):
+                lod_parts.append((*reorder_for_locality(v, f, uv), image))
+        if lod_parts:
+            emit(f"result_lod{level}_{sizes[0]}.glb", lod_parts, sizes[0], ratio)
+
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
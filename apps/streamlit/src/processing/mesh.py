@@ -2,18 +2,29 @@
 Mesh processing operations.
 """
 
+import numpy as np
 import open3d as o3d
 
+# Rough peak memory of Open3D's Poisson solver per octree node, in bytes
+POISSON_BYTES_PER_NODE = 1500
+MIN_POISSON_DEPTH = 6
+MAX_POISSON_DEPTH = 13
 
-def load_rgbd_images(color_file: str, depth_file: str) -> o3d.geometry.RGBDImage:
+
+def load_rgbd_images(
+    color_file: str,
+    depth_file: str,
+    depth_scale: float = 1000.0,
+    depth_trunc: float = 5.0,
+) -> o3d.geometry.RGBDImage:
     color_raw = o3d.io.read_image(color_file)
     depth_raw = o3d.io.read_image(depth_file)
     
     rgbd_image = o3d.geometry.RGBDImage.create_from_color_and_depth(
         color_raw, 
         depth_raw, 
-        depth_scale=1000.0, 
-        depth_trunc=5.0, 
+        depth_scale=depth_scale, 
+        depth_trunc=depth_trunc, 
         convert_rgb_to_intensity=False
     )
     
@@ -21,13 +32,139 @@ def load_rgbd_images(color_file: str, depth_file: str) -> o3d.geometry.RGBDImage
 
 
 def surface_reconstruction(
-    point_cloud: o3d.geometry.PointCloud
+    point_cloud: o3d.geometry.PointCloud,
+    normal_radius: float = 0.01,
+    depth: int = 10,
+    density_quantile: float = 0.0,
 ) -> o3d.geometry.TriangleMesh:
     point_cloud.estimate_normals(
-        search_param=o3d.geometry.KDTreeSearchParamHybrid(radius=0.01, max_nn=25)
+        search_param=o3d.geometry.KDTreeSearchParamHybrid(radius=normal_radius, max_nn=25)
     )
     mesh, densities = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(
         point_cloud, 
-        depth=10
+        depth=depth
     )
+    if density_quantile > 0:
+        densities = np.asarray(densities)
+        mesh.remove_vertices_by_mask(densities < np.quantile(densities, density_quantile))
     return mesh
+
+
+def estimate_point_spacing(point_cloud: o3d.geometry.PointCloud, sample_size: int = 10000) -> float:
+    """
+    Median distance between a point and its nearest neighbour.
+
+    Measured on a random sample, so the cost is independent of cloud size
+    beyond building the KD-tree.
+    """
+    points = np.asarray(point_cloud.points)
+    if len(points) < 2:
+        raise ValueError("Point spacing needs at least two points")
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(points), min(sample_size, len(points)), replace=False)
+
+    tree = o3d.geometry.KDTreeFlann(point_cloud)
+    distances = np.empty(len(sample))
+    for i, index in enumerate(sample):
+        _, _, squared = tree.search_knn_vector_3d(points[index], 2)
+        distances[i] = np.sqrt(squared[1])
+    return float(np.median(distances))
+
+
+def choose_poisson_depth(
+    point_cloud: o3d.geometry.PointCloud,
+    spacing: float,
+    memory_budget_mb: float,
+) -> int:
+    """
+    Octree depth whose finest cells match the point spacing, within a budget.
+
+    The ideal depth makes the leaf size about equal to the point spacing.
+    Occupied cells on a surface grow about 4x per level, so the node count
+    is estimated from the number of points and the depth is lowered until
+    the estimate fits the memory budget.
+    """
+    extent = float(np.max(point_cloud.get_max_bound() - point_cloud.get_min_bound())) * 1.1
+    ideal = int(np.ceil(np.log2(max(extent / spacing, 2.0))))
+    depth = int(np.clip(ideal, MIN_POISSON_DEPTH, MAX_POISSON_DEPTH))
+
+    num_points = len(point_cloud.points)
+    budget = memory_budget_mb * 1024 * 1024
+    while depth > MIN_POISSON_DEPTH:
+        # Internal nodes add about a third on top of the leaves
+        nodes = num_points * 4.0 ** (depth - ideal) * 4 / 3
+        if nodes * POISSON_BYTES_PER_NODE <= budget:
+            break
+        depth -= 1
+    return depth
+
+
+def orient_normals_to_cameras(point_cloud: o3d.geometry.PointCloud, camera_centers: np.ndarray) -> None:
+    """Flip normals so each one faces the camera centre nearest to its point."""
+    points = np.asarray(point_cloud.points)
+    normals = np.asarray(point_cloud.normals)
+    centers = np.asarray(camera_centers, dtype=np.float64)
+    chunk = max(1, 4_000_000 // max(len(centers), 1))
+
+    for start in range(0, len(points), chunk):
+        p = points[start:start + chunk]
+        squared = ((p[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        to_camera = centers[squared.argmin(axis=1)] - p
+        flip = (normals[start:start + chunk] * to_camera).sum(axis=1) < 0
+        normals[start:start + chunk][flip] *= -1
+    point_cloud.normals = o3d.utility.Vector3dVector(normals)
+
+
+def adaptive_surface_reconstruction(
+    point_cloud: o3d.geometry.PointCloud,
+    memory_budget_mb: float = 4096,
+    density_quantile: float = 0.02,
+    camera_centers: np.ndarray = None,
+    normal_radius_factor: float = 3.0,
+    max_nn: int = 30,
+) -> tuple:
+    """
+    Poisson reconstruction with parameters derived from the data.
+
+    The normal search radius and octree depth follow the measured point
+    spacing, so the result does not depend on scene units. Normals are
+    oriented towards the nearest camera when camera centres are given, and
+    by tangent-plane propagation otherwise. Vertices whose Poisson density
+    falls below the given quantile are trimmed.
+
+    Args:
+        point_cloud: Input cloud, normals are estimated if missing
+        memory_budget_mb: Upper bound for the Poisson solver's memory use
+        density_quantile: Fraction of lowest-density vertices to remove
+        camera_centers: (M, 3) camera positions used to orient normals
+        normal_radius_factor: Normal search radius in multiples of spacing
+        max_nn: Maximum neighbours for normal estimation
+
+    Returns:
+        (mesh, info) where info records the spacing, radius and depth used
+    """
+    spacing = estimate_point_spacing(point_cloud)
+    radius = spacing * normal_radius_factor
+    depth = choose_poisson_depth(point_cloud, spacing, memory_budget_mb)
+
+    if not point_cloud.has_normals():
+        point_cloud.estimate_normals(
+            search_param=o3d.geometry.KDTreeSearchParamHybrid(radius=radius, max_nn=max_nn)
+        )
+    if camera_centers is not None and len(camera_centers):
+        orient_normals_to_cameras(point_cloud, camera_centers)
+    else:
+        point_cloud.orient_normals_consistent_tangent_plane(min(max_nn, 15))
+
+    mesh, densities = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(
+        point_cloud,
+        depth=depth,
+        scale=1.1,
+    )
+    densities = np.asarray(densities)
+    if density_quantile > 0 and len(densities):
+        mesh.remove_vertices_by_mask(densities < np.quantile(densities, density_quantile))
+        mesh.remove_unreferenced_vertices()
+
+    info = {"spacing": spacing, "normal_radius": radius, "depth": depth}
+    return mesh, info
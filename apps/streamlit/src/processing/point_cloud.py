@@ -1,5 +1,9 @@
 """
 Point cloud processing operations.
+
+The ``*_indices`` variants scale to dense clouds with tens of millions of
+points: they work on voxel-downsampled or tiled subsets and return index
+arrays into the input cloud instead of copied clouds.
 """
 
 import numpy as np
@@ -7,12 +11,12 @@ import open3d as o3d
 
 
 def filter_outliers(
-    point_cloud: o3d.geometry.PointCloud, 
-    nb_neighbors: int = 20, 
+    point_cloud: o3d.geometry.PointCloud,
+    nb_neighbors: int = 20,
     std_ratio: float = 2.0
 ) -> o3d.geometry.PointCloud:
     cl, ind = point_cloud.remove_statistical_outlier(
-        nb_neighbors=nb_neighbors, 
+        nb_neighbors=nb_neighbors,
         std_ratio=std_ratio
     )
     inlier_cloud = point_cloud.select_by_index(ind)
@@ -20,14 +24,169 @@ def filter_outliers(
 
 
 def segment_point_cloud(
-    point_cloud: o3d.geometry.PointCloud, 
-    eps: float = 0.1, 
+    point_cloud: o3d.geometry.PointCloud,
+    eps: float = 0.1,
     min_points: int = 10
 ) -> list:
     labels = np.array(point_cloud.cluster_dbscan(eps=eps, min_points=min_points))
-    max_label = labels.max()
-    segments = []
-    for i in range(max_label + 1):
-        segment = point_cloud.select_by_index(np.where(labels == i)[0])
-        segments.append(segment)
-    return segments
+    return [point_cloud.select_by_index(indices) for indices in group_indices_by_label(labels)]
+
+
+def _to_point_cloud(points: np.ndarray) -> o3d.geometry.PointCloud:
+    return o3d.geometry.PointCloud(o3d.utility.Vector3dVector(points))
+
+
+def group_indices_by_label(labels: np.ndarray) -> list:
+    """
+    Split point indices by label in a single argsort pass.
+
+    Args:
+        labels: Per-point labels, with -1 marking noise
+
+    Returns:
+        List of index arrays, one per non-negative label in ascending order
+    """
+    labels = np.asarray(labels)
+    order = np.argsort(labels, kind="stable")
+    sorted_labels = labels[order]
+    start = np.searchsorted(sorted_labels, 0)
+    order, sorted_labels = order[start:], sorted_labels[start:]
+    if len(order) == 0:
+        return []
+    boundaries = np.flatnonzero(np.diff(sorted_labels)) + 1
+    return np.split(order, boundaries)
+
+
+def voxel_downsample_with_trace(points: np.ndarray, voxel_size: float) -> tuple:
+    """
+    Downsample points to voxel centroids, keeping the point-to-voxel map.
+
+    Args:
+        points: (N, 3) array
+        voxel_size: Edge length of a voxel
+
+    Returns:
+        (centroids, inverse) where centroids is (K, 3) and inverse[i] is the
+        voxel index of point i
+    """
+    points = np.asarray(points)
+    cells = np.floor((points - points.min(axis=0)) / voxel_size).astype(np.int64)
+    dims = cells.max(axis=0) + 1
+    if np.prod(dims.astype(np.float64)) < 2 ** 62:
+        # Pack the three cell coordinates into one key for a fast 1-D unique
+        keys = cells[:, 0] + dims[0] * (cells[:, 1] + dims[1] * cells[:, 2])
+        _, inverse = np.unique(keys, return_inverse=True)
+    else:
+        _, inverse = np.unique(cells, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+
+    counts = np.bincount(inverse).astype(np.float64)
+    centroids = np.stack(
+        [np.bincount(inverse, points[:, i]) for i in range(3)], axis=1
+    ) / counts[:, None]
+    return centroids, inverse
+
+
+def segment_point_cloud_indices(
+    point_cloud: o3d.geometry.PointCloud,
+    eps: float = 0.1,
+    min_points: int = 10,
+    voxel_size: float = None,
+) -> list:
+    """
+    DBSCAN segmentation returning index arrays, optionally on a voxel grid.
+
+    With voxel_size set, DBSCAN runs on voxel centroids and the labels are
+    projected back to every original point, so cost depends on the number
+    of occupied voxels rather than the number of points. min_points then
+    counts voxels.
+
+    Returns:
+        List of index arrays into point_cloud, one per cluster
+    """
+    if voxel_size:
+        centroids, inverse = voxel_downsample_with_trace(np.asarray(point_cloud.points), voxel_size)
+        voxel_labels = np.array(_to_point_cloud(centroids).cluster_dbscan(eps=eps, min_points=min_points))
+        labels = voxel_labels[inverse]
+    else:
+        labels = np.array(point_cloud.cluster_dbscan(eps=eps, min_points=min_points))
+    return group_indices_by_label(labels)
+
+
+def auto_tile_size(points: np.ndarray, max_points_per_tile: int) -> float:
+    """XY tile edge length giving about max_points_per_tile points per tile."""
+    extent = np.ptp(np.asarray(points)[:, :2], axis=0)
+    area = max(float(extent[0] * extent[1]), 1e-12)
+    num_tiles = max(1, int(np.ceil(len(points) / max_points_per_tile)))
+    return float(np.sqrt(area / num_tiles))
+
+
+def _mean_knn_distances(search_points: np.ndarray, query_points: np.ndarray, k: int) -> np.ndarray:
+    """Mean distance from each query point to its k nearest search points."""
+    nns = o3d.core.nns.NearestNeighborSearch(o3d.core.Tensor(search_points, dtype=o3d.core.float64))
+    nns.knn_index()
+    _, squared = nns.knn_search(o3d.core.Tensor(query_points, dtype=o3d.core.float64), k)
+    return np.sqrt(squared.numpy()).mean(axis=1)
+
+
+def filter_outliers_indices(
+    point_cloud: o3d.geometry.PointCloud,
+    nb_neighbors: int = 20,
+    std_ratio: float = 2.0,
+    tile_size: float = None,
+    overlap: float = None,
+) -> np.ndarray:
+    """
+    Statistical outlier removal returning inlier indices, optionally tiled.
+
+    With tile_size set, the mean neighbour distance of every point is
+    computed tile by tile over XY tiles. Each tile's neighbour search also
+    covers a margin of surrounding points, so points near tile borders see
+    their true neighbours. The threshold is then applied over the whole
+    cloud, matching the untiled result as long as the margin exceeds the
+    neighbourhood radius, while peak memory is bounded by the tile size.
+
+    Args:
+        point_cloud: Input cloud
+        nb_neighbors: Neighbours used for the mean distance
+        std_ratio: Standard deviation multiplier of the threshold
+        tile_size: XY tile edge length, or None to process the whole cloud
+        overlap: Margin around each tile, defaults to 5% of tile_size
+
+    Returns:
+        Sorted array of inlier indices into point_cloud
+    """
+    if not tile_size:
+        _, ind = point_cloud.remove_statistical_outlier(nb_neighbors=nb_neighbors, std_ratio=std_ratio)
+        return np.sort(np.asarray(ind, dtype=np.int64))
+
+    overlap = 0.05 * tile_size if overlap is None else overlap
+    points = np.asarray(point_cloud.points)
+    origin = points[:, :2].min(axis=0)
+    tile_xy = np.floor((points[:, :2] - origin) / tile_size).astype(np.int64)
+    mean_distances = np.full(len(points), np.nan)
+
+    # Sort by x once so every tile column is a contiguous slab
+    x_order = np.argsort(points[:, 0], kind="stable")
+    sorted_x = points[x_order, 0]
+
+    for column in np.unique(tile_xy[:, 0]):
+        x0 = origin[0] + column * tile_size
+        lo, hi = np.searchsorted(sorted_x, [x0 - overlap, x0 + tile_size + overlap])
+        slab = x_order[lo:hi]
+        slab_y = points[slab, 1]
+        slab_tile = tile_xy[slab]
+
+        for row in np.unique(slab_tile[slab_tile[:, 0] == column, 1]):
+            y0 = origin[1] + row * tile_size
+            context = slab[(slab_y >= y0 - overlap) & (slab_y < y0 + tile_size + overlap)]
+            core = context[(tile_xy[context, 0] == column) & (tile_xy[context, 1] == row)]
+            k = min(nb_neighbors, len(context))
+            mean_distances[core] = _mean_knn_distances(points[context], points[core], k)
+
+    valid = ~np.isnan(mean_distances)
+    if valid.sum() < 2:
+        return np.flatnonzero(valid)
+    average = mean_distances[valid].mean()
+    std = mean_distances[valid].std(ddof=1)
+    return np.flatnonzero(valid & (mean_distances <= average + std_ratio * std))
@@ -0,0 +1,240 @@
+"""
+Delivery variants of the texture atlases written by TextureMesh.
+
+Each atlas is resized to every quality tier, a mip chain is built for each
+tier by repeated 2x box filtering, and every level is encoded in the
+configured formats. One MTL file per tier and format points the materials
+at the new images, so a client picks a tier by loading a different MTL.
+
+Atlases are processed in a process pool, one task per atlas and tier.
+Results are cached by atlas content hash: re-running after an unchanged
+texturing step, or with the same options, encodes nothing.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+TEXTURES_DIR_NAME = "textures"
+MANIFEST_NAME = "manifest.json"
+FORMAT_EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+# Mip levels stop once the shorter side would drop below this
+MIN_MIP_SIZE = 16
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def atlas_hash(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_mtl_textures(mtl_path: str) -> list:
+    """Texture files referenced by map_Kd in an MTL file, in order of first use."""
+    textures = []
+    with open(mtl_path) as f:
+        for line in f:
+            parts = line.strip().split(maxsplit=1)
+            if len(parts) == 2 and parts[0] == "map_Kd" and parts[1] not in textures:
+                textures.append(parts[1])
+    return textures
+
+
+def _mip_chain(image) -> list:
+    levels = [image]
+    while min(levels[-1].size) // 2 >= MIN_MIP_SIZE:
+        levels.append(levels[-1].reduce(2))
+    return levels
+
+
+def _encode(image, path: str, fmt: str, quality: int) -> int:
+    if fmt == "webp":
+        image.save(path, format="WEBP", quality=quality, method=4)
+    else:
+        image.save(path, format="JPEG", quality=quality, progressive=True, optimize=True)
+    return os.path.getsize(path)
+
+
+def _process_tier(atlas_path: str, output_dir: str, stem: str, tier: int, formats: tuple, quality: int) -> dict:
+    """Process pool task: resize one atlas to one tier and encode its mip chain."""
+    from PIL import Image
+
+    with Image.open(atlas_path) as source:
+        image = source.convert("RGB")
+    scale = tier / max(image.size)
+    if scale < 1.0:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.LANCZOS)
+
+    tier_dir = os.path.join(output_dir, str(tier))
+    os.makedirs(tier_dir, exist_ok=True)
+    files = {fmt: [] for fmt in formats}
+    total_bytes = 0
+    for level, mip in enumerate(_mip_chain(image)):
+        for fmt in formats:
+            name = f"{stem}_mip{level}.{FORMAT_EXTENSIONS[fmt]}"
+            total_bytes += _encode(mip, os.path.join(tier_dir, name), fmt, quality)
+            files[fmt].append(f"{tier}/{name}")
+    return {"tier": tier, "size": list(image.size), "files": files, "bytes": total_bytes}
+
+
+def _write_tier_mtl(source_mtl: str, output_dir: str, name: str, references: dict) -> None:
+    # map_Kd paths resolve against the MTL file, which lives in output_dir
+    lines = []
+    with open(source_mtl) as f:
+        for line in f:
+            parts = line.strip().split(maxsplit=1)
+            if len(parts) == 2 and parts[0] == "map_Kd" and parts[1] in references:
+                line = f"map_Kd {references[parts[1]]}\n"
+            lines.append(line)
+    with open(os.path.join(output_dir, name), "w") as f:
+        f.writelines(lines)
+
+
+def _supported_formats(formats: tuple, output_callback=None) -> tuple:
+    from PIL import features
+
+    supported = []
+    for fmt in formats:
+        if fmt == "webp" and not features.check("webp"):
+            msg = "Pillow was built without WebP support, skipping WebP textures\n"
+            print(msg)
+            if output_callback: output_callback(msg)
+            continue
+        supported.append(fmt)
+    return tuple(supported)
+
+
+def build_texture_variants(
+    mtl_path: str,
+    output_dir: str,
+    tiers: tuple = (1024, 2048, 4096),
+    formats: tuple = ("webp", "jpeg"),
+    quality: int = 85,
+    max_workers: int = None,
+    output_callback=None,
+) -> dict:
+    """
+    Write tiered, mipmapped and re-encoded copies of an MTL file's atlases.
+
+    Tiers above an atlas' own size are skipped, unless no tier fits, in
+    which case the atlas size is used. For every tier and format an MTL
+    named <mtl stem>_<tier>_<format>.mtl is written to output_dir,
+    referencing the level 0 images.
+
+    Args:
+        mtl_path: Material file written by TextureMesh, e.g. result.mtl
+        output_dir: Directory receiving the variants, MTL files and manifest
+        tiers: Maximum texture side lengths
+        formats: Encodings, any of "webp" and "jpeg" (progressive)
+        quality: Encoder quality, 1 to 100
+        max_workers: Process pool size, defaults to the CPU count
+
+    Returns:
+        The manifest dictionary
+    """
+    from PIL import Image
+
+    os.makedirs(output_dir, exist_ok=True)
+    formats = _supported_formats(formats, output_callback)
+    if not formats:
+        raise ValueError("None of the requested texture formats is supported")
+    options = {"tiers": sorted(tiers), "formats": list(formats), "quality": quality, "min_mip_size": MIN_MIP_SIZE}
+
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+    cached = previous.get("atlases", {}) if previous.get("options") == options else {}
+
+    source_dir = os.path.dirname(os.path.abspath(mtl_path))
+    manifest = {"source": os.path.basename(mtl_path), "options": options, "atlases": {}, "materials": []}
+    tasks = []
+    for texture in read_mtl_textures(mtl_path):
+        atlas_path = os.path.join(source_dir, texture)
+        if not os.path.exists(atlas_path):
+            continue
+        digest = atlas_hash(atlas_path)
+        stem = f"{os.path.splitext(os.path.basename(texture))[0]}_{digest[:12]}"
+        entry = cached.get(texture)
+        if entry and entry["hash"] == digest and all(
+            os.path.exists(os.path.join(output_dir, path))
+            for tier in entry["tiers"]
+            for paths in tier["files"].values()
+            for path in paths
+        ):
+            manifest["atlases"][texture] = entry
+            continue
+
+        with Image.open(atlas_path) as image:
+            source_size = max(image.size)
+        atlas_tiers = sorted({t for t in tiers if t <= source_size}) or [source_size]
+        manifest["atlases"][texture] = {"hash": digest, "source_size": source_size, "tiers": []}
+        tasks.extend((texture, atlas_path, stem, tier) for tier in atlas_tiers)
+
+    reused = len(manifest["atlases"]) - len({task[0] for task in tasks})
+    msg = f"{len(manifest['atlases'])} atlases, {reused} cached, {len(tasks)} tier encodes to run\n"
+    print(msg)
+    if output_callback: output_callback(msg)
+
+    if tasks:
+        workers = min(len(tasks), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(_process_tier, atlas_path, output_dir, stem, tier, formats, quality): texture
+                for texture, atlas_path, stem, tier in tasks
+            }
+            for future in as_completed(futures):
+                result = future.result()
+                manifest["atlases"][futures[future]]["tiers"].append(result)
+                msg = f"  {futures[future]} @ {result['tier']}: {result['bytes'] / 1e6:.1f} MB\n"
+                print(msg)
+                if output_callback: output_callback(msg)
+        for entry in manifest["atlases"].values():
+            entry["tiers"].sort(key=lambda tier: tier["tier"])
+
+    # Variants of atlases that changed or disappeared are no longer referenced
+    live = {
+        os.path.basename(path)
+        for entry in manifest["atlases"].values()
+        for tier in entry["tiers"]
+        for paths in tier["files"].values()
+        for path in paths
+    }
+    for tier in os.listdir(output_dir):
+        tier_dir = os.path.join(output_dir, tier)
+        if not tier.isdigit() or not os.path.isdir(tier_dir):
+            continue
+        for name in os.listdir(tier_dir):
+            if name not in live:
+                os.remove(os.path.join(tier_dir, name))
+        if not os.listdir(tier_dir):
+            shutil.rmtree(tier_dir)
+
+    mtl_stem = os.path.splitext(os.path.basename(mtl_path))[0]
+    produced = {t["tier"] for entry in manifest["atlases"].values() for t in entry["tiers"]}
+    for tier in sorted(produced & set(tiers) or produced):
+        for fmt in formats:
+            references = {}
+            for texture, entry in manifest["atlases"].items():
+                # Atlases smaller than the tier fall back to their largest level
+                candidates = [t for t in entry["tiers"] if t["tier"] <= tier] or entry["tiers"][:1]
+                references[texture] = candidates[-1]["files"][fmt][0]
+            name = f"{mtl_stem}_{tier}_{fmt}.mtl"
+            _write_tier_mtl(mtl_path, output_dir, name, references)
+            manifest["materials"].append({"file": name, "tier": tier, "format": fmt})
+
+    materials = {material["file"] for material in manifest["materials"]}
+    for name in os.listdir(output_dir):
+        if name.endswith(".mtl") and name not in materials:
+            os.remove(os.path.join(output_dir, name))
+
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
@@ -0,0 +1,246 @@
+"""
+RGB-D reconstruction by TSDF fusion.
+
+Frames are integrated one at a time into Open3D's ScalableTSDFVolume, which
+allocates 16^3 voxel blocks only where depth was observed. Memory therefore
+grows with the scanned surface area at the chosen voxel size, not with the
+number of frames or the bounding box of the scene.
+"""
+
+import os
+
+import numpy as np
+import open3d as o3d
+
+from .mesh import load_rgbd_images
+
+# Sub-folder of a dataset holding one depth image per colour image
+DEPTH_DIR_NAME = "depth"
+DEPTH_EXTENSIONS = (".png",)
+# Optional sensor calibration in Open3D's PinholeCameraIntrinsic JSON format
+INTRINSIC_FILE_NAME = "intrinsic.json"
+
+
+def find_depth_images(dataset_path: str, color_files: list) -> list:
+    """
+    Depth image for every colour image, matched by file name stem.
+
+    Raises:
+        FileNotFoundError: If the depth folder or any depth image is missing
+    """
+    depth_dir = os.path.join(dataset_path, DEPTH_DIR_NAME)
+    if not os.path.isdir(depth_dir):
+        raise FileNotFoundError(f"No '{DEPTH_DIR_NAME}' folder with depth images in {dataset_path}")
+
+    by_stem = {
+        os.path.splitext(f)[0]: os.path.join(depth_dir, f)
+        for f in os.listdir(depth_dir)
+        if f.lower().endswith(DEPTH_EXTENSIONS)
+    }
+    stems = [os.path.splitext(os.path.basename(f))[0] for f in color_files]
+    missing = [stem for stem in stems if stem not in by_stem]
+    if missing:
+        raise FileNotFoundError(f"{len(missing)} colour images have no depth image, e.g. {missing[0]}")
+    return [by_stem[stem] for stem in stems]
+
+
+def load_dataset_intrinsic(dataset_path: str):
+    """Sensor intrinsics shipped with the dataset, or None if there are none."""
+    path = os.path.join(dataset_path, INTRINSIC_FILE_NAME)
+    if not os.path.exists(path):
+        return None
+    return o3d.io.read_pinhole_camera_intrinsic(path)
+
+
+def intrinsic_from_colmap_camera(camera, width: int = None, height: int = None) -> o3d.camera.PinholeCameraIntrinsic:
+    """
+    Pinhole intrinsics of a COLMAP camera, rescaled to the depth resolution.
+
+    Lens distortion is ignored, RGB-D sensors deliver registered and
+    rectified frames.
+    """
+    width = width or camera.width
+    height = height or camera.height
+    sx = width / camera.width
+    sy = height / camera.height
+    k = np.asarray(camera.calibration_matrix())
+    return o3d.camera.PinholeCameraIntrinsic(
+        width, height, k[0, 0] * sx, k[1, 1] * sy, k[0, 2] * sx, k[1, 2] * sy
+    )
+
+
+def cam_from_world_matrix(image) -> np.ndarray:
+    """4x4 world-to-camera transform of a pycolmap image."""
+    pose = image.cam_from_world
+    if callable(pose):  # A method rather than a property since pycolmap 3.12
+        pose = pose()
+    matrix = np.eye(4)
+    matrix[:3] = np.asarray(pose.matrix())
+    return matrix
+
+
+def estimate_metric_scale(
+    reconstruction,
+    image_names: list,
+    depth_files: list,
+    depth_scale: float = 1000.0,
+    depth_trunc: float = 5.0,
+    max_images: int = 20,
+) -> float:
+    """
+    Factor converting the COLMAP model's arbitrary units to metres.
+
+    Compares the camera-space depth of triangulated points with the sensor
+    depth at their keypoints, on an evenly spaced subset of the frames, and
+    returns the median ratio.
+
+    Raises:
+        ValueError: If too few points have a valid sensor depth
+    """
+    images = {image.name: image for image in reconstruction.images.values()}
+    step = max(1, len(image_names) // max_images)
+    ratios = []
+
+    for name, depth_file in list(zip(image_names, depth_files))[::step]:
+        image = images.get(name)
+        if image is None:
+            continue
+        observed = [p for p in image.points2D if p.has_point3D()]
+        if not observed:
+            continue
+
+        depth = np.asarray(o3d.io.read_image(depth_file), dtype=np.float64) / depth_scale
+        camera = reconstruction.cameras[image.camera_id]
+        pixel_scale = np.array([depth.shape[1] / camera.width, depth.shape[0] / camera.height])
+
+        xy = np.array([p.xy for p in observed]) * pixel_scale
+        xyz = np.array([reconstruction.points3D[p.point3D_id].xyz for p in observed])
+        pose = cam_from_world_matrix(image)
+        model_depth = xyz @ pose[2, :3] + pose[2, 3]
+
+        u = np.clip(xy[:, 0].astype(np.int64), 0, depth.shape[1] - 1)
+        v = np.clip(xy[:, 1].astype(np.int64), 0, depth.shape[0] - 1)
+        sensor_depth = depth[v, u]
+        valid = (sensor_depth > 0) & (sensor_depth < depth_trunc) & (model_depth > 0)
+        ratios.append(sensor_depth[valid] / model_depth[valid])
+
+    ratios = np.concatenate(ratios) if ratios else np.empty(0)
+    if len(ratios) < 10:
+        raise ValueError("Too few sparse points with valid depth to recover the metric scale")
+    return float(np.median(ratios))
+
+
+def colmap_extrinsics(reconstruction, image_names: list, scale: float) -> list:
+    """
+    World-to-camera transforms in metres for each frame.
+
+    Frames the sparse model did not register get None and are skipped
+    during fusion.
+    """
+    images = {image.name: image for image in reconstruction.images.values()}
+    extrinsics = []
+    for name in image_names:
+        image = images.get(name)
+        if image is None:
+            extrinsics.append(None)
+            continue
+        extrinsic = cam_from_world_matrix(image)
+        extrinsic[:3, 3] *= scale
+        extrinsics.append(extrinsic)
+    return extrinsics
+
+
+def _intensity_frame(rgbd: o3d.geometry.RGBDImage, depth_trunc: float) -> o3d.geometry.RGBDImage:
+    # Odometry works on single-channel intensity, the depth is already in metres
+    return o3d.geometry.RGBDImage.create_from_color_and_depth(
+        rgbd.color, rgbd.depth, depth_scale=1.0, depth_trunc=depth_trunc, convert_rgb_to_intensity=True
+    )
+
+
+def fuse_rgbd_frames(
+    color_files: list,
+    depth_files: list,
+    intrinsic: o3d.camera.PinholeCameraIntrinsic,
+    extrinsics: list = None,
+    voxel_length: float = 0.005,
+    sdf_trunc: float = None,
+    depth_scale: float = 1000.0,
+    depth_trunc: float = 5.0,
+    output_callback=None,
+) -> tuple:
+    """
+    Integrate an RGB-D sequence into a scalable TSDF volume.
+
+    Only the current frame, and for odometry the previous one, is held in
+    memory. Without extrinsics the camera is tracked frame to frame with
+    RGB-D odometry, starting at the identity and using the previous motion
+    as the initial guess. Frames where tracking fails are skipped and the
+    next frame is tracked against the last good one.
+
+    Args:
+        color_files: Colour images in capture order
+        depth_files: Depth images aligned with color_files
+        intrinsic: Pinhole intrinsics at the depth resolution
+        extrinsics: World-to-camera 4x4 transforms, None entries are skipped;
+            omit to track with odometry
+        voxel_length: TSDF voxel edge length in metres
+        sdf_trunc: Truncation distance, defaults to four voxels
+        depth_scale: Depth image units per metre
+        depth_trunc: Depth values beyond this distance are ignored
+        output_callback: Receives progress messages
+
+    Returns:
+        (volume, info) where info counts integrated and skipped frames
+    """
+    volume = o3d.pipelines.integration.ScalableTSDFVolume(
+        voxel_length=voxel_length,
+        sdf_trunc=sdf_trunc or 4 * voxel_length,
+        color_type=o3d.pipelines.integration.TSDFVolumeColorType.RGB8,
+    )
+
+    odometry_option = o3d.pipelines.odometry.OdometryOption()
+    jacobian = o3d.pipelines.odometry.RGBDOdometryJacobianFromHybridTerm()
+    cam_to_world = np.eye(4)
+    motion = np.eye(4)
+    previous = None
+    integrated = skipped = 0
+    report_every = max(1, len(color_files) // 10)
+
+    for index, (color_file, depth_file) in enumerate(zip(color_files, depth_files)):
+        if extrinsics is not None and extrinsics[index] is None:
+            skipped += 1
+            continue
+
+        rgbd = load_rgbd_images(color_file, depth_file, depth_scale=depth_scale, depth_trunc=depth_trunc)
+
+        if extrinsics is not None:
+            extrinsic = extrinsics[index]
+        else:
+            current = _intensity_frame(rgbd, depth_trunc)
+            if previous is not None:
+                success, transform, _ = o3d.pipelines.odometry.compute_rgbd_odometry(
+                    current, previous, intrinsic, motion, jacobian, odometry_option
+                )
+                if not success:
+                    skipped += 1
+                    continue
+                motion = transform
+                cam_to_world = cam_to_world @ transform
+            previous = current
+            extrinsic = np.linalg.inv(cam_to_world)
+
+        volume.integrate(rgbd, intrinsic, extrinsic)
+        integrated += 1
+
+        if output_callback and (index + 1) % report_every == 0:
+            output_callback(f"Integrated {index + 1}/{len(color_files)} frames\n")
+
+    return volume, {"integrated": integrated, "skipped": skipped}
+
+
+def extract_tsdf_geometry(volume) -> tuple:
+    """Coloured mesh and point cloud on the zero level set of a TSDF volume."""
+    mesh = volume.extract_triangle_mesh()
+    mesh.compute_vertex_normals()
+    point_cloud = volume.extract_point_cloud()
+    return mesh, point_cloud
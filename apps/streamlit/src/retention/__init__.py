@@ -0,0 +1,29 @@
+"""Retention module for reporting and reclaiming disk used by job results."""
+
+from .policy import (
+    RetentionPolicy,
+    Artifact,
+    ARTIFACTS,
+    DEFAULT_POLICIES,
+    parse_policy,
+    resolve_policies,
+)
+from .collector import (
+    artifact_paths,
+    disk_usage,
+    find_job_dirs,
+    collect_garbage,
+)
+
+__all__ = [
+    "RetentionPolicy",
+    "Artifact",
+    "ARTIFACTS",
+    "DEFAULT_POLICIES",
+    "parse_policy",
+    "resolve_policies",
+    "artifact_paths",
+    "disk_usage",
+    "find_job_dirs",
+    "collect_garbage",
+]
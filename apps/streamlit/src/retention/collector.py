@@ -0,0 +1,151 @@
+"""
+Disk usage reporting and garbage collection of job result folders.
+
+Collection is driven by the resume journal: running jobs are never touched,
+and when intermediates of a completed job are removed the journal records
+their producing stages as collected, so a later resume with the same
+settings treats those stages as done instead of rebuilding what was
+deliberately deleted.
+"""
+
+import fnmatch
+import os
+import shutil
+import time
+
+from ..pipeline.journal import JOURNAL_FILENAME, JobJournal
+from .policy import ARTIFACTS, KEEP_ALL, KEEP_FINAL_ONLY, resolve_policies
+
+
+def _path_size(path: str) -> int:
+    if os.path.islink(path) or not os.path.isdir(path):
+        try:
+            return os.lstat(path).st_size
+        except OSError:
+            return 0
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def artifact_paths(result_path: str) -> dict:
+    """Top-level paths in a result folder grouped by artifact name."""
+    try:
+        entries = sorted(os.listdir(result_path))
+    except FileNotFoundError:
+        return {}
+    grouped = {}
+    for artifact in ARTIFACTS:
+        matches = [
+            os.path.join(result_path, entry)
+            for entry in entries
+            if any(fnmatch.fnmatch(entry, pattern) for pattern in artifact.patterns)
+        ]
+        if matches:
+            grouped[artifact.name] = matches
+    return grouped
+
+
+def disk_usage(result_path: str) -> dict:
+    """
+    Bytes used by each artifact of a job, plus unclassified files.
+
+    Returns:
+        {"artifacts": {name: bytes}, "other": bytes, "total": bytes}
+    """
+    grouped = artifact_paths(result_path)
+    usage = {name: sum(_path_size(p) for p in paths) for name, paths in grouped.items()}
+    known = {p for paths in grouped.values() for p in paths}
+    other = sum(
+        _path_size(os.path.join(result_path, entry))
+        for entry in os.listdir(result_path)
+        if os.path.join(result_path, entry) not in known
+    ) if os.path.isdir(result_path) else 0
+    return {"artifacts": usage, "other": other, "total": sum(usage.values()) + other}
+
+
+def find_job_dirs(root: str, max_depth: int = 3) -> list:
+    """Result folders below root, recognised by their resume journal."""
+    root = os.path.abspath(root)
+    base_depth = root.rstrip(os.sep).count(os.sep)
+    found = []
+    for current, dirs, files in os.walk(root):
+        if JOURNAL_FILENAME in files:
+            found.append(current)
+            dirs[:] = []
+            continue
+        if current.count(os.sep) - base_depth >= max_depth:
+            dirs[:] = []
+        dirs.sort()
+    return sorted(found)
+
+
+def is_collectable(policy, journal: JobJournal, now: float) -> bool:
+    """Whether a policy allows deletion given the job's journal."""
+    status = journal.status
+    if policy.kind == KEEP_ALL or status not in ("completed", "failed"):
+        return False
+    if policy.kind == KEEP_FINAL_ONLY:
+        return status == "completed"
+    finished_at = journal.data.get("finished_at") or 0
+    return now - finished_at >= policy.days * 86400
+
+
+def collect_garbage(
+    result_path: str,
+    policies: dict = None,
+    now: float = None,
+    dry_run: bool = False,
+    output_callback=None,
+) -> dict:
+    """
+    Delete the artifacts of one job that its retention policies allow.
+
+    Args:
+        result_path: Result folder containing the job journal
+        policies: Artifact name to policy text, merged over the defaults
+        now: Reference time, defaults to the current time
+        dry_run: Report what would be deleted without deleting it
+        output_callback: Receives a message per deleted artifact
+
+    Returns:
+        Bytes freed, or that would be freed, per artifact name
+    """
+    journal = JobJournal(result_path)
+    if not os.path.exists(journal.path):
+        return {}
+    resolved = resolve_policies(policies)
+    now = time.time() if now is None else now
+    completed = journal.status == "completed"
+
+    freed = {}
+    for artifact in ARTIFACTS:
+        paths = artifact_paths(result_path).get(artifact.name)
+        if not paths or not is_collectable(resolved[artifact.name], journal, now):
+            continue
+
+        size = sum(_path_size(p) for p in paths)
+        freed[artifact.name] = size
+        msg = f"{'Would remove' if dry_run else 'Removing'} {artifact.name} ({size / 1e6:.1f} MB) from {result_path}\n"
+        print(msg, end="")
+        if output_callback: output_callback(msg)
+        if dry_run:
+            continue
+
+        for path in paths:
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        # Only a completed job's stages may be treated as done without outputs
+        journal.mark_collected(artifact.name, size, artifact.producers if completed else ())
+
+    return freed
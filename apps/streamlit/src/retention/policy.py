@@ -0,0 +1,123 @@
+"""
+Artifact catalogue and retention policies for job result folders.
+"""
+
+from dataclasses import dataclass
+from typing import Mapping, Tuple
+
+KEEP_ALL = "keep-all"
+KEEP_FINAL_ONLY = "keep-final-only"
+KEEP_FOR_RESUME = "keep-for-resume"
+POLICY_KINDS = (KEEP_ALL, KEEP_FINAL_ONLY, KEEP_FOR_RESUME)
+
+# Resume window of "keep-for-resume" when no number of days is given
+DEFAULT_RESUME_DAYS = 7.0
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """
+    When an artifact may be deleted.
+
+    keep-all never deletes. keep-final-only deletes as soon as the job has
+    completed. keep-for-resume deletes once the job has finished, successfully
+    or not, and days have passed, so failed jobs stay resumable for a while.
+    """
+
+    kind: str
+    days: float = 0.0
+
+    def __str__(self):
+        if self.kind == KEEP_FOR_RESUME:
+            return f"{self.kind}:{self.days:g}"
+        return self.kind
+
+
+@dataclass(frozen=True)
+class Artifact:
+    """
+    A group of files in a result folder that is kept or deleted together.
+
+    Attributes:
+        name: Key used in policies and reports
+        patterns: Glob patterns relative to the result folder
+        producers: Stages whose outputs these are
+        final: Deliverable output rather than an intermediate
+    """
+
+    name: str
+    patterns: Tuple[str, ...]
+    producers: Tuple[str, ...] = ()
+    final: bool = False
+
+
+ARTIFACTS = (
+    Artifact("images_temp", ("images_temp",), ("sparse",)),
+    Artifact("database", ("database.db", "database.db-*"), ("sparse",)),
+    Artifact("sparse_model", ("sparse",), ("sparse",), final=True),
+    Artifact("preview", ("preview",), ("preview",)),
+    Artifact("undistorted_images", ("images_undistorted",), ("undistort", "convert")),
+    Artifact("roi_masks", ("masks",), ("roi",)),
+    Artifact("mvs_scenes", ("scene.mvs", "scene_dense.mvs"), ("dense",)),
+    Artifact("depth_maps", ("*.dmap",), ("dense",)),
+    Artifact("raw_meshes", ("scene_dense_mesh.ply", "scene_dense_mesh_refine.ply"), ("dense",)),
+    Artifact("dense_cloud", ("scene_dense.ply",), ("dense", "fusion"), final=True),
+    Artifact("textured_mesh", ("result.obj", "result.mtl", "result*.png", "result*.jpg"), ("dense",), final=True),
+    Artifact("texture_variants", ("textures",), ("textures",), final=True),
+    Artifact("web", ("web",), ("web_export",), final=True),
+    Artifact("logs", ("*.log",), final=True),
+    Artifact("profiles", ("profiles",), final=True),
+)
+
+ARTIFACTS_BY_NAME = {artifact.name: artifact for artifact in ARTIFACTS}
+
+# Disposable copies and bulky intermediates go first, deliverables are kept
+DEFAULT_POLICIES = {
+    "images_temp": f"{KEEP_FOR_RESUME}:{DEFAULT_RESUME_DAYS:g}",
+    "database": f"{KEEP_FOR_RESUME}:{DEFAULT_RESUME_DAYS:g}",
+    "preview": f"{KEEP_FOR_RESUME}:{DEFAULT_RESUME_DAYS:g}",
+    "undistorted_images": f"{KEEP_FOR_RESUME}:{DEFAULT_RESUME_DAYS:g}",
+    "roi_masks": f"{KEEP_FOR_RESUME}:{DEFAULT_RESUME_DAYS:g}",
+    "mvs_scenes": f"{KEEP_FOR_RESUME}:{DEFAULT_RESUME_DAYS:g}",
+    "depth_maps": KEEP_FINAL_ONLY,
+}
+
+
+def parse_policy(text: str) -> RetentionPolicy:
+    """
+    Parse "keep-all", "keep-final-only", "keep-for-resume" or "keep-for-resume:N".
+
+    Raises:
+        ValueError: If the policy is not recognised
+    """
+    kind, _, days = str(text).strip().lower().partition(":")
+    if kind not in POLICY_KINDS:
+        raise ValueError(f"Unknown retention policy '{text}', expected one of {list(POLICY_KINDS)}")
+    if kind != KEEP_FOR_RESUME:
+        if days:
+            raise ValueError(f"Retention policy '{kind}' takes no number of days")
+        return RetentionPolicy(kind)
+    try:
+        days = float(days) if days else DEFAULT_RESUME_DAYS
+    except ValueError as e:
+        raise ValueError(f"Invalid number of days in retention policy '{text}'") from e
+    if days < 0:
+        raise ValueError(f"Negative number of days in retention policy '{text}'")
+    return RetentionPolicy(kind, days)
+
+
+def resolve_policies(overrides: Mapping[str, str] = None) -> dict:
+    """
+    Policy for every artifact: keep-all, then the defaults, then overrides.
+
+    Raises:
+        ValueError: If an override names an unknown artifact or policy
+    """
+    overrides = dict(overrides or {})
+    unknown = set(overrides) - set(ARTIFACTS_BY_NAME)
+    if unknown:
+        raise ValueError(f"Unknown artifacts in retention policies: {sorted(unknown)}")
+    texts = {artifact.name: KEEP_ALL for artifact in ARTIFACTS}
+    texts.update(DEFAULT_POLICIES)
+    texts.update(overrides)
+    return {name: parse_policy(text) for name, text in texts.items()}
@@ -0,0 +1,228 @@
+import io
+import json
+import os
+import socket
+import tarfile
+import threading
+import zipfile
+from http.client import HTTPConnection
+from urllib.parse import parse_qs
+
+import pytest
+
+from apps.streamlit.src.api import ApiServer, JobManager
+from apps.streamlit.src.api.jobs import _safe_extract
+from apps.streamlit.src.api.server import _config_from_query, _parse_range
+
+
+def _query(text):
+    return parse_qs(text, keep_blank_values=True)
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=990-2000", (990, 999)),
+    ("bytes=0-1,5-6", None),
+    ("items=0-1", None),
+    ("bytes=-", None),
+])
+def test_parse_range(header, expected):
+    assert _parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=5-4", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        _parse_range(header, 1000)
+
+
+def test_query_booleans():
+    config = _config_from_query(_query("web_export=false&colmap_text_model=yes&skip_refine_mesh=0"))
+    assert config.web_export is False
+    assert config.colmap_text_model is True
+    assert config.skip_refine_mesh is False
+    assert _config_from_query(_query("skip_refine_mesh=none")).skip_refine_mesh is None
+    with pytest.raises(ValueError, match="web_export"):
+        _config_from_query(_query("web_export=maybe"))
+
+
+def test_query_numbers():
+    config = _config_from_query(_query("texture_quality=70&tsdf_voxel_length=0.01"))
+    assert config.texture_quality == 70
+    assert config.tsdf_voxel_length == 0.01
+    with pytest.raises(ValueError, match="texture_quality"):
+        _config_from_query(_query("texture_quality=high"))
+
+
+def test_query_lists():
+    config = _config_from_query(_query("web_texture_sizes=1024&texture_formats=jpeg&web_lod_ratios=0.5,0.25"))
+    assert config.web_texture_sizes == (1024,)
+    assert config.texture_formats == ("jpeg",)
+    assert config.web_lod_ratios == (0.5, 0.25)
+
+
+def test_query_strings_and_mappings():
+    config = _config_from_query(_query(
+        'quality=speed&mesher=poisson&openmvs={"TextureMesh":{"--empty-color":"0"}}'
+    ))
+    assert config.quality_profile == "SPEED"
+    assert config.mesher == "poisson"
+    assert config.openmvs_params("TextureMesh")["--empty-color"] == "0"
+
+
+def test_query_rejects_unknown_and_server_only_fields():
+    with pytest.raises(ValueError, match="bogus"):
+        _config_from_query(_query("bogus=1"))
+    with pytest.raises(ValueError, match="openmvs_bin_path"):
+        _config_from_query(_query("openmvs_bin_path=/tmp"))
+
+
+def _zip(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def test_safe_extract_zip(tmp_path):
+    archive = tmp_path / "images.zip"
+    archive.write_bytes(_zip({"set/a.jpg": b"a", "set/b.jpg": b"b"}))
+    _safe_extract(str(archive), str(tmp_path / "out"))
+    assert (tmp_path / "out" / "set" / "b.jpg").read_bytes() == b"b"
+
+
+def test_safe_extract_rejects_zip_slip(tmp_path):
+    archive = tmp_path / "evil.zip"
+    archive.write_bytes(_zip({"../escaped.jpg": b"x"}))
+    with pytest.raises(ValueError, match="escapes"):
+        _safe_extract(str(archive), str(tmp_path / "out"))
+    assert not (tmp_path / "escaped.jpg").exists()
+
+
+def test_safe_extract_rejects_tar_links(tmp_path):
+    archive = tmp_path / "links.tar"
+    with tarfile.open(archive, "w") as tar:
+        link = tarfile.TarInfo("images/link.jpg")
+        link.type = tarfile.SYMTYPE
+        link.linkname = "/etc/passwd"
+        tar.addfile(link)
+    with pytest.raises(ValueError, match="Unsupported"):
+        _safe_extract(str(archive), str(tmp_path / "out"))
+
+
+def test_safe_extract_rejects_other_files(tmp_path):
+    archive = tmp_path / "images.txt"
+    archive.write_text("not an archive")
+    with pytest.raises(ValueError, match="not a zip or tar"):
+        _safe_extract(str(archive), str(tmp_path / "out"))
+
+
+@pytest.fixture
+def api(tmp_path):
+    datasets = tmp_path / "datasets"
+    (datasets / "statue").mkdir(parents=True)
+    manager = JobManager(
+        str(tmp_path / "jobs"),
+        pipeline_fn=lambda *args, **kwargs: True,
+        datasets_root=str(datasets),
+    )
+    server = ApiServer(("127.0.0.1", 0), manager, quiet=True)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield server, datasets
+    server.shutdown()
+    server.server_close()
+    manager.shutdown()
+
+
+def _post_json(server, body):
+    connection = HTTPConnection("127.0.0.1", server.server_port, timeout=10)
+    data = json.dumps(body).encode("utf-8")
+    connection.request("POST", "/jobs", data, {"Content-Type": "application/json"})
+    response = connection.getresponse()
+    payload = json.loads(response.read())
+    connection.close()
+    return response.status, payload
+
+
+@pytest.mark.parametrize("body", [["statue"], "statue", 3, None])
+def test_post_rejects_non_object_json(api, body):
+    server, _ = api
+    status, payload = _post_json(server, body)
+    assert status == 400
+    assert "object" in payload["error"]
+
+
+def test_post_submits_dataset_inside_root(api):
+    server, datasets = api
+    status, payload = _post_json(server, {"dataset_path": "statue", "quality": "SPEED"})
+    assert status == 202
+    assert payload["quality_profile"] == "SPEED"
+    status, _ = _post_json(server, {"dataset_path": str(datasets / "statue")})
+    assert status == 202
+
+
+@pytest.mark.parametrize("dataset_path", ["..", "/etc", "statue/../.."])
+def test_post_refuses_paths_outside_root(api, dataset_path):
+    server, _ = api
+    status, _ = _post_json(server, {"dataset_path": dataset_path})
+    assert status == 403
+
+
+def test_post_refuses_server_only_fields(api):
+    server, _ = api
+    status, _ = _post_json(server, {"dataset_path": "statue", "openmvs_bin_path": "/tmp"})
+    assert status == 400
+
+
+def test_submit_path_disabled_without_root(tmp_path):
+    manager = JobManager(str(tmp_path / "jobs"), pipeline_fn=lambda *args, **kwargs: True)
+    try:
+        with pytest.raises(PermissionError):
+            manager.submit_path(str(tmp_path), None)
+    finally:
+        manager.shutdown()
+
+
+def _submitted_job(api):
+    server, _ = api
+    _, payload = _post_json(server, {"dataset_path": "statue"})
+    job = server.manager.get(payload["id"])
+    os.makedirs(job.result_path, exist_ok=True)
+    with open(os.path.join(job.result_path, "result 1.png"), "wb") as f:
+        f.write(b"png")
+    return server, job
+
+
+@pytest.mark.parametrize("path", ["/jobs", "/jobs/{id}", "/jobs/{id}/logs", "/jobs/{id}/artifacts", "/jobs/missing"])
+def test_head_sends_headers_only(api, path):
+    server, job = _submitted_job(api)
+    # A raw socket, as HTTP clients ignore whatever follows the headers of a HEAD response
+    with socket.create_connection(("127.0.0.1", server.server_port), timeout=10) as connection:
+        connection.sendall(f"HEAD {path.format(id=job.id)} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("ascii"))
+        received = b""
+        while b"\r\n\r\n" not in received:
+            received += connection.recv(4096)
+        connection.settimeout(0.2)
+        with pytest.raises(socket.timeout):
+            received += connection.recv(4096)
+    assert received.endswith(b"\r\n\r\n")
+
+
+def test_artifact_names_are_percent_decoded(api):
+    server, job = _submitted_job(api)
+    connection = HTTPConnection("127.0.0.1", server.server_port, timeout=10)
+    connection.request("GET", f"/jobs/{job.id}/artifacts/result%201.png")
+    response = connection.getresponse()
+    assert (response.status, response.read()) == (200, b"png")
+    # An encoded slash stays part of the name
+    connection.request("GET", f"/jobs/{job.id}/artifacts/..%2Fresult%201.png")
+    response = connection.getresponse()
+    response.read()
+    assert response.status == 404
+    connection.close()
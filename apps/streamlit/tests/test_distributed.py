@@ -0,0 +1,266 @@
+import os
+import sqlite3
+import sys
+import time
+
+import pytest
+
+from apps.streamlit.src.config import RunConfig, settings
+from apps.streamlit.src.distributed import LockDir, Worker
+from apps.streamlit.src.distributed.store import (
+    CANCELLED,
+    CLAIMED,
+    COMPLETED,
+    FAILED,
+    PENDING,
+    SharedJobStore,
+)
+from apps.streamlit.src.pipeline import CommandAborted, run_command
+
+BIG_NODE = {"cpu_count": 16, "ram_mb": 65536, "gpu_count": 0}
+SMALL_NODE = {"cpu_count": 4, "ram_mb": 8192, "gpu_count": 0}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SharedJobStore(str(tmp_path / "jobs.sqlite"), max_attempts=2)
+
+
+def _submit(store, tmp_path, stages=("sparse", "preview", "undistort")):
+    return store.submit(str(tmp_path / "images"), str(tmp_path / "result"), RunConfig(), list(stages))
+
+
+def _stall(store, job_id, stage):
+    with sqlite3.connect(store.db_path) as db:
+        db.execute("UPDATE tasks SET heartbeat_at = 0 WHERE job_id = ? AND stage = ?", (job_id, stage))
+
+
+def _status(store, job_id):
+    return {task["stage"]: task["status"] for task in store.tasks(job_id)}
+
+
+def test_stages_are_claimed_in_order_by_nodes_that_fit(store, tmp_path):
+    job_id = _submit(store, tmp_path)
+    # Sparse mapping needs more cores than the small node has
+    assert store.claim("small", SMALL_NODE) is None
+
+    task = store.claim("big", BIG_NODE)
+    assert (task["job_id"], task["stage"], task["attempt"], task["last"]) == (job_id, "sparse", 1, False)
+    assert store.claim("small", SMALL_NODE) is None
+
+    assert store.complete("big", job_id, "sparse")
+    task = store.claim("small", SMALL_NODE)
+    assert task["stage"] == "preview"
+    assert store.complete("small", job_id, "preview")
+    task = store.claim("small", SMALL_NODE)
+    assert task["last"]
+    assert store.complete("small", job_id, "undistort")
+
+    assert store.jobs()[0]["status"] == COMPLETED
+    assert store.unfinished_jobs() == 0
+
+
+def test_stage_filter_limits_what_a_worker_claims(store, tmp_path):
+    _submit(store, tmp_path)
+    assert store.claim("big", BIG_NODE, stages=["preview"]) is None
+    assert store.claim("big", BIG_NODE, stages=["sparse"])["stage"] == "sparse"
+
+
+def test_stalled_task_is_taken_over(store, tmp_path):
+    job_id = _submit(store, tmp_path)
+    store.register_worker("a", BIG_NODE)
+    store.claim("a", BIG_NODE)
+    assert store.heartbeat("a", job_id, "sparse")
+
+    _stall(store, job_id, "sparse")
+    task = store.claim("b", BIG_NODE)
+    assert (task["stage"], task["attempt"]) == ("sparse", 2)
+    # The first worker learns it lost the task, and its result is discarded
+    assert not store.heartbeat("a", job_id, "sparse")
+    assert not store.complete("a", job_id, "sparse")
+    assert not store.fail("a", job_id, "sparse", "late")
+    assert store.complete("b", job_id, "sparse")
+
+
+def test_stalled_task_is_requeued_with_the_reason(store, tmp_path):
+    job_id = _submit(store, tmp_path, stages=("sparse",))
+    store.claim("a", BIG_NODE)
+    _stall(store, job_id, "sparse")
+    assert store.claim("b", SMALL_NODE) is None
+
+    task = store.tasks(job_id)[0]
+    assert task["status"] == PENDING
+    assert "a stopped sending heartbeats" in task["error"]
+
+
+def test_task_fails_the_job_after_max_attempts(store, tmp_path):
+    job_id = _submit(store, tmp_path)
+    for worker in ("a", "b"):
+        store.claim(worker, BIG_NODE)
+        _stall(store, job_id, "sparse")
+    assert store.claim("c", BIG_NODE) is None
+
+    assert _status(store, job_id) == {"sparse": FAILED, "preview": CANCELLED, "undistort": CANCELLED}
+    job = store.jobs()[0]
+    assert job["status"] == FAILED
+    assert "giving up after 2 attempts" in job["error"]
+
+
+def test_failed_task_cancels_later_stages(store, tmp_path):
+    job_id = _submit(store, tmp_path)
+    store.claim("a", BIG_NODE)
+    assert store.fail("a", job_id, "sparse", "no model")
+    assert _status(store, job_id) == {"sparse": FAILED, "preview": CANCELLED, "undistort": CANCELLED}
+    assert store.jobs()[0]["error"] == "sparse: no model"
+
+
+def test_stale_workers_are_dropped(store, tmp_path):
+    store.register_worker("a", BIG_NODE)
+    with sqlite3.connect(store.db_path) as db:
+        db.execute("UPDATE workers SET heartbeat_at = 0")
+    store.claim("b", BIG_NODE)
+    assert store.workers() == []
+
+
+def test_submit_rejects_unknown_stages(store, tmp_path):
+    with pytest.raises(ValueError, match="Unknown stages"):
+        _submit(store, tmp_path, stages=("sparse", "fusion"))
+    with pytest.raises(ValueError, match="Unknown requirements"):
+        store.submit(str(tmp_path), str(tmp_path), RunConfig(), ["sparse"], {"sparse": {"cpu_count": 2}})
+
+
+def test_requirements_come_from_settings_and_submit(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DISTRIBUTED_STAGE_REQUIREMENTS", {"sparse": {"min_cpu_count": 2}})
+    job_id = store.submit(
+        str(tmp_path), str(tmp_path), RunConfig(), ["sparse", "undistort"],
+        requirements={"undistort": {"min_ram_mb": 4096}},
+    )
+    assert [task["requirements_json"] for task in store.tasks(job_id)] == [
+        '{"min_cpu_count": 2}', '{"min_ram_mb": 4096}',
+    ]
+
+    # A zero drops a default requirement
+    job_id = store.submit(str(tmp_path), str(tmp_path), RunConfig(), ["sparse"], {"sparse": {"min_cpu_count": 0}})
+    assert store.tasks(job_id)[0]["requirements_json"] == "{}"
+
+
+def test_tasks_no_live_worker_fits_are_blocked(store, tmp_path):
+    job_id = _submit(store, tmp_path)
+    store.register_worker("small", SMALL_NODE)
+    assert [(task["job_id"], task["stage"]) for task in store.blocked_tasks()] == [(job_id, "sparse")]
+
+    # A worker only running later stages does not help either
+    store.register_worker("big-preview", {**BIG_NODE, "stages": ["preview"]})
+    assert len(store.blocked_tasks()) == 1
+
+    store.register_worker("big", BIG_NODE)
+    assert store.blocked_tasks() == []
+
+
+def test_worker_exits_when_only_blocked_tasks_are_left(store, tmp_path):
+    _submit(store, tmp_path, stages=("sparse",))
+    worker = Worker(store, SMALL_NODE, stage_fn=_logging_stage(0), poll_interval=0.01)
+    assert worker.run(exit_when_drained=True) == 0
+    assert store.tasks()[0]["status"] == PENDING
+
+
+def _worker(store, stage_fn):
+    return Worker(store, BIG_NODE, stage_fn=stage_fn, heartbeat_interval=0.01)
+
+
+def _logging_stage(seconds):
+    def run(task, log_callback=None, **kwargs):
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            log_callback("working\n")
+            time.sleep(0.01)
+    return run
+
+
+def test_heartbeat_errors_are_retried(store, tmp_path, monkeypatch):
+    job_id = _submit(store, tmp_path, stages=("sparse",))
+    worker = _worker(store, _logging_stage(0.2))
+    task = store.claim(worker.worker_id, BIG_NODE)
+
+    heartbeat = store.heartbeat
+    beats = []
+
+    def flaky_heartbeat(*args):
+        beats.append(args)
+        if len(beats) == 1:
+            raise TimeoutError("Timed out waiting for lock")
+        return heartbeat(*args)
+
+    monkeypatch.setattr(store, "heartbeat", flaky_heartbeat)
+    assert worker.run_task(task)
+    assert len(beats) > 1
+    assert _status(store, job_id) == {"sparse": COMPLETED}
+
+
+def test_lost_claim_aborts_the_stage(store, tmp_path, monkeypatch):
+    _submit(store, tmp_path, stages=("sparse",))
+    worker = _worker(store, _logging_stage(30))
+    task = store.claim(worker.worker_id, BIG_NODE)
+    monkeypatch.setattr(store, "heartbeat", lambda *args: False)
+
+    start = time.monotonic()
+    assert not worker.run_task(task)
+    assert time.monotonic() - start < 10
+    # The task is left to the worker that took it over
+    assert store.tasks()[0]["status"] == CLAIMED
+
+
+def test_aborting_a_command_stops_it():
+    def abort(line):
+        if line == "started\n":
+            raise CommandAborted("stop")
+
+    start = time.monotonic()
+    with pytest.raises(CommandAborted):
+        run_command([sys.executable, "-u", "-c", "import time; print('started'); time.sleep(30)"], output_callback=abort)
+    assert time.monotonic() - start < 10
+
+
+def _age(path, seconds):
+    past = os.stat(path).st_mtime - seconds
+    os.utime(path, (past, past))
+
+
+def test_stale_lock_is_broken(tmp_path):
+    path = str(tmp_path / "jobs.lock")
+    LockDir(path).acquire()
+    _age(path, 120)
+    with LockDir(path, timeout=1):
+        assert os.path.isdir(path)
+    assert not os.path.exists(path)
+    assert not os.path.exists(path + ".break")
+
+
+def test_stale_lock_is_not_broken_while_another_process_breaks_it(tmp_path):
+    path = str(tmp_path / "jobs.lock")
+    LockDir(path).acquire()
+    _age(path, 120)
+    # Another process is breaking it, and may already have handed it to a third
+    os.mkdir(path + ".break")
+    LockDir(path)._break_if_stale()
+    assert os.path.isdir(path)
+
+    # Unless the one breaking it died
+    _age(path + ".break", 120)
+    LockDir(path)._break_if_stale()
+    LockDir(path)._break_if_stale()
+    assert not os.path.exists(path)
+
+
+def test_release_keeps_a_lock_taken_over_after_being_broken(tmp_path):
+    path = str(tmp_path / "jobs.lock")
+    first = LockDir(path)
+    first.acquire()
+    _age(path, 120)
+    second = LockDir(path, timeout=1)
+    second.acquire()
+
+    first.release()
+    assert os.path.isdir(path)
+    second.release()
+    assert not os.path.exists(path)
@@ -0,0 +1,157 @@
+import numpy as np
+import pytest
+
+from apps.streamlit.src.config import RunConfig
+from apps.streamlit.src.evaluation import pareto_front, pareto_report
+from apps.streamlit.src.evaluation import compare_point_sets, texture_coverage
+from apps.streamlit.src.evaluation.metrics import apply_transform, umeyama_similarity, voxel_downsample
+from apps.streamlit.src.evaluation.report import _empty_color, dataset_class
+
+
+def _row(profile, fscore, cost, dataset="50-200 images"):
+    return {
+        "profile": profile,
+        "dataset_class": dataset,
+        "fscore": fscore,
+        "chamfer": 1 - fscore,
+        "seconds_per_100_images": cost,
+        "peak_memory_mb": 1000.0,
+    }
+
+
+@pytest.mark.parametrize("override, expected", [
+    ("0", 0),
+    ("0x00FF7F", 0x00FF7F),
+    (16744192, 16744192),
+])
+def test_empty_color_accepts_strings_and_integers(override, expected):
+    config = RunConfig(openmvs_overrides={"TextureMesh": {"--empty-color": override}})
+    assert _empty_color(config) == expected
+
+
+def test_empty_color_without_config():
+    assert _empty_color(None) == 0
+
+
+def test_dataset_class_buckets():
+    assert dataset_class(30) == "0-50 images"
+    assert dataset_class(120, 4000, 3000) == "50-200 images, 4-12 MP"
+    assert dataset_class(5000, 8000, 6000) == ">1000 images, >12 MP"
+
+
+def test_pareto_front_drops_dominated_entries():
+    entries = [
+        {"name": "fast", "cost": 1.0, "quality": 0.6},
+        {"name": "slow-worse", "cost": 3.0, "quality": 0.5},
+        {"name": "mid", "cost": 2.0, "quality": 0.8},
+        {"name": "tie-cost-worse", "cost": 2.0, "quality": 0.7},
+        {"name": "best", "cost": 4.0, "quality": 0.9},
+    ]
+    front = pareto_front(entries, "cost", "quality")
+    assert [e["name"] for e in front] == ["fast", "mid", "best"]
+
+
+def test_pareto_report_recommends_cheapest_within_margin():
+    rows = [
+        _row("SPEED", 0.80, 100.0), _row("SPEED", 0.84, 120.0),
+        _row("BALANCED", 0.86, 300.0),
+        _row("QUALITY", 0.865, 900.0),
+        _row("SPEED", 0.5, 50.0, dataset="0-50 images"),
+    ]
+    report = pareto_report(rows, margin=0.01)
+    assert [entry["dataset_class"] for entry in report] == ["0-50 images", "50-200 images"]
+
+    entry = report[1]
+    summaries = {s["profile"]: s for s in entry["profiles"]}
+    assert summaries["SPEED"]["runs"] == 2
+    assert summaries["SPEED"]["fscore"] == pytest.approx(0.82)
+    assert summaries["SPEED"]["seconds_per_100_images"] == pytest.approx(110.0)
+    assert all(s["pareto"] for s in summaries.values())
+    assert entry["recommended"] == "BALANCED"
+    assert entry["retire"] == ["QUALITY"]
+
+
+def test_pareto_report_without_costs_has_no_recommendation():
+    report = pareto_report([_row("SPEED", 0.8, None)])
+    assert report[0]["recommended"] is None
+    assert report[0]["retire"] == []
+    assert report[0]["profiles"][0]["pareto"] is False
+
+
+def test_umeyama_similarity_recovers_a_similarity():
+    rng = np.random.default_rng(0)
+    source = rng.normal(size=(20, 3))
+    angle = 0.3
+    rotation = np.array([[np.cos(angle), -np.sin(angle), 0], [np.sin(angle), np.cos(angle), 0], [0, 0, 1]])
+    target = 2.5 * source @ rotation.T + [1.0, -2.0, 0.5]
+    transform = umeyama_similarity(source, target)
+    np.testing.assert_allclose(apply_transform(source, transform), target, atol=1e-9)
+
+
+def test_voxel_downsample_keeps_one_point_per_voxel():
+    points = np.array([[0.1, 0.1, 0.1], [0.2, 0.2, 0.2], [1.5, 0.1, 0.1]])
+    assert len(voxel_downsample(points, 1.0)) == 2
+
+
+def _grid(size):
+    axis = np.arange(size, dtype=np.float64)
+    return np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), axis=-1).reshape(-1, 3)
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1_000_000])
+def test_compare_point_sets_with_an_offset(chunk_size):
+    pytest.importorskip("scipy")
+    reference = _grid(5)
+    scores = compare_point_sets(reference + [0.1, 0, 0], reference, tolerance=0.2, chunk_size=chunk_size)
+    assert scores["accuracy"] == pytest.approx(0.1, abs=1e-6)
+    assert scores["completeness"] == pytest.approx(0.1, abs=1e-6)
+    assert scores["chamfer"] == pytest.approx(0.1, abs=1e-6)
+    assert (scores["precision"], scores["recall"], scores["fscore"]) == (1.0, 1.0, 1.0)
+
+    scores = compare_point_sets(reference + [0.1, 0, 0], reference, tolerance=0.05, chunk_size=chunk_size)
+    assert (scores["precision"], scores["recall"], scores["fscore"]) == (0.0, 0.0, 0.0)
+
+
+def test_compare_point_sets_with_a_partial_cloud():
+    pytest.importorskip("scipy")
+    reference = _grid(4)
+    # Two of the four layers, the others lie 1 and 2 away
+    points = reference[reference[:, 0] < 2]
+    scores = compare_point_sets(points, reference, tolerance=0.5, chunk_size=5)
+    assert (scores["num_points"], scores["num_reference_points"]) == (32, 64)
+    assert scores["accuracy"] == 0.0
+    assert scores["completeness"] == pytest.approx(0.75)
+    assert scores["completeness_median"] == pytest.approx(0.5)
+    assert scores["precision"] == 1.0
+    assert scores["recall"] == 0.5
+    assert scores["fscore"] == pytest.approx(2 / 3)
+
+
+def _textured_mesh(path, textured=True):
+    trimesh = pytest.importorskip("trimesh")
+    Image = pytest.importorskip("PIL.Image")
+    # Black on the left of the atlas, red on the right
+    atlas = np.zeros((4, 4, 3), dtype=np.uint8)
+    atlas[:, 2:] = [255, 0, 0]
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0], [3, 0, 0], [3, 1, 0]], dtype=np.float64)
+    # Two faces of area 0.5 on the black half, one of area 1 on the red half
+    faces = np.array([[0, 1, 2], [0, 2, 3], [1, 4, 5]])
+    uv = np.array([[0.1, 0.1], [0.2, 0.1], [0.2, 0.9], [0.1, 0.9], [0.9, 0.1], [0.9, 0.9]])
+    visual = trimesh.visual.TextureVisuals(uv=uv, image=Image.fromarray(atlas)) if textured else None
+    trimesh.Trimesh(vertices, faces, visual=visual, process=False).export(str(path))
+    return str(path)
+
+
+def test_texture_coverage_is_weighted_by_face_area(tmp_path):
+    mesh_path = _textured_mesh(tmp_path / "result.obj")
+    assert texture_coverage(mesh_path) == {
+        "texture_coverage": pytest.approx(0.5), "textured_faces": pytest.approx(1 / 3),
+    }
+    assert texture_coverage(mesh_path, empty_color=0xFF0000) == {
+        "texture_coverage": pytest.approx(0.5), "textured_faces": pytest.approx(2 / 3),
+    }
+
+
+def test_texture_coverage_of_an_untextured_mesh(tmp_path):
+    mesh_path = _textured_mesh(tmp_path / "result.obj", textured=False)
+    assert texture_coverage(mesh_path) == {"texture_coverage": 0.0, "textured_faces": 0.0}
@@ -0,0 +1,99 @@
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from apps.streamlit.src.pipeline.feature_cache import FeatureStore, options_key
+
+_COLMAP_SCHEMA = """
+CREATE TABLE images (image_id INTEGER PRIMARY KEY, name TEXT UNIQUE);
+CREATE TABLE keypoints (image_id INTEGER PRIMARY KEY, rows INTEGER, cols INTEGER, data BLOB);
+CREATE TABLE descriptors (image_id INTEGER PRIMARY KEY, rows INTEGER, cols INTEGER, data BLOB);
+CREATE TABLE matches (pair_id INTEGER PRIMARY KEY, rows INTEGER, cols INTEGER, data BLOB);
+CREATE TABLE two_view_geometries (pair_id INTEGER PRIMARY KEY, rows INTEGER, cols INTEGER, data BLOB, config INTEGER);
+"""
+NAMES = ("0000.jpg", "0001.jpg", "0002.jpg")
+HASHES = {name: f"hash{i}" for i, name in enumerate(NAMES)}
+EXTRACTION = options_key({"max_image_size": 2000, "device": "CPU"})
+SEQUENTIAL = options_key({"matcher": "sequential", "features": EXTRACTION})
+EXHAUSTIVE = options_key({"matcher": "exhaustive", "features": EXTRACTION})
+
+
+def _pair_id(image_id1, image_id2):
+    return image_id1 * 2147483647 + image_id2
+
+
+def _database(path, features=True):
+    with closing(sqlite3.connect(path)) as db:
+        db.executescript(_COLMAP_SCHEMA)
+        for image_id, name in enumerate(NAMES, start=1):
+            db.execute("INSERT INTO images VALUES (?, ?)", (image_id, name))
+            if features:
+                db.execute("INSERT INTO keypoints VALUES (?, 1, 2, ?)", (image_id, f"kp{image_id}".encode()))
+                db.execute("INSERT INTO descriptors VALUES (?, 1, 128, ?)", (image_id, f"d{image_id}".encode()))
+        db.commit()
+    return str(path)
+
+
+def _add_pair(path, image_id1, image_id2):
+    pair_id = _pair_id(image_id1, image_id2)
+    with closing(sqlite3.connect(path)) as db:
+        db.execute("INSERT INTO matches VALUES (?, 1, 2, ?)", (pair_id, b"m"))
+        db.execute("INSERT INTO two_view_geometries VALUES (?, 1, 2, ?, 2)", (pair_id, b"m"))
+        db.commit()
+
+
+def _pairs(path):
+    with closing(sqlite3.connect(path)) as db:
+        return {row[0] for row in db.execute("SELECT pair_id FROM two_view_geometries")}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FeatureStore(str(tmp_path / "cache" / "features.sqlite"))
+    yield store
+    store.close()
+
+
+def test_options_key_ignores_thread_count():
+    assert options_key({"a": 1, "num_threads": 4}) == options_key({"a": 1, "num_threads": 8})
+
+
+def test_features_round_trip_per_extraction_key(tmp_path, store):
+    source = _database(tmp_path / "source.db")
+    assert store.store_features(source, HASHES, EXTRACTION) == 3
+
+    target = _database(tmp_path / "target.db", features=False)
+    gpu_key = options_key({"max_image_size": 2000, "device": "CUDA"})
+    assert store.seed_features(target, HASHES, gpu_key) == 0
+    assert store.seed_features(target, HASHES, EXTRACTION) == 3
+    with closing(sqlite3.connect(target)) as db:
+        assert db.execute("SELECT data FROM keypoints WHERE image_id = 2").fetchone()[0] == b"kp2"
+
+
+def test_matches_round_trip(tmp_path, store):
+    source = _database(tmp_path / "source.db")
+    store.store_features(source, HASHES, EXTRACTION)
+    _add_pair(source, 1, 2)
+    assert store.store_matches(source, HASHES, EXTRACTION, SEQUENTIAL) == 1
+
+    target = _database(tmp_path / "target.db")
+    assert store.seed_matches(target, HASHES, EXTRACTION, EXHAUSTIVE) == 0
+    assert store.seed_matches(target, HASHES, EXTRACTION, SEQUENTIAL) == 1
+    assert _pairs(target) == {_pair_id(1, 2)}
+
+
+def test_fallback_matcher_only_stores_its_own_pairs(tmp_path, store):
+    database = _database(tmp_path / "job.db")
+    store.store_features(database, HASHES, EXTRACTION)
+    _add_pair(database, 1, 2)
+    store.store_matches(database, HASHES, EXTRACTION, SEQUENTIAL)
+
+    # An exhaustive fallback on the same database only adds the missing pair
+    earlier = store.matched_pairs(database)
+    _add_pair(database, 1, 3)
+    assert store.store_matches(database, HASHES, EXTRACTION, EXHAUSTIVE, skip_pairs=earlier) == 1
+
+    target = _database(tmp_path / "target.db")
+    store.seed_matches(target, HASHES, EXTRACTION, EXHAUSTIVE)
+    assert _pairs(target) == {_pair_id(1, 3)}
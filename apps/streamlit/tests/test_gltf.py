@@ -0,0 +1,46 @@
+import json
+import struct
+
+import numpy as np
+import pytest
+
+# The processing package imports Open3D on load
+pytest.importorskip("open3d")
+
+from apps.streamlit.src.processing.gltf import encode_quantized_glb, write_quantized_glb
+
+
+def _quad():
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]], dtype=np.float64)
+    faces = np.array([[0, 1, 2], [0, 2, 3]], dtype=np.int64)
+    uvs = vertices[:, :2].copy()
+    return vertices, faces, uvs
+
+
+def _gltf_json(data: bytes) -> dict:
+    magic, version, total = struct.unpack_from("<III", data)
+    assert (magic, version, total) == (0x46546C67, 2, len(data))
+    json_length, _ = struct.unpack_from("<II", data, 12)
+    return json.loads(data[20:20 + json_length])
+
+
+def test_untextured_mesh_has_no_texture_sections(tmp_path):
+    vertices, faces, _ = _quad()
+    path = tmp_path / "mesh.glb"
+    size = write_quantized_glb(str(path), [(vertices, faces, None, None)], texture_size=256)
+    data = path.read_bytes()
+    assert size == len(data)
+    gltf = _gltf_json(data)
+    assert not {"images", "samplers", "textures"} & set(gltf)
+    assert len(gltf["meshes"][0]["primitives"]) == 1
+
+
+def test_textured_mesh_keeps_its_image():
+    from PIL import Image
+
+    vertices, faces, uvs = _quad()
+    image = Image.new("RGB", (64, 64), (200, 100, 50))
+    gltf = _gltf_json(encode_quantized_glb([(vertices, faces, uvs, image)], texture_size=32))
+    assert len(gltf["images"]) == 1
+    assert len(gltf["textures"]) == 1
+    assert gltf["nodes"][0]["translation"] == [0.0, 0.0, 0.0]
@@ -0,0 +1,57 @@
+import sys
+
+import pytest
+
+from apps.streamlit.src.history import RunHistory, RunRecorder
+from apps.streamlit.src.history import store as history_store
+from apps.streamlit.src.pipeline.runner import run_command
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    history = RunHistory(str(tmp_path / "history.sqlite"))
+    run_id = history.start_run("dataset", 10, (640, 480), "BALANCED", {}, {})
+    yield RunRecorder(history, run_id)
+    history.close()
+
+
+def _fake_maxrss(monkeypatch, values):
+    values = iter(values)
+    monkeypatch.setattr(history_store, "_self_maxrss_mb", lambda: next(values))
+
+
+def _stages(recorder):
+    return recorder.history.get_run(recorder.run_id)["stages"]
+
+
+def test_in_process_peak_is_the_growth_of_the_high_water_mark(recorder, monkeypatch):
+    # A long-lived process that peaked at 4000 MB before the job started
+    _fake_maxrss(monkeypatch, [4000.0, 4250.0, 4250.0, 4250.0])
+    with recorder.stage("preview"):
+        pass
+    with recorder.stage("convert"):
+        pass
+
+    stages = _stages(recorder)
+    assert stages[0]["peak_memory_mb"] == pytest.approx(250.0)
+    assert stages[1]["peak_memory_mb"] is None
+
+
+def test_child_commands_count_with_their_own_peak(recorder, monkeypatch):
+    _fake_maxrss(monkeypatch, [4000.0, 4000.0])
+    with recorder.stage("dense"):
+        assert run_command([sys.executable, "-c", "b = bytearray(64 * 1024 * 1024)"])
+
+    assert _stages(recorder)[0]["peak_memory_mb"] > 64
+
+
+def test_failed_stage_marks_the_run_failed(recorder, monkeypatch):
+    _fake_maxrss(monkeypatch, [100.0, 100.0])
+    with pytest.raises(RuntimeError):
+        with recorder.stage("sparse"):
+            raise RuntimeError("boom")
+    recorder.finish()
+
+    run = recorder.history.get_run(recorder.run_id)
+    assert run["stages"][0]["status"] == "failed"
+    assert run["status"] == "failed"
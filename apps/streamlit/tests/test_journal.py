@@ -0,0 +1,169 @@
+import os
+
+import pytest
+
+from apps.streamlit.src.config import RunConfig
+from apps.streamlit.src.pipeline import JobJournal, run_job
+from apps.streamlit.src.pipeline.job import Stage
+
+
+class _Stages:
+    """
+    Stages writing <name>.out, counting their runs and failing on request.
+
+    Each stage reads the output of the one before it, and depends on the
+    RunConfig fields named in settings.
+    """
+
+    def __init__(self, names, settings=None):
+        settings = settings or {}
+        self.runs = {name: 0 for name in names}
+        self.fail = set()
+        self.stages = [
+            Stage(
+                name, name, self._runner(name), self._checker(name),
+                settings=self._settings(settings.get(name, ())),
+                outputs=(f"{name}.out",),
+                inputs=tuple(names[i - 1:i]),
+            )
+            for i, name in enumerate(names)
+        ]
+
+    def _runner(self, name):
+        def run(ctx):
+            self.runs[name] += 1
+            if name in self.fail:
+                raise RuntimeError(f"{name} failed")
+            open(os.path.join(ctx.result_path, f"{name}.out"), "w").close()
+        return run
+
+    def _checker(self, name):
+        return lambda ctx: os.path.exists(os.path.join(ctx.result_path, f"{name}.out"))
+
+    @staticmethod
+    def _settings(fields):
+        return lambda config: {field: getattr(config, field) for field in fields}
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = tmp_path / "images"
+    path.mkdir()
+    (path / "0001.jpg").write_bytes(b"")
+    return str(path)
+
+
+def _run(dataset, result_path, stages, config=None):
+    return run_job(dataset, str(result_path), config or RunConfig(), history_path=None, stages=stages.stages)
+
+
+def test_interrupted_job_resumes_after_the_last_completed_stage(dataset, tmp_path):
+    result = tmp_path / "result"
+    stages = _Stages(["a", "b", "c"])
+    stages.fail.add("b")
+    with pytest.raises(RuntimeError):
+        _run(dataset, result, stages)
+
+    journal = JobJournal(str(result))
+    assert journal.status == "failed"
+    assert journal.stage_status("a") == "completed"
+    assert journal.stage_status("b") is None
+    assert not journal.is_complete()
+
+    stages.fail.clear()
+    assert _run(dataset, result, stages)
+    assert stages.runs == {"a": 1, "b": 2, "c": 1}
+    journal = JobJournal(str(result))
+    assert journal.is_complete(RunConfig().fingerprint())
+    assert journal.stage_status("a") == "completed"
+    assert journal.stage_status("c") == "completed"
+
+
+def test_changed_settings_reset_the_journal(dataset, tmp_path):
+    result = tmp_path / "result"
+    _run(dataset, result, _Stages(["a"]))
+    config = RunConfig(quality_profile="SPEED")
+    assert not JobJournal(str(result)).is_complete(config.fingerprint())
+
+    journal = JobJournal(str(result))
+    journal.mark_collected("a_outputs", 10, stages=["a"])
+    journal.start(dataset, config.fingerprint())
+    assert journal.stage_status("a") is None
+    assert not journal.is_collected("a")
+    assert journal.stage_settings("a") == {}
+
+
+def test_changed_settings_rebuild_the_stage_and_those_reading_it(dataset, tmp_path):
+    result = tmp_path / "result"
+    stages = _Stages(["a", "b", "c"], {"a": ["depth_trunc"], "b": ["texture_quality"]})
+    _run(dataset, result, stages)
+
+    config = RunConfig(texture_quality=50)
+    assert _run(dataset, result, stages, config)
+    assert stages.runs == {"a": 1, "b": 2, "c": 2}
+    assert JobJournal(str(result)).is_complete(config.fingerprint())
+
+    # Settings no stage depends on only change the fingerprint
+    assert _run(dataset, result, stages, RunConfig(texture_quality=50, profiling="cpu", web_export=False))
+    assert stages.runs == {"a": 1, "b": 2, "c": 2}
+
+
+def test_dependents_stay_invalidated_when_the_rebuild_fails(dataset, tmp_path):
+    result = tmp_path / "result"
+    stages = _Stages(["a", "b", "c"], {"a": ["depth_trunc"]})
+    _run(dataset, result, stages)
+
+    stages.fail.add("a")
+    with pytest.raises(RuntimeError):
+        _run(dataset, result, stages, RunConfig(depth_trunc=2.0))
+    assert not (result / "a.out").exists()
+    assert (result / "c.out").exists()
+
+    stages.fail.clear()
+    assert _run(dataset, result, stages, RunConfig(depth_trunc=2.0))
+    assert stages.runs == {"a": 3, "b": 2, "c": 2}
+
+
+def test_outputs_of_folders_without_recorded_settings_are_kept(dataset, tmp_path):
+    result = tmp_path / "result"
+    result.mkdir()
+    (result / "a.out").write_text("")
+    journal = JobJournal(str(result))
+    journal.start(dataset, "from an older version")
+    journal.finish("completed")
+
+    stages = _Stages(["a", "b"], {"a": ["depth_trunc"]})
+    assert _run(dataset, result, stages)
+    assert stages.runs == {"a": 0, "b": 1}
+    assert JobJournal(str(result)).stage_settings("a") == {"depth_trunc": 5.0}
+
+
+def test_outputs_a_stage_did_not_write_are_rebuilt(dataset, tmp_path):
+    result = tmp_path / "result"
+    _run(dataset, result, _Stages(["a"]))
+    # Written by a stage of another pipeline, e.g. scene_dense.ply by dense then fusion
+    (result / "b.out").write_text("")
+
+    stages = _Stages(["a", "b"])
+    assert _run(dataset, result, stages)
+    assert stages.runs == {"a": 0, "b": 1}
+
+
+def test_collected_stages_are_skipped_on_resume(dataset, tmp_path):
+    result = tmp_path / "result"
+    stages = _Stages(["a", "b"])
+    _run(dataset, result, stages)
+    os.remove(result / "a.out")
+    JobJournal(str(result)).mark_collected("a_outputs", 10, stages=["a"])
+
+    assert _run(dataset, result, stages)
+    assert stages.runs == {"a": 1, "b": 1}
+    assert JobJournal(str(result)).stage_status("a") == "completed"
+
+
+def test_unreadable_journal_starts_over(tmp_path):
+    (tmp_path / "job.json").write_text("{not json")
+    journal = JobJournal(str(tmp_path))
+    assert journal.data == {}
+    journal.start("dataset", "abc")
+    assert JobJournal(str(tmp_path)).data["fingerprint"] == "abc"
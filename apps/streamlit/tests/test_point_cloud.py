@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+o3d = pytest.importorskip("open3d")
+
+from apps.streamlit.src.processing import (
+    filter_outliers,
+    filter_outliers_indices,
+    group_indices_by_label,
+    segment_point_cloud_indices,
+    voxel_downsample_with_trace,
+)
+
+
+def _cloud(points):
+    return o3d.geometry.PointCloud(o3d.utility.Vector3dVector(points))
+
+
+def _blobs():
+    rng = np.random.default_rng(0)
+    return np.vstack([
+        rng.normal(0.0, 0.1, (2000, 3)),
+        rng.normal(5.0, 0.1, (2000, 3)),
+    ])
+
+
+def test_group_indices_by_label_skips_noise():
+    groups = group_indices_by_label(np.array([1, -1, 0, 1, 0, -1]))
+    assert [g.tolist() for g in groups] == [[2, 4], [0, 3]]
+    assert group_indices_by_label(np.array([-1, -1])) == []
+
+
+def test_voxel_downsample_with_trace_maps_every_point():
+    points = np.array([[0.1, 0.1, 0.1], [0.2, 0.2, 0.2], [1.5, 0.1, 0.1]])
+    centroids, inverse = voxel_downsample_with_trace(points, 1.0)
+    assert len(centroids) == 2
+    np.testing.assert_allclose(centroids[inverse[0]], [0.15, 0.15, 0.15])
+    assert inverse[0] == inverse[1] != inverse[2]
+
+
+def test_filter_outliers_indices_matches_the_copying_variant():
+    rng = np.random.default_rng(1)
+    points = np.vstack([_blobs(), rng.uniform(-20, 20, (50, 3))])
+    cloud = _cloud(points)
+    indices = filter_outliers_indices(cloud)
+    np.testing.assert_allclose(np.asarray(filter_outliers(cloud).points), points[indices])
+
+
+def test_tiled_filter_agrees_with_untiled():
+    rng = np.random.default_rng(2)
+    points = np.column_stack([rng.uniform(0, 10, 20000), rng.uniform(0, 10, 20000), rng.normal(0, 0.01, 20000)])
+    points = np.vstack([points, [[5.0, 5.0, 3.0], [2.0, 8.0, -3.0]]])
+    cloud = _cloud(points)
+    untiled = set(filter_outliers_indices(cloud).tolist())
+    tiled = set(filter_outliers_indices(cloud, tile_size=2.5).tolist())
+    assert len(untiled ^ tiled) <= len(points) * 0.001
+    assert len(points) - 1 not in tiled
+
+
+@pytest.mark.parametrize("voxel_size", [None, 0.05])
+def test_segment_point_cloud_indices_finds_both_blobs(voxel_size):
+    clusters = segment_point_cloud_indices(_cloud(_blobs()), eps=0.5, min_points=10, voxel_size=voxel_size)
+    assert sorted(len(c) for c in clusters) == [2000, 2000]
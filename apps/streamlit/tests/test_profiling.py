@@ -0,0 +1,84 @@
+import json
+import os
+import threading
+
+from apps.streamlit.src.pipeline.profiling import Profiler, read_profiles
+
+
+def _work(n=20000):
+    return sum(i * i for i in range(n))
+
+
+def test_section_saves_stats_and_callback_timings(tmp_path):
+    messages = []
+    profiler = Profiler(str(tmp_path), output_callback=messages.append)
+    log = profiler.wrap_callback("log", lambda msg: None)
+    with profiler.section("sparse"):
+        _work()
+        for _ in range(3):
+            log("line")
+
+    assert os.path.exists(tmp_path / "sparse.prof")
+    summary = json.loads((tmp_path / "sparse.json").read_text())
+    assert summary["name"] == "sparse"
+    assert summary["callbacks"]["log"]["calls"] == 3
+    assert summary["python_s"] > 0
+    assert "memory" not in summary
+    assert messages[-1].startswith("Profile of sparse")
+
+
+def test_memory_mode_records_allocations(tmp_path):
+    profiler = Profiler(str(tmp_path), memory=True)
+    with profiler.section("dense"):
+        data = [bytearray(1000) for _ in range(1000)]
+    del data
+    summary = json.loads((tmp_path / "dense.json").read_text())
+    assert summary["memory"]["peak_mb"] >= 1.0
+
+
+def test_nested_section_is_skipped(tmp_path):
+    messages = []
+    outer = Profiler(str(tmp_path / "outer"))
+    inner = Profiler(str(tmp_path / "inner"), output_callback=messages.append)
+    with outer.section("job"):
+        with inner.section("viewer"):
+            _work()
+    assert os.path.exists(tmp_path / "outer" / "job.json")
+    assert not os.path.exists(tmp_path / "inner")
+    assert "job is already being profiled" in messages[0]
+
+    # Once the outer section ends, profiling is available again
+    with inner.section("viewer"):
+        _work()
+    assert os.path.exists(tmp_path / "inner" / "viewer.json")
+
+
+def test_concurrent_sections_do_not_overlap(tmp_path):
+    started, release = threading.Event(), threading.Event()
+    first = Profiler(str(tmp_path / "first"))
+
+    def run_first():
+        with first.section("first"):
+            started.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=run_first)
+    thread.start()
+    started.wait(5)
+    messages = []
+    with Profiler(str(tmp_path / "second"), output_callback=messages.append).section("second"):
+        pass
+    release.set()
+    thread.join()
+    assert messages and "skipped" in messages[0]
+    assert os.path.exists(tmp_path / "first" / "first.json")
+
+
+def test_read_profiles_in_completion_order(tmp_path):
+    profiler = Profiler(os.path.join(tmp_path, "profiles"))
+    for name in ("sparse", "dense"):
+        with profiler.section(name):
+            _work(1000)
+    os.utime(tmp_path / "profiles" / "sparse.json", (1, 1))
+    assert [p["name"] for p in read_profiles(str(tmp_path))] == ["sparse", "dense"]
+    assert read_profiles(str(tmp_path / "missing")) == []
@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+from apps.streamlit.src.pipeline import JobJournal
+from apps.streamlit.src.retention import collect_garbage, disk_usage, find_job_dirs, parse_policy
+
+DAY = 86400
+
+
+def _job(path, status, finished_at=1000.0):
+    path.mkdir(parents=True)
+    (path / "database.db").write_bytes(b"x" * 100)
+    (path / "0001.dmap").write_bytes(b"x" * 50)
+    (path / "result.obj").write_bytes(b"x" * 10)
+    (path / "images_undistorted").mkdir()
+    (path / "images_undistorted" / "0001.jpg").write_bytes(b"x" * 20)
+    journal = JobJournal(str(path))
+    journal.start("dataset", "abc")
+    journal.finish(status)
+    journal.data["finished_at"] = finished_at
+    journal.save()
+    return path
+
+
+def test_completed_job_loses_depth_maps_then_resume_data(tmp_path):
+    job = _job(tmp_path / "job", "completed")
+
+    freed = collect_garbage(str(job), now=1000.0 + DAY)
+    assert freed == {"depth_maps": 50}
+    assert not (job / "0001.dmap").exists()
+    assert (job / "database.db").exists()
+
+    freed = collect_garbage(str(job), now=1000.0 + 8 * DAY)
+    assert freed == {"database": 100, "undistorted_images": 20}
+    assert not (job / "images_undistorted").exists()
+    assert (job / "result.obj").exists()
+
+    journal = JobJournal(str(job))
+    assert journal.is_collected("dense")
+    assert journal.is_collected("sparse")
+    assert journal.is_collected("undistort")
+    assert journal.data["collected"]["artifacts"]["database"]["freed_bytes"] == 100
+
+
+def test_failed_job_keeps_resume_data_without_marking_stages(tmp_path):
+    job = _job(tmp_path / "job", "failed")
+    assert collect_garbage(str(job), now=1000.0 + DAY) == {}
+
+    freed = collect_garbage(str(job), now=1000.0 + 8 * DAY)
+    assert set(freed) == {"database", "undistorted_images"}
+    # keep-final-only artifacts stay until the job succeeds
+    assert (job / "0001.dmap").exists()
+    assert not JobJournal(str(job)).is_collected("sparse")
+
+
+def test_running_job_and_dry_run_delete_nothing(tmp_path):
+    running = _job(tmp_path / "running", "completed")
+    JobJournal(str(running)).start("dataset", "abc")
+    assert collect_garbage(str(running), now=time.time() + 30 * DAY) == {}
+
+    done = _job(tmp_path / "done", "completed")
+    freed = collect_garbage(str(done), {"textured_mesh": "keep-final-only"}, now=1000.0 + DAY, dry_run=True)
+    assert freed == {"depth_maps": 50, "textured_mesh": 10}
+    assert (done / "0001.dmap").exists()
+    assert (done / "result.obj").exists()
+    assert not JobJournal(str(done)).is_collected("dense")
+
+
+def test_overrides_replace_the_defaults(tmp_path):
+    job = _job(tmp_path / "job", "completed")
+    freed = collect_garbage(str(job), {"depth_maps": "keep-all", "database": "keep-for-resume:0"}, now=1000.0)
+    assert freed == {"database": 100}
+
+    with pytest.raises(ValueError, match="Unknown artifacts"):
+        collect_garbage(str(job), {"everything": "keep-all"})
+
+
+def test_folders_without_journal_are_left_alone(tmp_path):
+    (tmp_path / "loose").mkdir()
+    (tmp_path / "loose" / "0001.dmap").write_bytes(b"x")
+    assert collect_garbage(str(tmp_path / "loose")) == {}
+    assert (tmp_path / "loose" / "0001.dmap").exists()
+
+    _job(tmp_path / "a" / "job", "completed")
+    assert find_job_dirs(str(tmp_path)) == [str(tmp_path / "a" / "job")]
+
+
+def test_disk_usage_groups_files_by_artifact(tmp_path):
+    job = _job(tmp_path / "job", "completed")
+    usage = disk_usage(str(job))
+    assert usage["artifacts"] == {
+        "database": 100, "undistorted_images": 20, "depth_maps": 50, "textured_mesh": 10,
+    }
+    assert usage["total"] == 180 + usage["other"]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("keep-all", "keep-all"),
+    ("KEEP-FOR-RESUME", "keep-for-resume:7"),
+    ("keep-for-resume:2.5", "keep-for-resume:2.5"),
+])
+def test_parse_policy(text, expected):
+    assert str(parse_policy(text)) == expected
+
+
+@pytest.mark.parametrize("text", ["keep-some", "keep-all:3", "keep-for-resume:x", "keep-for-resume:-1"])
+def test_parse_policy_rejects_invalid_text(text):
+    with pytest.raises(ValueError):
+        parse_policy(text)
@@ -0,0 +1,133 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from apps.streamlit.src.config import RunConfig
+from apps.streamlit.src.pipeline import job
+from apps.streamlit.src.pipeline.roi import roi_from_box, same_box, write_roi
+
+BOX = {"center": [0, 0, 0], "extent": [1, 1, 1]}
+OTHER_BOX = {"center": [0, 0, 0], "extent": [2, 2, 2]}
+
+
+@pytest.fixture
+def openmvs_calls(monkeypatch):
+    calls = []
+
+    def fake_pipeline(sparse_model_path, image_dir, output_dir, config, output_callback=None, mask_dir=None, roi=None):
+        calls.append({"mask_dir": mask_dir, "roi": roi})
+        for name in ("scene_dense.mvs", "scene_dense.ply", "result.obj"):
+            if not os.path.exists(os.path.join(output_dir, name)):
+                open(os.path.join(output_dir, name), "w").close()
+        return True
+
+    monkeypatch.setattr(job, "run_openmvs_pipeline", fake_pipeline)
+    return calls
+
+
+def _dense_roi(result_path):
+    with open(os.path.join(result_path, job.DENSE_METADATA_NAME)) as f:
+        return json.load(f)["roi"]
+
+
+def _dense_stage():
+    return next(stage for stage in job.PIPELINE_STAGES if stage.name == "dense")
+
+
+def _context(result_path, **config):
+    return job.JobContext("dataset", str(result_path), RunConfig(**config), [])
+
+
+def _run_with_box(result_path, box, **config):
+    write_roi(str(result_path), roi_from_box(box))
+    ctx = _context(result_path, roi="manual", roi_box=box, **config)
+    _dense_stage().run(ctx)
+    return ctx
+
+
+def test_dense_outputs_follow_the_box(tmp_path, openmvs_calls):
+    stage = _dense_stage()
+    ctx = _run_with_box(tmp_path, BOX)
+    assert openmvs_calls[-1]["roi"] is not None
+    assert same_box(_dense_roi(tmp_path), roi_from_box(BOX))
+    assert stage.is_done(ctx)
+
+    write_roi(str(tmp_path), roi_from_box(OTHER_BOX))
+    ctx = _context(tmp_path, roi="manual", roi_box=OTHER_BOX)
+    assert not stage.is_done(ctx)
+    stage.run(ctx)
+    assert same_box(openmvs_calls[-1]["roi"], roi_from_box(OTHER_BOX))
+    assert stage.is_done(ctx)
+
+
+def test_turning_the_roi_off_invalidates_cropped_outputs(tmp_path, openmvs_calls):
+    stage = _dense_stage()
+    _run_with_box(tmp_path, BOX)
+    (tmp_path / "stale.dmap").write_text("")
+
+    ctx = _context(tmp_path, roi="off")
+    assert not stage.is_done(ctx)
+    stage.run(ctx)
+    assert not (tmp_path / "stale.dmap").exists()
+    assert openmvs_calls[-1] == {"mask_dir": None, "roi": None}
+    assert _dense_roi(tmp_path) is None
+    assert stage.is_done(ctx)
+
+
+def test_whole_scene_outputs_are_not_reused_for_a_box(tmp_path, openmvs_calls):
+    # Outputs of a run before ROIs existed have no record of their box
+    (tmp_path / "result.obj").write_text("")
+    (tmp_path / "scene_dense.mvs").write_text("")
+    write_roi(str(tmp_path), roi_from_box(BOX, source="auto"))
+
+    assert _dense_stage().is_done(_context(tmp_path, roi="off"))
+    ctx = _context(tmp_path, roi="auto")
+    assert not _dense_stage().is_done(ctx)
+    _dense_stage().run(ctx)
+    assert same_box(openmvs_calls[-1]["roi"], roi_from_box(BOX))
+
+
+def test_auto_roi_without_an_object_keeps_whole_scene_outputs(tmp_path, openmvs_calls):
+    (tmp_path / "result.obj").write_text("")
+    write_roi(str(tmp_path), {"source": "auto", "center": None})
+    assert _dense_stage().is_done(_context(tmp_path, roi="auto"))
+
+
+@pytest.mark.parametrize("before, after", [
+    ({}, {"mesher": "poisson"}),
+    ({"mesher": "poisson"}, {}),
+    ({"mesher": "poisson"}, {"mesher": "poisson", "poisson_memory_budget_mb": 1024}),
+    ({}, {"openmvs_overrides": {"ReconstructMesh": {"--decimate": "0.5"}}}),
+    ({}, {"skip_refine_mesh": False}),
+])
+def test_changed_dense_settings_invalidate_dense_outputs(tmp_path, openmvs_calls, before, after):
+    stage = _dense_stage()
+    stage.run(_context(tmp_path, roi="off", **before))
+    (tmp_path / "scene_dense_mesh.ply").write_text("")
+    assert stage.is_done(_context(tmp_path, roi="off", **before))
+
+    ctx = _context(tmp_path, roi="off", **after)
+    assert not stage.is_done(ctx)
+    stage.run(ctx)
+    assert not (tmp_path / "scene_dense_mesh.ply").exists()
+    assert stage.is_done(ctx)
+
+
+def test_outputs_without_recorded_settings_are_kept(tmp_path, openmvs_calls):
+    (tmp_path / "result.obj").write_text("")
+    assert _dense_stage().is_done(_context(tmp_path, roi="off", mesher="poisson"))
+
+
+def test_crop_to_roi_keeps_points_inside_the_box():
+    o3d = pytest.importorskip("open3d")
+    from apps.streamlit.src.pipeline.roi import crop_to_roi
+
+    points = np.array([[0, 0, 0], [0.4, 0, 0], [0.6, 0, 0], [0, 0.6, 0]], dtype=np.float64)
+    cloud = o3d.geometry.PointCloud(o3d.utility.Vector3dVector(points))
+    # Rotated a quarter turn about z, so the long axis lies along y
+    rotation = [[0, -1, 0], [1, 0, 0], [0, 0, 1]]
+    roi = roi_from_box({"center": [0, 0, 0], "extent": [1.4, 1, 1], "rotation": rotation})
+    cropped = np.asarray(crop_to_roi(cloud, roi).points)
+    assert sorted(map(tuple, cropped)) == [(0, 0, 0), (0, 0.6, 0), (0.4, 0, 0)]
@@ -0,0 +1,126 @@
+import json
+import pickle
+import sys
+
+import pytest
+
+from apps.streamlit.src.config import RunConfig
+
+
+def test_defaults_are_valid():
+    config = RunConfig()
+    assert config.quality_profile == "BALANCED"
+    assert config.web_texture_sizes == (1024, 2048, 4096)
+
+
+@pytest.mark.parametrize("field_name, value", [
+    ("web_texture_sizes", "2048"),
+    ("texture_formats", "webp"),
+    ("web_lod_ratios", 0.5),
+    ("web_export", "false"),
+    ("colmap_text_model", 1),
+    ("skip_refine_mesh", "yes"),
+    ("texture_quality", 85.5),
+    ("texture_quality", True),
+    ("tsdf_voxel_length", "0.01"),
+    ("feature_cache_path", 3),
+    ("retention", ["keep-all"]),
+])
+def test_wrong_field_types_are_rejected(field_name, value):
+    with pytest.raises(ValueError, match=field_name):
+        RunConfig(**{field_name: value})
+
+
+def test_lists_and_numbers_are_accepted():
+    config = RunConfig.from_dict({
+        "web_texture_sizes": [512],
+        "texture_formats": ["jpeg"],
+        "web_lod_ratios": [1, 0.25],
+        "tsdf_voxel_length": 1,
+        "skip_refine_mesh": None,
+    })
+    assert config.web_texture_sizes == (512,)
+    assert config.texture_formats == ("jpeg",)
+    assert config.web_lod_ratios == (1.0, 0.25)
+
+
+@pytest.mark.parametrize("data", [
+    {"quality_profile": "ULTRA"},
+    {"device": "TPU"},
+    {"mesher": "marching-cubes"},
+    {"texture_formats": ["gif"]},
+    {"texture_quality": 0},
+    {"roi": "manual"},
+    {"profiling": "gpu"},
+    {"retention": {"depth_maps": "keep-sometimes"}},
+    {"unknown_key": 1},
+])
+def test_invalid_values_are_rejected(data):
+    with pytest.raises(ValueError):
+        RunConfig.from_dict(data)
+
+
+def test_from_dict_aliases():
+    config = RunConfig.from_dict({
+        "quality": "speed",
+        "openmvs": {"DensifyPointCloud": {"--resolution-level": "2"}},
+        "colmap": {"feature_extraction": {"max_image_size": 1600}},
+    })
+    assert config.quality_profile == "SPEED"
+    assert config.openmvs_params("DensifyPointCloud")["--resolution-level"] == "2"
+    assert config.colmap_params("feature_extraction")["max_image_size"] == 1600
+
+
+def test_config_is_immutable():
+    config = RunConfig(openmvs_overrides={"TextureMesh": {"--empty-color": "0"}})
+    with pytest.raises(AttributeError):
+        config.device = "CPU"
+    with pytest.raises(TypeError):
+        config.openmvs_overrides["TextureMesh"] = {}
+
+
+def test_fingerprint_ignores_settings_that_do_not_change_outputs():
+    base = RunConfig()
+    other = RunConfig(
+        openmvs_bin_path="/opt/openmvs",
+        feature_cache_path=None,
+        retention={"depth_maps": "keep-all"},
+        profiling="cpu",
+    )
+    assert base.fingerprint() == other.fingerprint()
+    assert base.fingerprint() != RunConfig(mesher="poisson").fingerprint()
+    assert "openmvs_bin_path" not in json.loads(base.fingerprint())
+
+
+def test_fingerprint_round_trips_through_from_dict():
+    config = RunConfig(quality_profile="QUALITY", web_lod_ratios=(0.5,), roi="off")
+    assert RunConfig.from_dict(json.loads(config.fingerprint())).fingerprint() == config.fingerprint()
+
+
+def test_with_overrides_merges_mappings():
+    config = RunConfig(openmvs_overrides={"DensifyPointCloud": {"--resolution-level": "2"}})
+    changed = config.with_overrides(
+        openmvs_overrides={"DensifyPointCloud": {"--number-views": "4"}},
+        mesher="poisson",
+    )
+    assert dict(changed.openmvs_overrides["DensifyPointCloud"]) == {
+        "--resolution-level": "2", "--number-views": "4",
+    }
+    assert changed.mesher == "poisson"
+    assert config.mesher == "openmvs"
+
+
+def test_pickle_round_trip():
+    config = RunConfig(colmap_overrides={"matching": {"overlap": 5}}, roi_box={})
+    restored = pickle.loads(pickle.dumps(config))
+    assert restored == config
+    assert restored.fingerprint() == config.fingerprint()
+
+
+def test_from_settings_does_not_need_pycolmap(monkeypatch):
+    from apps.streamlit.src.config import settings
+
+    # A None entry makes any import of the module fail, as on hosts without it
+    monkeypatch.setitem(sys.modules, "pycolmap", None)
+    monkeypatch.setattr(settings, "COLMAP_DEVICE_NAME", "cuda")
+    assert RunConfig.from_settings().device == "CUDA"
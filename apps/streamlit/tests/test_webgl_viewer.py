@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("streamlit")
+trimesh = pytest.importorskip("trimesh")
+
+from apps.streamlit.src.app.components import webgl_viewer
+
+
+@pytest.fixture
+def levels_dir(tmp_path, monkeypatch):
+    path = tmp_path / "levels"
+    monkeypatch.setattr(webgl_viewer, "LEVELS_DIR", str(path))
+    return path
+
+
+def _write_cloud(path, count):
+    points = np.random.default_rng(0).normal(size=(count, 3)) + 1000.0
+    trimesh.points.PointCloud(points).export(str(path))
+    return str(path)
+
+
+def test_point_cloud_levels_are_published_as_files(tmp_path, levels_dir, monkeypatch):
+    monkeypatch.setattr(webgl_viewer, "POINT_LOD_BASE", 100)
+    ply = _write_cloud(tmp_path / "cloud.ply", 1000)
+    index = webgl_viewer.point_cloud_levels(ply, os.path.getmtime(ply))
+
+    assert index["total"] == 1000
+    assert [level["points"] for level in index["levels"]] == [100, 300, 600]
+    dataset_dir = levels_dir / index["key"]
+    positions = np.fromfile(dataset_dir / index["levels"][1]["positions"], dtype=np.float32)
+    colors = np.fromfile(dataset_dir / index["levels"][1]["colors"], dtype=np.uint8)
+    assert positions.shape == (900,)
+    assert colors.shape == (900,)
+    # Centred before the float32 conversion
+    assert np.abs(positions).max() < 10
+
+    # Published levels are reused rather than encoded again
+    monkeypatch.setattr(trimesh, "load", None)
+    assert webgl_viewer.point_cloud_levels(ply, os.path.getmtime(ply)) == index
+
+
+def test_component_args_only_name_the_level_files(tmp_path, levels_dir, monkeypatch):
+    monkeypatch.setattr(webgl_viewer, "POINT_LOD_BASE", 10)
+    ply = _write_cloud(tmp_path / "cloud.ply", 5000)
+    index = webgl_viewer.point_cloud_levels(ply, os.path.getmtime(ply))
+    base = webgl_viewer._levels_base(index)
+    component_args = repr({"levels": index["levels"], "base": base})
+    assert len(component_args) < 2000
+    # Fetched from the levels folder's own component URL, next to the viewer's
+    assert base == f"../{webgl_viewer._levels_component.name}/{index['key']}"
+    assert base.endswith(f"webgl_viewer_levels/{index['key']}")
+
+
+def test_old_datasets_are_pruned(tmp_path, levels_dir, monkeypatch):
+    monkeypatch.setattr(webgl_viewer, "MAX_PUBLISHED_DATASETS", 2)
+    ply = _write_cloud(tmp_path / "cloud.ply", 200)
+    keys = []
+    for max_points in (50, 100, 150):
+        keys.append(webgl_viewer.point_cloud_levels(ply, os.path.getmtime(ply), max_points)["key"])
+        os.utime(levels_dir / keys[-1], (len(keys), len(keys)))
+    assert sorted(os.listdir(levels_dir)) == sorted(keys[1:])
+
+
+def test_non_point_cloud_gives_none(tmp_path, levels_dir):
+    path = tmp_path / "mesh.ply"
+    trimesh.creation.box().export(str(path))
+    assert webgl_viewer.point_cloud_levels(str(path), os.path.getmtime(path)) is None
+
+
+def test_mesh_levels_are_published_as_glb_files(tmp_path, levels_dir):
+    pytest.importorskip("open3d")
+    path = tmp_path / "mesh.ply"
+    trimesh.creation.icosphere(3).export(str(path))
+    index = webgl_viewer.mesh_levels(str(path), os.path.getmtime(path))
+    assert len(index["levels"]) == 1
+    data = (levels_dir / index["key"] / index["levels"][0]["file"]).read_bytes()
+    assert data[:4] == b"glTF"
+    assert len(data) == index["levels"][0]["bytes"]
@@ -0,0 +1,122 @@
+"""
+Copy the three.js modules the WebGL viewer imports into its frontend folder.
+
+The viewer loads three.js from frontend/webgl_viewer/vendor rather than a
+CDN, so it works offline and always runs the version it was written for.
+The script downloads the pinned npm package once, checks it against the
+registry's integrity hash and extracts the core module, the addons the
+viewer imports with everything they import in turn, and the license.
+
+Usage:
+    python apps/streamlit/vendor_threejs.py
+    python apps/streamlit/vendor_threejs.py --tarball three-0.160.0.tgz
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+import sys
+import tarfile
+import tempfile
+import urllib.request
+
+THREE_VERSION = "0.160.0"
+REGISTRY_URL = f"https://registry.npmjs.org/three/{THREE_VERSION}"
+# Imported by frontend/webgl_viewer/index.html, relative to examples/jsm
+ADDONS = ("controls/OrbitControls.js", "loaders/GLTFLoader.js")
+CORE_FILES = ("build/three.module.js", "LICENSE")
+
+VENDOR_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "src", "app", "components", "frontend", "webgl_viewer", "vendor", "three"
+)
+
+_IMPORT_RE = re.compile(r"""(?:\bfrom|^\s*import)\s*['"]([^'"]+)['"]""", re.MULTILINE)
+
+
+def _download(url: str) -> bytes:
+    with urllib.request.urlopen(url, timeout=60) as response:
+        return response.read()
+
+
+def _check_integrity(data: bytes, integrity: str) -> None:
+    """Compare a tarball with an npm "sha512-<base64>" integrity string."""
+    algorithm, _, expected = integrity.partition("-")
+    digest = base64.b64encode(hashlib.new(algorithm, data).digest()).decode("ascii")
+    if digest != expected:
+        raise SystemExit(f"three {THREE_VERSION} does not match the registry's {algorithm} hash")
+
+
+def _addon_files(read) -> list:
+    """Addon paths below examples/jsm, with the relative modules they import."""
+    found, queue = [], list(ADDONS)
+    while queue:
+        path = queue.pop()
+        if path in found:
+            continue
+        found.append(path)
+        for target in _IMPORT_RE.findall(read(f"examples/jsm/{path}").decode("utf-8")):
+            # Bare "three" imports resolve through the import map
+            if target.startswith("."):
+                queue.append(posixpath.normpath(posixpath.join(posixpath.dirname(path), target)))
+    return sorted(found)
+
+
+def vendor(tarball_path: str = None) -> list:
+    """
+    Extract the pinned three.js files into VENDOR_DIR.
+
+    Args:
+        tarball_path: Local copy of three-<version>.tgz, downloaded from the
+            npm registry if None
+
+    Returns:
+        Paths of the written files, relative to VENDOR_DIR
+    """
+    if tarball_path:
+        with open(tarball_path, "rb") as f:
+            data = f.read()
+    else:
+        metadata = json.loads(_download(REGISTRY_URL))
+        data = _download(metadata["dist"]["tarball"])
+        _check_integrity(data, metadata["dist"]["integrity"])
+
+    with tempfile.TemporaryFile() as f:
+        f.write(data)
+        f.seek(0)
+        with tarfile.open(fileobj=f, mode="r:gz") as archive:
+            version = json.load(archive.extractfile("package/package.json"))["version"]
+            if version != THREE_VERSION:
+                raise SystemExit(f"Expected three {THREE_VERSION}, the tarball holds {version}")
+
+            def read(path):
+                return archive.extractfile(f"package/{path}").read()
+
+            files = list(CORE_FILES) + [f"examples/jsm/{path}" for path in _addon_files(read)]
+            # Replaced as a whole, so files of an earlier version do not linger
+            shutil.rmtree(VENDOR_DIR, ignore_errors=True)
+            for path in files:
+                target = os.path.join(VENDOR_DIR, *path.split("/"))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, "wb") as out:
+                    out.write(read(path))
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Vendor three.js {THREE_VERSION} for the WebGL viewer.")
+    parser.add_argument("--tarball", default=None, help="Use a downloaded three-<version>.tgz instead of the registry")
+    args = parser.parse_args()
+
+    for path in vendor(args.tarball):
+        print(f"  {path}")
+    print(f"three.js {THREE_VERSION} vendored in {VENDOR_DIR}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
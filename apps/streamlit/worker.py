@@ -0,0 +1,143 @@
+"""
+Distributed worker entry point.
+
+Usage:
+    python apps/streamlit/worker.py submit /shared/datasets/scan1 /shared/results/scan1 --config run.toml
+    python apps/streamlit/worker.py run --stages sparse,preview
+    python apps/streamlit/worker.py status
+
+The store, datasets and result folders must be on storage every node
+mounts under the same path. Capabilities can be overridden to reserve
+part of a node or, with --stub, to try a mixed fleet on one machine.
+"""
+
+import argparse
+import functools
+import os
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+streamlit_app_dir = os.path.dirname(os.path.abspath(__file__))
+if streamlit_app_dir not in sys.path:
+    sys.path.append(streamlit_app_dir)
+
+from src.config import settings, load_run_config
+from src.distributed import SharedJobStore, Worker, node_capabilities, run_stage_task, stub_stage_task
+from src.distributed.store import HEARTBEAT_INTERVAL_S
+
+
+def _split(value: str) -> list:
+    return [item.strip() for item in value.split(",") if item.strip()] if value else None
+
+
+def _requirements(values: list) -> dict:
+    """Parse --require values such as dense:min_ram_mb=16384."""
+    requirements = {}
+    for value in values or []:
+        try:
+            stage, requirement = value.split(":", 1)
+            key, minimum = requirement.split("=", 1)
+            minimum = float(minimum)
+            requirements.setdefault(stage.strip(), {})[key.strip()] = int(minimum) if minimum.is_integer() else minimum
+        except ValueError:
+            raise SystemExit(f"Invalid requirement '{value}', expected <stage>:min_<capability>=<value>")
+    return requirements
+
+
+def submit(store: SharedJobStore, args) -> int:
+    config = load_run_config(args.config)
+    try:
+        job_id = store.submit(
+            args.dataset, args.result, config, stages=_split(args.stages), requirements=_requirements(args.require)
+        )
+    except ValueError as e:
+        raise SystemExit(str(e))
+    print(f"Submitted job {job_id}")
+    for task in store.tasks(job_id):
+        print(f"  {task['position']}: {task['stage']:<12} needs {task['requirements_json']}")
+    return 0
+
+
+def status(store: SharedJobStore, args) -> int:
+    now = time.time()
+    print("Workers:")
+    for worker in store.workers():
+        task = f"{worker['job_id']}/{worker['stage']}" if worker["job_id"] else "idle"
+        print(f"  {worker['worker_id']:<40} {task:<28} {now - worker['heartbeat_at']:5.0f} s ago  "
+              f"{worker['capabilities']}")
+    blocked = {(task["job_id"], task["stage"]) for task in store.blocked_tasks()}
+    print("Jobs:")
+    for job in store.jobs():
+        print(f"  {job['job_id']} {job['status']:<10} {job['dataset_path']}")
+        for task in store.tasks(job["job_id"]):
+            owner = f" on {task['worker_id']}" if task["worker_id"] else ""
+            error = f" ({task['error']})" if task["error"] else ""
+            if (job["job_id"], task["stage"]) in blocked:
+                error += f" [blocked: no live worker meets {task['requirements_json']}]"
+            print(f"    {task['stage']:<12} {task['status']:<10} attempts {task['attempts']}{owner}{error}")
+    return 0
+
+
+def run(store: SharedJobStore, args) -> int:
+    capabilities = node_capabilities(cpu_count=args.cpus, ram_mb=args.ram_mb, gpu_count=args.gpus)
+    stage_fn = functools.partial(stub_stage_task, stage_seconds=args.stub_seconds) if args.stub else run_stage_task
+    worker = Worker(
+        store,
+        capabilities=capabilities,
+        stages=_split(args.stages),
+        stage_fn=stage_fn,
+        history_path=args.history,
+        poll_interval=args.poll,
+        heartbeat_interval=args.heartbeat,
+    )
+    try:
+        count = worker.run(max_tasks=args.max_tasks, exit_when_drained=args.exit_when_drained)
+    except KeyboardInterrupt:
+        return 130
+    print(f"Worker ran {count} tasks")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run reconstruction stages on several nodes over shared storage.")
+    parser.add_argument("--store", default=settings.DISTRIBUTED_STORE_PATH, help="Shared job store file")
+    parser.add_argument("--stall-timeout", type=float, default=None,
+                        help="Seconds without a heartbeat before a task is taken over")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit_parser = commands.add_parser("submit", help="Queue a dataset")
+    submit_parser.add_argument("dataset", help="Dataset folder on shared storage")
+    submit_parser.add_argument("result", help="Result folder on shared storage")
+    submit_parser.add_argument("--config", default=None, help="TOML, YAML or JSON run configuration")
+    submit_parser.add_argument("--stages", default=None, help="Comma-separated stages, default: all")
+    submit_parser.add_argument("--require", action="append", default=None,
+                               help="Override a stage requirement, e.g. dense:min_ram_mb=16384 (repeatable)")
+
+    commands.add_parser("status", help="Show workers, jobs and tasks")
+
+    run_parser = commands.add_parser("run", help="Claim and run tasks")
+    run_parser.add_argument("--stages", default=None, help="Only claim these comma-separated stages")
+    run_parser.add_argument("--cpus", type=int, default=None, help="Advertised cores (default: probed)")
+    run_parser.add_argument("--ram-mb", type=int, default=None, help="Advertised RAM (default: probed)")
+    run_parser.add_argument("--gpus", type=int, default=None, help="Advertised GPUs (default: probed)")
+    run_parser.add_argument("--max-tasks", type=int, default=None, help="Exit after this many tasks")
+    run_parser.add_argument("--exit-when-drained", action="store_true",
+                            help="Exit once every job in the store has finished")
+    run_parser.add_argument("--history", default=None, help="Record stage runs in this run history")
+    run_parser.add_argument("--poll", type=float, default=2.0, help="Seconds between claims while idle")
+    run_parser.add_argument("--heartbeat", type=float, default=HEARTBEAT_INTERVAL_S, help="Seconds between heartbeats")
+    run_parser.add_argument("--stub", action="store_true", help="Run placeholder stages instead of the pipeline")
+    run_parser.add_argument("--stub-seconds", type=float, default=2.0, help="Duration of each placeholder stage")
+    args = parser.parse_args()
+
+    kwargs = {"stall_timeout": args.stall_timeout} if args.stall_timeout else {}
+    store = SharedJobStore(args.store, **kwargs)
+    return {"submit": submit, "status": status, "run": run}[args.command](store, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())